@@ -38,7 +38,6 @@ import time
 from collections import namedtuple
 from threading import Lock
 from threading import Thread
-from threading import Timer
 
 import cflib.crtp
 from .commander import Commander
@@ -49,8 +48,11 @@ from .log import Log
 from .mem import Memory
 from .param import Param
 from .platformservice import PlatformService
+from .retryscheduler import RetryScheduler
+from .toccache import ParamValueCache
 from .toccache import TocCache
 from cflib.crazyflie.high_level_commander import HighLevelCommander
+from cflib.crtp.packetpool import release_packet
 from cflib.utils.callbacks import Caller
 
 __author__ = 'Bitcraze AB'
@@ -116,6 +118,7 @@ class Crazyflie():
         self.log = Log(self)
         self.console = Console(self)
         self.param = Param(self)
+        self.param.value_cache = ParamValueCache(rw_cache=rw_cache)
         self.mem = Memory(self)
         self.platform = PlatformService(self)
 
@@ -125,7 +128,11 @@ class Crazyflie():
         self.packet_received.add_callback(self._check_for_initial_packet_cb)
         self.packet_received.add_callback(self._check_for_answers)
 
-        self._answer_patterns = {}
+        self._answer_patterns = _AnswerPatterns()
+        # One thread handling the resend timeouts of all the requests
+        self._retry_scheduler = RetryScheduler()
+        # Number of resent packets per port
+        self._retries_per_port = {}
 
         self._send_lock = Lock()
 
@@ -169,7 +176,8 @@ class Crazyflie():
         self.connected_ts = datetime.datetime.now()
         self.connected.call(self.link_uri)
         # Trigger the update for all the parameters
-        self.param.request_update_of_all_params()
+        if not self.param.lazy_fetch:
+            self.param.request_update_of_all_params()
 
     def _mems_updated_cb(self):
         """Called when the memories have been identified"""
@@ -188,6 +196,7 @@ class Crazyflie():
         if (self.link is not None):
             self.link.close()
         self.link = None
+        self._stop_retries()
         if (self.state == State.INITIALIZED):
             self.connection_failed.call(self.link_uri, errmsg)
         if (self.state == State.CONNECTED or
@@ -229,7 +238,7 @@ class Crazyflie():
                 logger.warning(message)
                 self.connection_failed.call(link_uri, message)
             else:
-                if not self.incoming.isAlive():
+                if not self.incoming.is_alive():
                     self.incoming.start()
                 # Add a callback so we can check that any data is coming
                 # back from the copter
@@ -259,9 +268,17 @@ class Crazyflie():
         if (self.link is not None):
             self.link.close()
             self.link = None
-        self._answer_patterns = {}
+        self._stop_retries()
         self.disconnected.call(self.link_uri)
 
+    def _stop_retries(self):
+        """Forget about the packets waiting for an answer on the link"""
+        self._answer_patterns.clear()
+        # A stopped thread can not be restarted, the new scheduler does not
+        # start a thread until a packet is sent on the next link
+        self._retry_scheduler.stop()
+        self._retry_scheduler = RetryScheduler()
+
     """Check if the communication link is open or not."""
 
     def is_connected(self):
@@ -275,9 +292,16 @@ class Crazyflie():
         """Remove the callback cb on port"""
         self.incoming.remove_port_callback(port, cb)
 
+    def get_retry_stats(self):
+        """Get the number of packets resent because of a missing answer, as
+        a dictionary indexed by port"""
+        return dict(self._retries_per_port)
+
     def _no_answer_do_retry(self, pk, pattern):
         """Resend packets that we have not gotten answers to"""
         logger.info('Resending for pattern %s', pattern)
+        self._retries_per_port[pk.port] = \
+            self._retries_per_port.get(pk.port, 0) + 1
         # Set the timer to None before trying to send again
         self.send_packet(pk, expected_reply=pattern, resend=True)
 
@@ -287,20 +311,13 @@ class Crazyflie():
         waiting for an answer on this port. If so, then cancel the retry
         timer.
         """
-        longest_match = ()
-        if len(self._answer_patterns) > 0:
-            data = (pk.header,) + tuple(pk.data)
-            for p in list(self._answer_patterns.keys()):
-                logger.debug('Looking for pattern match on %s vs %s', p, data)
-                if len(p) <= len(data):
-                    if p == data[0:len(p)]:
-                        match = data[0:len(p)]
-                        if len(match) >= len(longest_match):
-                            logger.debug('Found new longest match %s', match)
-                            longest_match = match
-        if len(longest_match) > 0:
-            self._answer_patterns[longest_match].cancel()
-            del self._answer_patterns[longest_match]
+        # Nothing is registered when the link does not need resending
+        # (safelink), skip the matching entirely
+        if not self._answer_patterns:
+            return
+        retry = self._answer_patterns.pop_longest_match(pk.header, pk.data)
+        if retry is not None:
+            retry.cancel()
 
     def send_packet(self, pk, expected_reply=(), resend=False, timeout=0.2):
         """
@@ -319,23 +336,21 @@ class Crazyflie():
                 logger.debug(
                     'Sending packet and expecting the %s pattern back',
                     pattern)
-                new_timer = Timer(timeout,
-                                  lambda: self._no_answer_do_retry(pk,
-                                                                   pattern))
-                self._answer_patterns[pattern] = new_timer
-                new_timer.start()
+                self._answer_patterns[pattern] = \
+                    self._retry_scheduler.schedule(
+                        timeout,
+                        lambda: self._no_answer_do_retry(pk, pattern))
             elif resend:
                 # Check if we have gotten an answer, if not try again
                 pattern = expected_reply
                 if pattern in self._answer_patterns:
                     logger.debug('We want to resend and the pattern is there')
                     if self._answer_patterns[pattern]:
-                        new_timer = Timer(timeout,
-                                          lambda:
-                                          self._no_answer_do_retry(
-                                              pk, pattern))
-                        self._answer_patterns[pattern] = new_timer
-                        new_timer.start()
+                        self._answer_patterns[pattern] = \
+                            self._retry_scheduler.schedule(
+                                timeout,
+                                lambda: self._no_answer_do_retry(
+                                    pk, pattern))
                 else:
                     logger.debug('Resend requested, but no pattern found: %s',
                                  self._answer_patterns)
@@ -344,6 +359,85 @@ class Crazyflie():
         self._send_lock.release()
 
 
+class _AnswerPatterns(object):
+    """
+    Registry of the answers we are waiting for, mapping a pattern (header
+    followed by the start of the data) to its retry handle.
+
+    Patterns are indexed by header and then stored in a prefix trie of the
+    data bytes, so a received packet costs one dict lookup when nothing is
+    expected on its header and a walk over at most len(pattern) bytes
+    otherwise.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._patterns = {}
+        # header -> trie node, a node is [children, pattern or None]
+        self._index = {}
+
+    def __len__(self):
+        return len(self._patterns)
+
+    def __contains__(self, pattern):
+        return pattern in self._patterns
+
+    def __getitem__(self, pattern):
+        return self._patterns[pattern]
+
+    def __setitem__(self, pattern, retry):
+        with self._lock:
+            if pattern not in self._patterns:
+                node = self._index.setdefault(pattern[0], [{}, None])
+                for byte in pattern[1:]:
+                    node = node[0].setdefault(byte, [{}, None])
+                node[1] = pattern
+            self._patterns[pattern] = retry
+
+    def __repr__(self):
+        return repr(self._patterns)
+
+    def clear(self):
+        with self._lock:
+            self._patterns = {}
+            self._index = {}
+
+    def pop_longest_match(self, header, data):
+        """Remove the longest pattern matching the start of the packet and
+        return its retry handle, or None if there is no match"""
+        with self._lock:
+            # Looked up under the lock as clear() may replace the index
+            node = self._index.get(header)
+            if node is None:
+                return None
+
+            path = [node]
+            longest_match = node[1]
+            for byte in data:
+                node = node[0].get(byte)
+                if node is None:
+                    break
+                path.append(node)
+                if node[1] is not None:
+                    longest_match = node[1]
+
+            if longest_match is None:
+                return None
+            logger.debug('Found longest match %s', longest_match)
+
+            # Unlink the pattern and prune the nodes that became empty
+            path = path[:len(longest_match)]
+            path[-1][1] = None
+            for i in range(len(path) - 1, 0, -1):
+                if path[i][0] or path[i][1] is not None:
+                    break
+                del path[i - 1][0][longest_match[i]]
+            if not path[0][0] and path[0][1] is None:
+                del self._index[header]
+
+            return self._patterns.pop(longest_match)
+
+
 _CallbackContainer = namedtuple('CallbackConstainer',
                                 'port port_mask channel channel_mask callback')
 
@@ -355,6 +449,9 @@ class _IncomingPacketHandler(Thread):
         Thread.__init__(self)
         self.cf = cf
         self.cb = []
+        self._cb_lock = Lock()
+        # Callbacks for every (port << 4 | channel), rebuilt on registration
+        self._dispatch = [()] * 256
 
     def add_port_callback(self, port, cb):
         """Add a callback for data that comes on a specific port"""
@@ -364,9 +461,11 @@ class _IncomingPacketHandler(Thread):
     def remove_port_callback(self, port, cb):
         """Remove a callback for data that comes on a specific port"""
         logger.debug('Removing callback on port [%d] to [%s]', port, cb)
-        for port_callback in self.cb:
-            if port_callback.port == port and port_callback.callback == cb:
-                self.cb.remove(port_callback)
+        with self._cb_lock:
+            self.cb = [port_callback for port_callback in self.cb
+                       if not (port_callback.port == port and
+                               port_callback.callback == cb)]
+            self._rebuild_dispatch()
 
     def add_header_callback(self, cb, port, channel, port_mask=0xFF,
                             channel_mask=0xFF):
@@ -375,8 +474,24 @@ class _IncomingPacketHandler(Thread):
         possibility to add a mask for channel and port for multiple
         hits for same callback.
         """
-        self.cb.append(_CallbackContainer(port, port_mask,
-                                          channel, channel_mask, cb))
+        with self._cb_lock:
+            self.cb = self.cb + [_CallbackContainer(port, port_mask,
+                                                    channel, channel_mask, cb)]
+            self._rebuild_dispatch()
+
+    def _rebuild_dispatch(self):
+        """Precompute the callbacks to call for every port and channel"""
+        dispatch = []
+        for index in range(256):
+            port = index >> 4
+            channel = index & 0x0F
+            dispatch.append(tuple(
+                cb for cb in self.cb
+                if cb.port == (port & cb.port_mask) and
+                cb.channel == (channel & cb.channel_mask)))
+        # Swap in the new table in one assignment, the receiver thread
+        # never sees a partially built table
+        self._dispatch = dispatch
 
     def run(self):
         while True:
@@ -388,26 +503,27 @@ class _IncomingPacketHandler(Thread):
             if pk is None:
                 continue
 
-            # All-packet callbacks
-            self.cf.packet_received.call(pk)
-
-            found = False
-            for cb in (cb for cb in self.cb
-                       if cb.port == (pk.port & cb.port_mask) and
-                       cb.channel == (pk.channel & cb.channel_mask)):
-                try:
-                    cb.callback(pk)
-                except Exception:  # pylint: disable=W0703
-                    # Disregard pylint warning since we want to catch all
-                    # exceptions and we can't know what will happen in
-                    # the callbacks.
-                    import traceback
-
-                    logger.error('Exception while doing callback on port'
-                                 ' [%d]\n\n%s', pk.port,
-                                 traceback.format_exc())
-                if cb.port != 0xFF:
-                    found = True
-
-            if not found:
-                pass
+            self._dispatch_packet(pk)
+
+    def _dispatch_packet(self, pk):
+        """Call the all-packet callbacks and the callbacks matching the port
+        and channel of pk"""
+        # All-packet callbacks
+        self.cf.packet_received.call(pk)
+
+        for cb in self._dispatch[(pk.port << 4 | pk.channel) & 0xFF]:
+            try:
+                cb.callback(pk)
+            except Exception:  # pylint: disable=W0703
+                # Disregard pylint warning since we want to catch all
+                # exceptions and we can't know what will happen in
+                # the callbacks.
+                import traceback
+
+                logger.error('Exception while doing callback on port'
+                             ' [%d]\n\n%s', pk.port,
+                             traceback.format_exc())
+
+        # Hand the packet back to the pool (if it is enabled) now that
+        # all the callbacks are done with it
+        release_packet(pk)
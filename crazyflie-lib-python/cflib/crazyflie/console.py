@@ -56,6 +56,6 @@ class Console:
         Callback for data received from the copter.
         """
         # This might be done prettier ;-)
-        console_text = packet.data.decode('UTF-8')
+        console_text = bytes(packet.data).decode('UTF-8')
 
         self.receivedChar.call(console_text)
@@ -57,6 +57,9 @@ class HighLevelCommander():
     def __init__(self, crazyflie=None):
         """
         Initialize the object.
+
+        crazyflie can also be a broadcast link (radiobroadcast://) to send
+        the commands to all Crazyflies on a channel with one packet each.
         """
         self._cf = crazyflie
 
@@ -85,7 +85,8 @@ class Localization():
             return
 
         pk_type = struct.unpack('<B', packet.data[:1])[0]
-        data = packet.data[1:]
+        # Copied, the packet data can be reused once this callback returns
+        data = bytes(packet.data[1:])
 
         # Decoding the known packet types
         # TODO: more generic decoding scheme?
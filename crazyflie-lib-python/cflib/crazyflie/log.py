@@ -62,7 +62,11 @@ States of a configuration:
 """
 import errno
 import logging
+import re
 import struct
+import time
+from collections import deque
+from collections import namedtuple
 
 from .toc import Toc
 from .toc import TocFetcher
@@ -71,7 +75,7 @@ from cflib.crtp.crtpstack import CRTPPort
 from cflib.utils.callbacks import Caller
 
 __author__ = 'Bitcraze AB'
-__all__ = ['Log', 'LogTocElement']
+__all__ = ['Log', 'LogTocElement', 'LogTimestamp', 'ClockEstimator']
 
 # Channels used for the logging port
 CHAN_TOC = 0
@@ -102,9 +106,19 @@ GET_TOC_ELEMENT = 'GET_TOC_ELEMENT'
 # The max size of a CRTP packet payload
 MAX_LOG_DATA_PACKET_SIZE = 30
 
+# Log data timestamps are 24 bit millisecond counters
+TIMESTAMP_RANGE = 1 << 24
+
+# Ids that can be given to log blocks
+FIRST_BLOCK_ID = 1
+LAST_BLOCK_ID = 254
+
 
 logger = logging.getLogger(__name__)
 
+# Host clock used to align the Crazyflie time, see ClockEstimator
+_clock = getattr(time, 'monotonic', time.time)
+
 
 class LogVariable():
     """A logging variable"""
@@ -146,7 +160,12 @@ class LogConfig(object):
     """Representation of one log configuration that enables logging
     from the Crazyflie"""
 
-    def __init__(self, name, period_in_ms):
+    # Type of the data passed to data_received_cb
+    DICT = 0  # {name: value}
+    TUPLE = 1  # values in the order of the variables, see variable_names
+    NAMED_TUPLE = 2  # namedtuple with the names with '.' replaced by '_'
+
+    def __init__(self, name, period_in_ms, data_format=DICT):
         """Initialize the entry"""
         self.data_received_cb = Caller()
         self.error_cb = Caller()
@@ -167,6 +186,13 @@ class LogConfig(object):
         self.variables = []
         self.default_fetch_as = []
         self.name = name
+        self.data_format = data_format
+
+        # Compiled from the variables the first time data is unpacked
+        self._unpacker = None
+        self._names = None
+        self._sample_type = None
+        self._sinks = []
 
     def add_variable(self, name, fetch_as=None):
         """Add a new variable to the configuration.
@@ -180,6 +206,7 @@ class LogConfig(object):
         Crazyflie)."""
         if fetch_as:
             self.variables.append(LogVariable(name, fetch_as))
+            self._unpacker = None
         else:
             # We cannot determine the default type until we have connected. So
             # save the name and we will add these once we are connected.
@@ -197,6 +224,37 @@ class LogConfig(object):
         """
         self.variables.append(LogVariable(name, fetch_as, LogVariable.MEM_TYPE,
                                           stored_as, address))
+        self._unpacker = None
+
+    def _compile(self):
+        """Build the struct used to unpack all the variables at once"""
+        self._unpacker = struct.Struct('<' + ''.join(
+            LogTocElement.get_unpack_string_from_id(var.fetch_as)[1:]
+            for var in self.variables))
+        self._names = tuple(var.name for var in self.variables)
+        self._sample_type = None
+        if self.data_format == LogConfig.NAMED_TUPLE:
+            self._sample_type = namedtuple(
+                'LogSample',
+                [re.sub('\\W', '_', name) for name in self._names],
+                rename=True)
+
+    def _get_variable_names(self):
+        if self._unpacker is None:
+            self._compile()
+        return self._names
+
+    variable_names = property(_get_variable_names)
+
+    def add_sink(self, sink):
+        """Add a sink that gets every unpacked sample through
+        sink.append(timestamp, values), values being a tuple in the order of
+        variable_names. See LogRingBuffer."""
+        self._sinks.append(sink)
+
+    def remove_sink(self, sink):
+        """Remove a sink added with add_sink()"""
+        self._sinks.remove(sink)
 
     def _set_added(self, added):
         if added != self._added:
@@ -255,6 +313,9 @@ class LogConfig(object):
         """Start the logging for this entry"""
         if (self.cf.link is not None):
             if (self._added is False):
+                if self.id is None:
+                    # Deleted, the old id might be used by another block
+                    self.cf.log._add_block(self)
                 self.create()
                 logger.debug('First time block is started, add block')
             else:
@@ -296,18 +357,20 @@ class LogConfig(object):
     def unpack_log_data(self, log_data, timestamp):
         """Unpack received logging data so it represent real values according
         to the configuration in the entry"""
-        ret_data = {}
-        data_index = 0
-        for var in self.variables:
-            size = LogTocElement.get_size_from_id(var.fetch_as)
-            name = var.name
-            unpackstring = LogTocElement.get_unpack_string_from_id(
-                var.fetch_as)
-            value = struct.unpack(
-                unpackstring, log_data[data_index:data_index + size])[0]
-            data_index += size
-            ret_data[name] = value
-        self.data_received_cb.call(timestamp, ret_data, self)
+        if self._unpacker is None:
+            self._compile()
+        values = self._unpacker.unpack_from(log_data)
+        for sink in self._sinks:
+            sink.append(timestamp, values)
+        if not self.data_received_cb.callbacks:
+            return
+        if self.data_format == LogConfig.DICT:
+            data = dict(zip(self._names, values))
+        elif self.data_format == LogConfig.TUPLE:
+            data = values
+        else:
+            data = self._sample_type._make(values)
+        self.data_received_cb.call(timestamp, data, self)
 
 
 class LogTocElement:
@@ -362,7 +425,7 @@ class LogTocElement:
         self.ident = ident
 
         if (data):
-            naming = data[1:]
+            naming = bytearray(data[1:])
             zt = bytearray((0, ))
             self.group = naming[:naming.find(zt)].decode('ISO-8859-1')
             self.name = naming[naming.find(zt) + 1:-1].decode('ISO-8859-1')
@@ -373,6 +436,105 @@ class LogTocElement:
             self.access = data[0] & 0x10
 
 
+class LogTimestamp(int):
+    """
+    Timestamp of log data: the Crazyflie time in ms since it started, that
+    does not wrap around like the 24 bit timestamp in the log data packets.
+    host_time is the corresponding time of the host clock (time.monotonic()
+    when available), as estimated by the ClockEstimator of the log subsystem.
+    """
+
+    host_time = None
+
+
+class _TimestampUnwrapper(object):
+    """Extends the 24 bit log data timestamps to a counter that does not
+    wrap around"""
+
+    def __init__(self):
+        self._last = None
+        self._wraps = 0
+
+    def unwrap(self, timestamp):
+        if self._last is not None:
+            if timestamp < self._last - TIMESTAMP_RANGE // 2:
+                self._wraps += 1
+            elif timestamp > self._last + TIMESTAMP_RANGE // 2:
+                # Late packet from before the last wrap around
+                return timestamp + (self._wraps - 1) * TIMESTAMP_RANGE
+        self._last = timestamp
+        return timestamp + self._wraps * TIMESTAMP_RANGE
+
+
+class ClockEstimator(object):
+    """
+    Estimates the offset and drift of the Crazyflie clock relative to the
+    host clock, from the time log data is received.
+
+    The time between the Crazyflie timestamp and the reception of a packet
+    is the offset plus a varying latency. The smallest difference seen in
+    each window of WINDOW seconds is taken as the offset at that time, and a
+    line is fitted through these minimums with exponential forgetting to
+    get the offset and drift. All times are in seconds.
+    """
+
+    WINDOW = 1.0
+    # Weight of the previous windows in the fit, per window
+    FORGETTING_FACTOR = 0.95
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # Offset at the Crazyflie time _reference, and drift in s/s
+        self.offset = None
+        self.drift = 0.0
+        self._reference = None
+        self._window_end = None
+        self._window_min = None
+        # Weighted sums for the least square fit of the window minimums
+        self._sums = [0.0] * 5
+
+    def update(self, copter_time, host_time):
+        """Add the host time at which a Crazyflie time was received"""
+        offset = host_time - copter_time
+        if self._reference is None:
+            self._reference = copter_time
+            self._window_end = copter_time + self.WINDOW
+            self.offset = offset
+
+        if copter_time >= self._window_end:
+            self._add_window_min()
+            self._window_end = copter_time + self.WINDOW
+
+        t = copter_time - self._reference
+        if self._window_min is None or offset < self._window_min[1]:
+            self._window_min = (t, offset)
+
+        # A packet can not be received before it was sent
+        error = offset - (self.offset + self.drift * t)
+        if error < 0:
+            self.offset += error
+
+    def _add_window_min(self):
+        t, offset = self._window_min
+        self._window_min = None
+        f = self.FORGETTING_FACTOR
+        sums = self._sums
+        for i, value in enumerate((1.0, t, offset, t * t, t * offset)):
+            sums[i] = f * sums[i] + value
+        [sw, st, so, stt, sto] = sums
+        determinant = sw * stt - st * st
+        if determinant > 1e-9:
+            self.drift = (sw * sto - st * so) / determinant
+            self.offset = (so - self.drift * st) / sw
+
+    def to_host(self, copter_time):
+        """Get the estimated host time of a Crazyflie time"""
+        return (copter_time + self.offset +
+                self.drift * (copter_time - self._reference))
+
+
 class Log():
     """Create log configuration"""
 
@@ -389,9 +551,17 @@ class Log():
 
     def __init__(self, crazyflie=None):
         self.log_blocks = []
+        # Added blocks by id
+        self._blocks_by_id = {}
+        # Ids not used by added blocks, released ids are reused last
+        self._free_ids = deque(range(FIRST_BLOCK_ID, LAST_BLOCK_ID + 1))
         # Called with newly created blocks
         self.block_added_cb = Caller()
 
+        self._timestamp_unwrapper = _TimestampUnwrapper()
+        # Alignment of the Crazyflie clock with the host clock
+        self.clock = ClockEstimator()
+
         self.cf = crazyflie
         self.toc = None
         self.cf.add_port_callback(CRTPPort.LOGGING, self._new_packet_cb)
@@ -403,8 +573,6 @@ class Log():
         self._refresh_callback = None
         self._toc_cache = None
 
-        self._config_id_counter = 1
-
         self._useV2 = False
 
     def add_config(self, logconf):
@@ -454,12 +622,14 @@ class Log():
 
         if (size <= MAX_LOG_DATA_PACKET_SIZE and
                 (logconf.period > 0 and logconf.period < 0xFF)):
+            if self._blocks_by_id.get(logconf.id) is logconf:
+                # Added again, forget about the previous block
+                self._remove_block(logconf)
             logconf.valid = True
             logconf.cf = self.cf
-            logconf.id = self._config_id_counter
             logconf.useV2 = self._useV2
-            self._config_id_counter = (self._config_id_counter + 1) % 255
-            self.log_blocks.append(logconf)
+            logconf._compile()
+            self._add_block(logconf)
             self.block_added_cb.call(logconf)
         else:
             logconf.valid = False
@@ -482,10 +652,29 @@ class Log():
         self.cf.send_packet(pk, expected_reply=(CMD_RESET_LOGGING,))
 
     def _find_block(self, id):
+        return self._blocks_by_id.get(id)
+
+    def _add_block(self, block):
+        """Give a block a free id and register it"""
+        if not self._free_ids:
+            raise Exception('No free log block id')
+        block.id = self._free_ids.popleft()
+        self._blocks_by_id[block.id] = block
+        self.log_blocks.append(block)
+
+    def _remove_block(self, block):
+        """Forget about a deleted block and make its id available"""
+        del self._blocks_by_id[block.id]
+        self.log_blocks.remove(block)
+        self._free_ids.append(block.id)
+        block.id = None
+
+    def _remove_all_blocks(self):
         for block in self.log_blocks:
-            if block.id == id:
-                return block
-        return None
+            block.id = None
+        self.log_blocks = []
+        self._blocks_by_id = {}
+        self._free_ids = deque(range(FIRST_BLOCK_ID, LAST_BLOCK_ID + 1))
 
     def _new_packet_cb(self, packet):
         """Callback for newly arrived packets with TOC information"""
@@ -514,7 +703,7 @@ class Log():
                         logger.warning('Error %d when adding id=%d (%s)',
                                        error_status, id, msg)
                         block.err_no = error_status
-                        block.added_cb.call(False)
+                        block.added_cb.call(block, False)
                         block.error_cb.call(block, msg)
 
                 else:
@@ -554,12 +743,17 @@ class Log():
                     if block:
                         block.started = False
                         block.added = False
+                        # The block has to be added again to be used
+                        self._remove_block(block)
 
             if (cmd == CMD_RESET_LOGGING):
                 # Guard against multiple responses due to re-sending
                 if not self.toc:
                     logger.debug('Logging reset, continue with TOC download')
-                    self.log_blocks = []
+                    self._remove_all_blocks()
+                    # The Crazyflie might have been restarted
+                    self._timestamp_unwrapper = _TimestampUnwrapper()
+                    self.clock.reset()
 
                     self.toc = Toc()
                     toc_fetcher = TocFetcher(self.cf, LogTocElement,
@@ -573,8 +767,10 @@ class Log():
             id = packet.data[0]
             block = self._find_block(id)
             timestamps = struct.unpack('<BBB', packet.data[1:4])
-            timestamp = (
-                timestamps[0] | timestamps[1] << 8 | timestamps[2] << 16)
+            timestamp = LogTimestamp(self._timestamp_unwrapper.unwrap(
+                timestamps[0] | timestamps[1] << 8 | timestamps[2] << 16))
+            self.clock.update(timestamp / 1000.0, _clock())
+            timestamp.host_time = self.clock.to_host(timestamp / 1000.0)
             logdata = packet.data[4:]
             if (block is not None):
                 block.unpack_log_data(logdata, timestamp)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2020 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Columnar buffering of log data with NumPy.
+
+A LogRingBuffer keeps the last samples of a log configuration in a
+preallocated NumPy structured array, with columns for the Crazyflie and
+host timestamps and one column per variable. The samples are written by the
+log subsystem as they arrive, without creating a dict per sample. NumPy is
+only needed when a LogRingBuffer is created.
+"""
+from threading import Lock
+
+from .log import LogTocElement
+
+found_numpy = True
+try:
+    import numpy
+except ImportError:
+    found_numpy = False
+
+__author__ = 'Bitcraze AB'
+__all__ = ['LogRingBuffer']
+
+# struct format character -> NumPy type
+_NUMPY_TYPES = {
+    'B': 'u1',
+    'b': 'i1',
+    'H': '<u2',
+    'h': '<i2',
+    'L': '<u4',
+    'i': '<i4',
+    'f': '<f4',
+}
+
+
+class LogRingBuffer(object):
+    """
+    Ring buffer holding the last samples of a LogConfig.
+
+    The buffer must be created once the LogConfig has been added to the log
+    subsystem (so that the types of all variables are known). The columns
+    are 'timestamp' (Crazyflie time in ms), 'host_time' (see LogTimestamp,
+    NaN if not known) and the variable names.
+
+    snapshot() and drain() return copies of the samples, taken while the
+    buffer is locked, so they are not changed by samples arriving later.
+    """
+
+    def __init__(self, log_config, capacity):
+        if not found_numpy:
+            raise Exception('NumPy package is missing')
+
+        fields = [('timestamp', '<u8'), ('host_time', '<f8')]
+        for var in log_config.variables:
+            unpack_string = LogTocElement.get_unpack_string_from_id(
+                var.fetch_as)
+            fields.append((var.name, _NUMPY_TYPES[unpack_string[1:]]))
+        self.dtype = numpy.dtype(fields)
+        self.capacity = capacity
+
+        # Every sample is written twice, at i and i + capacity, so that the
+        # last capacity samples are always contiguous in the array
+        self._buffer = numpy.zeros(2 * capacity, dtype=self.dtype)
+        self._lock = Lock()
+        self._nbr_of_written = 0
+        self._nbr_of_drained = 0
+        # Number of samples overwritten before they were drained
+        self.overruns = 0
+
+        self._log_config = log_config
+        log_config.add_sink(self)
+
+    def close(self):
+        """Stop receiving samples from the log configuration"""
+        self._log_config.remove_sink(self)
+
+    def append(self, timestamp, values):
+        """Add a sample, called by the log subsystem"""
+        host_time = getattr(timestamp, 'host_time', None)
+        if host_time is None:
+            host_time = float('nan')
+        sample = (timestamp, host_time) + tuple(values)
+        with self._lock:
+            index = self._nbr_of_written % self.capacity
+            self._buffer[index] = sample
+            self._buffer[index + self.capacity] = sample
+            self._nbr_of_written += 1
+            if self._nbr_of_written - self._nbr_of_drained > self.capacity:
+                self._nbr_of_drained += 1
+                self.overruns += 1
+
+    def __len__(self):
+        with self._lock:
+            return min(self._nbr_of_written, self.capacity)
+
+    def _last(self, count):
+        """Copy of the last count samples, oldest first"""
+        end = (self._nbr_of_written - 1) % self.capacity + self.capacity + 1
+        return self._buffer[end - count:end].copy()
+
+    def snapshot(self):
+        """Get the samples in the buffer, oldest first"""
+        with self._lock:
+            return self._last(min(self._nbr_of_written, self.capacity))
+
+    def drain(self):
+        """Get the samples received since the last call to drain(), oldest
+        first"""
+        with self._lock:
+            count = self._nbr_of_written - self._nbr_of_drained
+            self._nbr_of_drained = self._nbr_of_written
+            return self._last(count)
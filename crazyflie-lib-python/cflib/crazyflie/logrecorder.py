@@ -0,0 +1,350 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2020 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Recording of log data to file, and reading of the recorded files.
+
+A LogRecorder writes the log data packets of a set of log configurations
+to a binary file. The packets are only copied in the thread receiving them,
+they are written to file by a background thread.
+
+The file starts with a header (magic and version) and contains records,
+each with a type, a block id and the length of its payload:
+  Schema - The name, period and variables (name and fetch as type) of a log
+           configuration, as JSON. Applies to the following chunks with the
+           same block id.
+  Chunk  - A number of samples of a block, stored by column: the 24 bit
+           Crazyflie timestamps (as uint32), the host times at which the
+           packets were received (as double) and the packed variables, one
+           row per sample as in the log data packets.
+
+A LogReader reads the samples of a file, one at a time or per log
+configuration as NumPy arrays.
+"""
+import json
+import logging
+import struct
+import sys
+from threading import Thread
+
+from .log import _clock
+from .log import _TimestampUnwrapper
+from .log import CHAN_LOGDATA
+from .log import ClockEstimator
+from .log import LogTocElement
+from .logbuffer import _NUMPY_TYPES
+from cflib.crtp.crtpstack import CRTPPort
+
+found_numpy = True
+try:
+    import numpy
+except ImportError:
+    found_numpy = False
+
+if sys.version_info < (3,):
+    from Queue import Queue
+else:
+    from queue import Queue
+
+__author__ = 'Bitcraze AB'
+__all__ = ['LogRecorder', 'LogReader']
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b'CFLR'
+_VERSION = 1
+# magic, version
+_FILE_HEADER = struct.Struct('<4sB')
+# record type, block id, length of the payload
+_RECORD_HEADER = struct.Struct('<BBI')
+_SCHEMA = 1
+_CHUNK = 2
+# number of samples in a chunk
+_CHUNK_HEADER = struct.Struct('<I')
+
+# Offset of the variables in a log data packet
+_DATA_OFFSET = 4
+
+
+def _unpack_chars(variables):
+    """struct format characters of (name, fetch as type) variables"""
+    return [LogTocElement.get_unpack_string_from_id(
+        LogTocElement.get_id_from_cstring(fetch_as))[1:]
+        for _, fetch_as in variables]
+
+
+def _variables_struct(variables):
+    return struct.Struct('<' + ''.join(_unpack_chars(variables)))
+
+
+class _LogWriter(Thread):
+    """Writes the queued schemas and packets to file"""
+
+    def __init__(self, output, chunk_size):
+        Thread.__init__(self)
+        self.daemon = True
+        self.queue = Queue()
+        self._output = output
+        self._chunk_size = chunk_size
+        # Block id -> row size
+        self._row_sizes = {}
+        # Block id -> ([timestamp], [received], [data])
+        self._chunks = {}
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            if item[0] == _SCHEMA:
+                self._write_schema(item[1], item[2])
+            else:
+                self._add_packet(item[1], item[2])
+        for block_id in list(self._chunks):
+            self._write_chunk(block_id)
+        self._output.flush()
+
+    def _write_schema(self, block_id, schema):
+        # Samples of a previous block with the same id go first
+        if block_id in self._chunks:
+            self._write_chunk(block_id)
+        self._row_sizes[block_id] = _variables_struct(
+            schema['variables']).size
+        payload = json.dumps(schema).encode('utf-8')
+        self._output.write(_RECORD_HEADER.pack(_SCHEMA, block_id,
+                                               len(payload)))
+        self._output.write(payload)
+
+    def _add_packet(self, received, data):
+        block_id = data[0]
+        row_size = self._row_sizes[block_id]
+        chunk = self._chunks.get(block_id)
+        if chunk is None:
+            chunk = ([], [], [])
+            self._chunks[block_id] = chunk
+        chunk[0].append(data[1] | data[2] << 8 | data[3] << 16)
+        chunk[1].append(received)
+        chunk[2].append(data[_DATA_OFFSET:_DATA_OFFSET + row_size])
+        if len(chunk[0]) >= self._chunk_size:
+            self._write_chunk(block_id)
+
+    def _write_chunk(self, block_id):
+        timestamps, received, rows = self._chunks.pop(block_id)
+        count = len(timestamps)
+        payload = b''.join([
+            _CHUNK_HEADER.pack(count),
+            struct.pack('<%dI' % count, *timestamps),
+            struct.pack('<%dd' % count, *received),
+        ] + rows)
+        self._output.write(_RECORD_HEADER.pack(_CHUNK, block_id,
+                                               len(payload)))
+        self._output.write(payload)
+
+
+class LogRecorder(object):
+    """
+    Records the log data of log configurations to a file. The log
+    configurations must have been added to the log subsystem before they
+    are added to the recorder.
+    """
+
+    def __init__(self, crazyflie, filename, chunk_size=256):
+        self.cf = crazyflie
+        self._output = open(filename, 'wb')
+        self._output.write(_FILE_HEADER.pack(_MAGIC, _VERSION))
+        # Block id -> recorded log configuration, updated when the
+        # configurations are added to and deleted from the Crazyflie since
+        # the block ids are reused
+        self._configs = {}
+        self._recorded = []
+
+        self._writer = _LogWriter(self._output, chunk_size)
+        self._writer.start()
+        self.cf.add_port_callback(CRTPPort.LOGGING, self._packet_cb)
+
+    def add_config(self, log_config):
+        """Start recording the data of a log configuration"""
+        self._recorded.append(log_config)
+        log_config.added_cb.add_callback(self._added_cb)
+        if log_config.added:
+            self._add_schema(log_config)
+
+    def close(self):
+        """Stop recording and write the remaining data to file"""
+        self.cf.remove_port_callback(CRTPPort.LOGGING, self._packet_cb)
+        for log_config in self._recorded:
+            log_config.added_cb.remove_callback(self._added_cb)
+        self._writer.queue.put(None)
+        self._writer.join()
+        self._output.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _add_schema(self, log_config):
+        schema = {
+            'name': log_config.name,
+            'period_in_ms': log_config.period_in_ms,
+            'variables': [
+                [var.name, LogTocElement.get_cstring_from_id(var.fetch_as)]
+                for var in log_config.variables],
+        }
+        # The schema is queued before the packets of the block
+        self._writer.queue.put((_SCHEMA, log_config.id, schema))
+        self._configs[log_config.id] = log_config
+
+    def _added_cb(self, log_config, added):
+        if added:
+            self._add_schema(log_config)
+        else:
+            # The id of a deleted block is given to the next added block
+            for block_id, config in list(self._configs.items()):
+                if config is log_config:
+                    del self._configs[block_id]
+
+    def _packet_cb(self, pk):
+        if pk.channel == CHAN_LOGDATA and pk.data[0] in self._configs:
+            self._writer.queue.put((_CHUNK, _clock(), bytearray(pk.data)))
+
+
+class _Block(object):
+    """A log configuration in a recorded file"""
+
+    def __init__(self, schema):
+        self.name = schema['name']
+        self.period_in_ms = schema['period_in_ms']
+        self.variables = [tuple(var) for var in schema['variables']]
+        self.variable_names = tuple(name for name, _ in self.variables)
+        self.unpacker = _variables_struct(self.variables)
+        self.numpy_types = [_NUMPY_TYPES[c]
+                            for c in _unpack_chars(self.variables)]
+        self._unwrapper = _TimestampUnwrapper()
+        self._clock = ClockEstimator()
+
+    def times(self, timestamps, received):
+        """Unwrapped Crazyflie times and estimated host times"""
+        unwrapped = []
+        host_times = []
+        for timestamp, received_time in zip(timestamps, received):
+            timestamp = self._unwrapper.unwrap(timestamp)
+            self._clock.update(timestamp / 1000.0, received_time)
+            unwrapped.append(timestamp)
+            host_times.append(self._clock.to_host(timestamp / 1000.0))
+        return unwrapped, host_times
+
+
+class LogReader(object):
+    """
+    Reads a file written by a LogRecorder. Iterating over the reader gives
+    (name, timestamp, host_time, data) for every sample, name being the
+    name of the log configuration, timestamp the unwrapped Crazyflie time
+    in ms, host_time the estimated host time and data a dict of the
+    variables. The samples of a log configuration are in order, but are
+    grouped in chunks that are not ordered between log configurations.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    def _chunks(self):
+        """Yield (block, timestamps, host_times, rows) for every chunk"""
+        blocks = {}
+        # Blocks by name, a log configuration keeps its unwrapping and clock
+        # estimate if it is added again
+        blocks_by_name = {}
+        with open(self.filename, 'rb') as f:
+            magic, version = _FILE_HEADER.unpack(f.read(_FILE_HEADER.size))
+            if magic != _MAGIC or version != _VERSION:
+                raise Exception('Not a log recording: {}'.format(
+                    self.filename))
+            while True:
+                header = f.read(_RECORD_HEADER.size)
+                if len(header) < _RECORD_HEADER.size:
+                    break
+                record_type, block_id, length = _RECORD_HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length:
+                    logger.warning('Truncated record at end of [%s]',
+                                   self.filename)
+                    break
+                if record_type == _SCHEMA:
+                    schema = json.loads(payload.decode('utf-8'))
+                    block = blocks_by_name.get(schema['name'])
+                    if block is None or \
+                            block.variables != [tuple(var) for var in
+                                                schema['variables']]:
+                        block = _Block(schema)
+                        blocks_by_name[block.name] = block
+                    blocks[block_id] = block
+                elif record_type == _CHUNK:
+                    block = blocks[block_id]
+                    yield (block,) + self._decode_chunk(block, payload)
+
+    def _decode_chunk(self, block, payload):
+        count = _CHUNK_HEADER.unpack_from(payload)[0]
+        offset = _CHUNK_HEADER.size
+        timestamps = struct.unpack_from('<%dI' % count, payload, offset)
+        offset += 4 * count
+        received = struct.unpack_from('<%dd' % count, payload, offset)
+        offset += 8 * count
+        timestamps, host_times = block.times(timestamps, received)
+        return timestamps, host_times, payload[offset:]
+
+    def __iter__(self):
+        for block, timestamps, host_times, rows in self._chunks():
+            size = block.unpacker.size
+            for i, (timestamp, host_time) in enumerate(
+                    zip(timestamps, host_times)):
+                values = block.unpacker.unpack_from(rows, i * size)
+                yield (block.name, timestamp, host_time,
+                       dict(zip(block.variable_names, values)))
+
+    def to_numpy(self):
+        """
+        Read the whole file, return a dict with a NumPy structured array per
+        log configuration name. The columns are timestamp, host_time and the
+        variable names.
+        """
+        if not found_numpy:
+            raise Exception('NumPy package is missing')
+
+        parts = {}
+        for block, timestamps, host_times, rows in self._chunks():
+            columns = list(zip(block.variable_names, block.numpy_types))
+            variables = numpy.frombuffer(rows, dtype=numpy.dtype(columns),
+                                         count=len(timestamps))
+            part = numpy.empty(len(timestamps), dtype=numpy.dtype(
+                [('timestamp', '<u8'), ('host_time', '<f8')] + columns))
+            part['timestamp'] = timestamps
+            part['host_time'] = host_times
+            for name in block.variable_names:
+                part[name] = variables[name]
+            parts.setdefault(block.name, []).append(part)
+        return dict((name, numpy.concatenate(arrays))
+                    for name, arrays in parts.items())
@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2020 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Logging of any number of variables without splitting them into log
+configurations by hand.
+
+A LogSession packs the variables into log blocks, first fit decreasing (one
+or more blocks per period, each fitting in a log data packet), and merges
+the data of the blocks that have the same period back into one sample per
+period, so that the user gets a single stream of samples.
+"""
+import logging
+
+from .log import LogConfig
+from .log import LogTocElement
+from .log import MAX_LOG_DATA_PACKET_SIZE
+from cflib.utils.callbacks import Caller
+
+__author__ = 'Bitcraze AB'
+__all__ = ['LogSession']
+
+logger = logging.getLogger(__name__)
+
+# Number of incomplete samples kept per period while waiting for data from
+# the other blocks
+MAX_PENDING_FRAMES = 4
+
+# The command creating a log block, the command and block id followed by the
+# type and TOC id of each variable, must also fit in a CRTP packet
+_CREATE_BLOCK_HEADER_SIZE = 2
+_CREATE_BLOCK_VARIABLE_SIZE = 2
+_CREATE_BLOCK_VARIABLE_SIZE_V2 = 3
+
+
+def _max_variables_per_block(use_v2):
+    """Number of variables that fit in the create block command"""
+    if use_v2:
+        variable_size = _CREATE_BLOCK_VARIABLE_SIZE_V2
+    else:
+        variable_size = _CREATE_BLOCK_VARIABLE_SIZE
+    return ((MAX_LOG_DATA_PACKET_SIZE - _CREATE_BLOCK_HEADER_SIZE) //
+            variable_size)
+
+
+def _pack_variables(variables, max_size=MAX_LOG_DATA_PACKET_SIZE,
+                    max_count=None):
+    """
+    Pack (name, size) pairs in bins of max_size bytes and at most max_count
+    names, first fit decreasing: largest first into the first bin it fits
+    in. Return a list of lists of names.
+    """
+    bins = []
+    for name, size in sorted(variables, key=lambda v: -v[1]):
+        for bin in bins:
+            if (bin[0] + size <= max_size and
+                    (max_count is None or len(bin[1]) < max_count)):
+                bin[0] += size
+                bin[1].append(name)
+                break
+        else:
+            bins.append([size, [name]])
+    return [names for _, names in bins]
+
+
+class _Frame(object):
+    """Sample of one period being assembled from the data of its blocks"""
+
+    def __init__(self, timestamp):
+        self.timestamp = timestamp
+        self.data = {}
+        self.received = set()
+
+
+class _PeriodGroup(object):
+    """The blocks logged with the same period, and their pending samples"""
+
+    def __init__(self, period_in_ms, log_configs, frame_cb):
+        self.period_in_ms = period_in_ms
+        self.log_configs = log_configs
+        self._frame_cb = frame_cb
+        self._frames = []
+        self.dropped_frames = 0
+
+    def add_data(self, timestamp, values, log_config):
+        names = log_config.variable_names
+        if len(self.log_configs) == 1:
+            self._frame_cb(timestamp, dict(zip(names, values)))
+            return
+
+        # Data from blocks with the same period belongs to the same sample
+        # if the timestamps are less than half a period apart
+        for frame in self._frames:
+            if (log_config not in frame.received and
+                    abs(timestamp - frame.timestamp) * 2 <
+                    self.period_in_ms):
+                break
+        else:
+            frame = _Frame(timestamp)
+            self._frames.append(frame)
+            if len(self._frames) > MAX_PENDING_FRAMES:
+                self._frames.pop(0)
+                self.dropped_frames += 1
+
+        frame.data.update(zip(names, values))
+        frame.received.add(log_config)
+        if len(frame.received) == len(self.log_configs):
+            # Older samples will not be completed any more
+            index = self._frames.index(frame)
+            self.dropped_frames += index
+            del self._frames[:index + 1]
+            self._frame_cb(frame.timestamp, frame.data)
+
+
+class LogSession(object):
+    """
+    Logs variables at one or more periods, without the size limit of a
+    LogConfig. Add the variables and start the session once connected;
+    data_received_cb is called with (timestamp, data, session) for every
+    period, data being a dict with the variables logged at that period.
+    """
+
+    def __init__(self, crazyflie, name='session'):
+        self.cf = crazyflie
+        self.name = name
+        self.data_received_cb = Caller()
+        self.error_cb = Caller()
+
+        # name -> [period_in_ms, fetch_as]
+        self._variables = {}
+        self._groups = []
+        self.log_configs = []
+        # (group, log_config) of the blocks added to the Crazyflie
+        self._added = []
+
+    def add_variable(self, name, period_in_ms, fetch_as=None):
+        """Add a variable to log at the given period. If it has already been
+        added the shortest period is used. fetch_as is the type the variable
+        should be fetched as, the type it's stored as if not given."""
+        if name in self._variables:
+            variable = self._variables[name]
+            variable[0] = min(variable[0], period_in_ms)
+            variable[1] = fetch_as or variable[1]
+        else:
+            self._variables[name] = [period_in_ms, fetch_as]
+
+    def _create_log_configs(self):
+        by_period = {}
+        for name, (period_in_ms, fetch_as) in self._variables.items():
+            if not fetch_as:
+                element = self.cf.log.toc.get_element_by_complete_name(name)
+                if not element:
+                    raise KeyError('Variable {} not in TOC'.format(name))
+                fetch_as = element.ctype
+            size = LogTocElement.get_size_from_id(
+                LogTocElement.get_id_from_cstring(fetch_as))
+            by_period.setdefault(period_in_ms, []).append(
+                (name, size, fetch_as))
+
+        max_count = _max_variables_per_block(
+            self.cf.platform.get_protocol_version() >= 4)
+        self._groups = []
+        self.log_configs = []
+        for period_in_ms in sorted(by_period):
+            variables = by_period[period_in_ms]
+            types = dict((name, fetch_as) for name, _, fetch_as in variables)
+            log_configs = []
+            for names in _pack_variables(
+                    [(name, size) for name, size, _ in variables],
+                    max_count=max_count):
+                log_config = LogConfig(
+                    '{}-{}'.format(self.name, len(self.log_configs)),
+                    period_in_ms, LogConfig.TUPLE)
+                for name in names:
+                    log_config.add_variable(name, types[name])
+                log_configs.append(log_config)
+                self.log_configs.append(log_config)
+            self._groups.append(
+                _PeriodGroup(period_in_ms, log_configs, self._frame_cb))
+
+    def start(self):
+        """
+        Create the log blocks in the Crazyflie and start logging. If a block
+        can not be added, the blocks already added are deleted and the error
+        is raised. If the Crazyflie fails to create a block, all the blocks
+        are deleted and error_cb is called.
+        """
+        self._create_log_configs()
+        try:
+            for group in self._groups:
+                for log_config in group.log_configs:
+                    self.cf.log.add_config(log_config)
+                    if not log_config.valid:
+                        raise Exception('Could not add log block {}'.format(
+                            log_config.name))
+                    log_config.data_received_cb.add_callback(group.add_data)
+                    log_config.error_cb.add_callback(self._error_cb)
+                    self._added.append((group, log_config))
+        except Exception:
+            self.delete()
+            raise
+        logger.debug('Logging %d variables in %d blocks',
+                     len(self._variables), len(self.log_configs))
+        for log_config in self.log_configs:
+            log_config.start()
+
+    def stop(self):
+        """Stop logging"""
+        for log_config in self.log_configs:
+            log_config.stop()
+
+    def delete(self):
+        """Delete the log blocks from the Crazyflie"""
+        added = self._added
+        self._added = []
+        for group, log_config in added:
+            log_config.data_received_cb.remove_callback(group.add_data)
+            log_config.error_cb.remove_callback(self._error_cb)
+            log_config.delete()
+
+    def _get_dropped_frames(self):
+        return sum(group.dropped_frames for group in self._groups)
+
+    # Number of samples that were dropped because the data of one of their
+    # blocks was not received
+    dropped_frames = property(_get_dropped_frames)
+
+    def _frame_cb(self, timestamp, data):
+        self.data_received_cb.call(timestamp, data, self)
+
+    def _error_cb(self, log_config, msg):
+        logger.warning('Log block %s of session %s failed (%s), deleting '
+                       'the session blocks', log_config.name, self.name, msg)
+        # Do not leave the session running with only some of its blocks
+        self.delete()
+        self.error_cb.call(self, msg)
@@ -34,8 +34,11 @@ the parameters that can be written/read.
 import logging
 import struct
 import sys
+from threading import Condition
+from threading import Event
 from threading import Lock
 from threading import Thread
+from threading import Timer
 
 from .toc import Toc
 from .toc import TocFetcher
@@ -63,6 +66,13 @@ TOC_CHANNEL = 0
 READ_CHANNEL = 1
 WRITE_CHANNEL = 2
 
+# Read-only parameters holding the unique id of the Crazyflie CPU, used to
+# find the values of this Crazyflie in the parameter value cache
+IDENTITY_PARAMS = ('cpu.id0', 'cpu.id1', 'cpu.id2')
+
+# Seconds to wait for more changes before saving the parameter value cache
+VALUE_CACHE_SAVE_DELAY = 0.5
+
 # One element entry in the TOC
 
 
@@ -140,14 +150,93 @@ class Param():
         self.all_updated = Caller()
         self.is_updated = False
 
+        # If True, parameter values are not fetched when connecting, only
+        # when requested (get_value(), request_group_update(), ...).
+        # all_updated is called once every value has been fetched.
+        self.lazy_fetch = False
+
+        # Values by group and name, as Python numbers
         self.values = {}
 
+        # ParamValueCache used by request_update_of_all_params(), None to
+        # not cache the values
+        self.value_cache = None
+        # Ids of the parameters whose value has been read from the Crazyflie
+        # since connecting
+        self._fetched = set()
+        self._identity_ids = None
+        # Complete names of the parameters written by the host, they are
+        # read again when connecting even if they are cached
+        self._written = set()
+        self._cache_saved = False
+        # The cache is saved from a timer thread, with the latest values
+        self._save_lock = Lock()
+        self._save_timer = None
+        self._pending_save = None
+
     def request_update_of_all_params(self):
-        """Request an update of all the parameters in the TOC"""
-        for group in self.toc.toc:
-            for name in self.toc.toc[group]:
-                complete_name = '%s.%s' % (group, name)
+        """
+        Request an update of all the parameters in the TOC.
+
+        With a value_cache, and if the Crazyflie reports its CPU id, only the
+        id is requested first. Once it is known, the values cached for this
+        Crazyflie are used and only the other values are read: the ones that
+        are not cached, the read-only ones that the firmware may change, and
+        the ones written by the host, that are back to their default if the
+        Crazyflie has been restarted. The cache is saved once all the values
+        are known, and again when a write is confirmed.
+        """
+        identity = []
+        if self.value_cache is not None and self.toc.crc is not None:
+            identity = [self.toc.get_element_by_complete_name(name)
+                        for name in IDENTITY_PARAMS]
+            if None in identity:
+                identity = []
+        self._identity_ids = set(element.ident for element in identity)
+
+        if identity:
+            # The other values are requested once the id is known
+            for element in identity:
+                self.param_updater.request_param_update(element.ident)
+            return
+        for elements in self.toc.toc.values():
+            for element in elements.values():
+                self.param_updater.request_param_update(element.ident)
+
+    def request_group_update(self, group):
+        """Request an update of all the parameters in a group"""
+        for name in self.toc.toc.get(group, {}):
+            complete_name = '%s.%s' % (group, name)
+            self.request_param_update(complete_name)
+
+    def get_value(self, complete_name, timeout=5):
+        """
+        Get the value of the supplied parameter. The value is fetched from the
+        Crazyflie if it has not been fetched before, in which case this
+        function blocks until it is available. Must not be called from a
+        callback.
+        """
+        element = self.toc.get_element_by_complete_name(complete_name)
+        if not element:
+            raise KeyError('{} not in param TOC'.format(complete_name))
+
+        fetched = Event()
+
+        def updated_cb(name, value):
+            fetched.set()
+
+        self.add_update_callback(element.group, element.name, updated_cb)
+        try:
+            if element.name not in self.values.get(element.group, {}):
                 self.request_param_update(complete_name)
+                if not fetched.wait(timeout):
+                    raise Exception(
+                        'Timeout waiting for {}'.format(complete_name))
+        finally:
+            self.remove_update_callback(element.group, element.name,
+                                        updated_cb)
+
+        return self.values[element.group][element.name]
 
     def _check_if_all_updated(self):
         """Check if all parameters from the TOC has at least been fetched
@@ -165,40 +254,122 @@ class Param():
         """Callback with data for an updated parameter"""
         if self._useV2:
             var_id = struct.unpack('<H', pk.data[:2])[0]
+            # V2 read answers have a status byte before the value
+            offset = 3 if pk.channel == READ_CHANNEL else 2
         else:
             var_id = pk.data[0]
+            offset = 1
         element = self.toc.get_element_by_id(var_id)
         if element:
-            if self._useV2:
-                s = struct.unpack(element.pytype, pk.data[2:])[0]
-            else:
-                s = struct.unpack(element.pytype, pk.data[1:])[0]
-            s = s.__str__()
-            complete_name = '%s.%s' % (element.group, element.name)
-
-            # Save the value for synchronous access
-            if element.group not in self.values:
-                self.values[element.group] = {}
-            self.values[element.group][element.name] = s
-
-            logger.debug('Updated parameter [%s]' % complete_name)
-            if complete_name in self.param_update_callbacks:
-                self.param_update_callbacks[complete_name].call(
-                    complete_name, s)
-            if element.group in self.group_update_callbacks:
-                self.group_update_callbacks[element.group].call(
-                    complete_name, s)
-            self.all_update_callback.call(complete_name, s)
-
-            # Once all the parameters are updated call the
-            # callback for "everything updated" (after all the param
-            # updated callbacks)
-            if self._check_if_all_updated() and not self.is_updated:
-                self.is_updated = True
-                self.all_updated.call()
+            value = struct.unpack(element.pytype, pk.data[offset:])[0]
+            self._set_value(element, value)
+            self._fetched.add(var_id)
+            if pk.channel == WRITE_CHANNEL:
+                self._written.add('%s.%s' % (element.group, element.name))
+            if self._identity_ids and self._identity_ids <= self._fetched:
+                self._identity_ids = None
+                self._request_uncached_values()
+            self._check_all_updated()
+            if (pk.channel == WRITE_CHANNEL or not self._cache_saved):
+                self._save_values()
         else:
             logger.debug('Variable id [%d] not found in TOC', var_id)
 
+    def _set_value(self, element, value):
+        """Save a new value and call the update callbacks with its string
+        representation"""
+        complete_name = '%s.%s' % (element.group, element.name)
+
+        # Save the value for synchronous access
+        if element.group not in self.values:
+            self.values[element.group] = {}
+        self.values[element.group][element.name] = value
+
+        s = value.__str__()
+        logger.debug('Updated parameter [%s]' % complete_name)
+        if complete_name in self.param_update_callbacks:
+            self.param_update_callbacks[complete_name].call(
+                complete_name, s)
+        if element.group in self.group_update_callbacks:
+            self.group_update_callbacks[element.group].call(
+                complete_name, s)
+        self.all_update_callback.call(complete_name, s)
+
+    def _check_all_updated(self):
+        # Once all the parameters are updated call the
+        # callback for "everything updated" (after all the param
+        # updated callbacks)
+        if self._check_if_all_updated() and not self.is_updated:
+            self.is_updated = True
+            self.all_updated.call()
+
+    def _has_identity(self):
+        for complete_name in IDENTITY_PARAMS:
+            [group, name] = complete_name.split('.')
+            if name not in self.values.get(group, {}):
+                return False
+        return True
+
+    def _identity(self):
+        """The CPU id of the Crazyflie as a string"""
+        identity = ''
+        for complete_name in IDENTITY_PARAMS:
+            [group, name] = complete_name.split('.')
+            identity += '%08X' % self.values[group][name]
+        return identity
+
+    def _request_uncached_values(self):
+        """Set the values that can be taken from the cache of this
+        Crazyflie and request the other ones"""
+        cached = self.value_cache.fetch(self.toc.crc, self._identity())
+        values, written = cached if cached is not None else ({}, [])
+        self._written.update(written)
+        for group, elements in self.toc.toc.items():
+            for name, element in elements.items():
+                if element.ident in self._fetched:
+                    continue
+                if (name in values.get(group, {}) and
+                        element.access == ParamTocElement.RW_ACCESS and
+                        '%s.%s' % (group, name) not in self._written):
+                    self._set_value(element, values[group][name])
+                else:
+                    self.param_updater.request_param_update(element.ident)
+
+    def _save_values(self):
+        """Save the values to the cache, from a timer thread, if all of
+        them are known"""
+        if (self.value_cache is None or self.toc.crc is None or
+                not self._has_identity() or
+                not self._check_if_all_updated()):
+            return
+        self._cache_saved = True
+        save = (self.toc.crc, self._identity(),
+                dict((group, dict(values))
+                     for group, values in self.values.items()),
+                sorted(self._written))
+        with self._save_lock:
+            self._pending_save = save
+            if self._save_timer is None:
+                self._save_timer = Timer(VALUE_CACHE_SAVE_DELAY,
+                                         self._write_values)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def _write_values(self):
+        with self._save_lock:
+            save = self._pending_save
+            self._pending_save = None
+            self._save_timer = None
+        if save is not None:
+            self.value_cache.insert(*save)
+
+    def _flush_values(self):
+        """Save the values waiting for the timer now"""
+        with self._save_lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+        self._write_values()
+
     def remove_update_callback(self, group, name=None, cb=None):
         """Remove the supplied callback for a group or a group.name"""
         if not cb:
@@ -234,6 +405,9 @@ class Param():
         Initiate a refresh of the parameter TOC.
         """
         self._useV2 = self.cf.platform.get_protocol_version() >= 4
+        # Requests are matched to answers by var id, whose size depends on
+        # the protocol version
+        self.param_updater.set_use_v2(self._useV2)
         toc_fetcher = TocFetcher(self.cf, ParamTocElement,
                                  CRTPPort.PARAM, self.toc,
                                  refresh_done_callback, toc_cache)
@@ -246,6 +420,11 @@ class Param():
         # Clear all values from the previous Crazyflie
         self.toc = Toc()
         self.values = {}
+        self._flush_values()
+        self._fetched = set()
+        self._identity_ids = None
+        self._written = set()
+        self._cache_saved = False
 
     def request_param_update(self, complete_name):
         """
@@ -254,10 +433,39 @@ class Param():
         self.param_updater.request_param_update(
             self.toc.get_element_id(complete_name))
 
-    def set_value(self, complete_name, value):
+    def set_value(self, complete_name, value, written_cb=None):
+        """
+        Set the value for the supplied parameter. written_cb(complete_name,
+        value) is called when the Crazyflie has confirmed the new value.
+        """
+        pk = self._write_packet(complete_name, value)
+        self.param_updater.request_param_setvalue(
+            pk, self._written_cb(complete_name, written_cb))
+
+    def set_values(self, values, written_cb=None):
         """
-        Set the value for the supplied parameter.
+        Set the values of several parameters, values is a dict with the
+        complete names as keys. Nothing is sent if one of the names is not
+        in the TOC or is read-only. written_cb(complete_name, value) is
+        called for each parameter when the Crazyflie has confirmed the new
+        value.
+
+        The writes are pipelined, and writes to a parameter that is still
+        waiting to be sent are merged with the new value.
         """
+        packets = [(complete_name, self._write_packet(complete_name, value))
+                   for complete_name, value in values.items()]
+        for complete_name, pk in packets:
+            self.param_updater.request_param_setvalue(
+                pk, self._written_cb(complete_name, written_cb))
+
+    def _written_cb(self, complete_name, written_cb):
+        if written_cb is None:
+            return None
+        [group, name] = complete_name.split('.')
+        return lambda: written_cb(complete_name, self.values[group][name])
+
+    def _write_packet(self, complete_name, value):
         element = self.toc.get_element_by_complete_name(complete_name)
 
         if not element:
@@ -268,78 +476,119 @@ class Param():
             logger.debug('[%s] is read only, no trying to set value',
                          complete_name)
             raise AttributeError('{} is read-only!'.format(complete_name))
-        else:
-            varid = element.ident
-            pk = CRTPPacket()
-            pk.set_header(CRTPPort.PARAM, WRITE_CHANNEL)
-            if self._useV2:
-                pk.data = struct.pack('<H', varid)
-            else:
-                pk.data = struct.pack('<B', varid)
-
-            try:
-                value_nr = eval(value)
-            except TypeError:
-                value_nr = value
 
-            pk.data += struct.pack(element.pytype, value_nr)
-            self.param_updater.request_param_setvalue(pk)
+        varid = element.ident
+        pk = CRTPPacket()
+        pk.set_header(CRTPPort.PARAM, WRITE_CHANNEL)
+        if self._useV2:
+            pk.data = struct.pack('<H', varid)
+        else:
+            pk.data = struct.pack('<B', varid)
+        pk.data += struct.pack(element.pytype,
+                               _parse_value(element, value))
+        return pk
+
+
+def _parse_value(element, value):
+    """Convert a value, possibly a string, to the type of the element"""
+    if element.pytype in ('<f', '<d'):
+        return float(value)
+    try:
+        # Strings are parsed as integer literals ('12', '0x0C', ...)
+        return int(value, 0)
+    except TypeError:
+        parsed = int(value)
+        if parsed != value:
+            raise ValueError('{}.{} is an integer, got {}'.format(
+                element.group, element.name, value))
+        return parsed
 
 
 class _ParamUpdater(Thread):
     """This thread will update params through a queue to make sure that we
-    get back values"""
+    get back values.
+
+    Up to the link's param_window_size requests are kept in flight. Replies
+    are matched to requests by variable id and only one request per variable
+    is in flight at any time, so requests for the same parameter are
+    answered in the order they were queued."""
 
     def __init__(self, cf, useV2, updated_callback):
         """Initialize the thread"""
         Thread.__init__(self)
         self.setDaemon(True)
-        self.wait_lock = Lock()
+        self.wait_cond = Condition()
         self.cf = cf
         self._useV2 = useV2
         self.updated_callback = updated_callback
         self.request_queue = Queue()
         self.cf.add_port_callback(CRTPPort.PARAM, self._new_packet_cb)
         self._should_close = False
-        self._req_param = -1
+        # Requests waiting for an answer, var_id -> (channel, callbacks)
+        self._in_flight = {}
+        # Queued writes, var_id -> (packet, callbacks)
+        self._pending_writes = {}
+        # Incremented on close to drop requests from the previous connection
+        self._generation = 0
 
     def close(self):
-        # First empty the queue from all packets
-        while not self.request_queue.empty():
-            self.request_queue.get()
-        # Then force an unlock of the mutex if we are waiting for a packet
-        # we didn't get back due to a disconnect for example.
-        try:
-            self.wait_lock.release()
-        except Exception:
-            pass
-
-    def request_param_setvalue(self, pk):
+        with self.wait_cond:
+            # First empty the queue from all packets
+            while not self.request_queue.empty():
+                self.request_queue.get()
+            # Then forget about requests we are waiting for, we will not
+            # get them back due to a disconnect for example.
+            self._in_flight.clear()
+            self._pending_writes.clear()
+            self._generation += 1
+            self.wait_cond.notify_all()
+
+    def request_param_setvalue(self, pk, written_cb=None):
         """Place a param set value request on the queue. When this is sent to
-        the Crazyflie it will answer with the update param value. """
-        self.request_queue.put(pk)
+        the Crazyflie it will answer with the update param value, and
+        written_cb is called. If a write to the same param is already in the
+        queue, its value is replaced instead."""
+        var_id = self._var_id(pk.data)
+        with self.wait_cond:
+            pending = self._pending_writes.get(var_id)
+            if pending is None:
+                pending = (pk, [])
+                self._pending_writes[var_id] = pending
+                self.request_queue.put(pk)
+            else:
+                pending[0].data = pk.data
+            if written_cb is not None:
+                pending[1].append(written_cb)
+
+    def set_use_v2(self, useV2):
+        """Set the protocol version of the requests"""
+        with self.wait_cond:
+            self._useV2 = useV2
+
+    def _var_id(self, data):
+        if self._useV2:
+            return struct.unpack('<H', data[:2])[0]
+        return data[0]
 
     def _new_packet_cb(self, pk):
         """Callback for newly arrived packets"""
         if pk.channel == READ_CHANNEL or pk.channel == WRITE_CHANNEL:
-            if self._useV2:
-                var_id = struct.unpack('<H', pk.data[:2])[0]
-                if pk.channel == READ_CHANNEL:
-                    pk.data = pk.data[:2] + pk.data[3:]
-            else:
-                var_id = pk.data[0]
-            if (pk.channel != TOC_CHANNEL and self._req_param == var_id and
-                    pk is not None):
-                self.updated_callback(pk)
-                self._req_param = -1
-                try:
-                    self.wait_lock.release()
-                except Exception:
-                    pass
+            var_id = self._var_id(pk.data)
+            with self.wait_cond:
+                request = self._in_flight.get(var_id)
+                if request is None or request[0] != pk.channel:
+                    return
+                del self._in_flight[var_id]
+                self.wait_cond.notify_all()
+            self.updated_callback(pk)
+            for callback in request[1]:
+                callback()
+
+    def _window_size(self):
+        return max(1, getattr(self.cf.link, 'param_window_size', 1))
 
     def request_param_update(self, var_id):
         """Place a param update request on the queue"""
-        self._useV2 = self.cf.platform.get_protocol_version() >= 4
         pk = CRTPPacket()
         pk.set_header(CRTPPort.PARAM, READ_CHANNEL)
         if self._useV2:
@@ -352,15 +601,24 @@ class _ParamUpdater(Thread):
     def run(self):
         while not self._should_close:
             pk = self.request_queue.get()  # Wait for request update
-            self.wait_lock.acquire()
-            if self.cf.link:
-                if self._useV2:
-                    self._req_param = struct.unpack('<H', pk.data[:2])[0]
-                    self.cf.send_packet(
-                        pk, expected_reply=(tuple(pk.data[:2])))
-                else:
-                    self._req_param = pk.data[0]
-                    self.cf.send_packet(
-                        pk, expected_reply=(tuple(pk.data[:1])))
-            else:
-                self.wait_lock.release()
+            if not self.cf.link:
+                continue
+            var_id = self._var_id(pk.data)
+            with self.wait_cond:
+                generation = self._generation
+                # Wait for a free slot in the window, and for any earlier
+                # request for the same parameter to be answered
+                while (var_id in self._in_flight or
+                       len(self._in_flight) >= self._window_size()):
+                    self.wait_cond.wait()
+                if generation != self._generation:
+                    continue
+                callbacks = []
+                pending = self._pending_writes.get(var_id)
+                if pending is not None and pending[0] is pk:
+                    del self._pending_writes[var_id]
+                    callbacks = pending[1]
+                self._in_flight[var_id] = (pk.channel, callbacks)
+            id_length = 2 if self._useV2 else 1
+            self.cf.send_packet(
+                pk, expected_reply=(tuple(pk.data[:id_length])))
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2020 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Scheduler used to resend packets that have not been answered.
+
+A single thread keeps a heap of deadlines and calls the retry callback of
+every request that has not been cancelled when its deadline expires. This
+replaces the threading.Timer (and the OS thread) that used to be created
+for every packet expecting an answer.
+"""
+import heapq
+import itertools
+import logging
+import time
+from threading import Condition
+from threading import current_thread
+from threading import Thread
+
+__author__ = 'Bitcraze AB'
+__all__ = ['RetryScheduler']
+
+logger = logging.getLogger(__name__)
+
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class _ScheduledRetry(object):
+    """Handle for a scheduled retry, mimics the cancel() of a Timer"""
+
+    __slots__ = ('callback', 'cancelled')
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        """Cancel the retry, the callback will not be called"""
+        self.cancelled = True
+
+
+class RetryScheduler(Thread):
+    """
+    Calls callbacks after a timeout from one shared thread.
+
+    Cancelled retries are left in the heap and discarded when they reach the
+    top, so cancelling is O(1) and scheduling is O(log n). The thread is
+    started on the first call to schedule().
+    """
+
+    def __init__(self):
+        Thread.__init__(self)
+        self.daemon = True
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = Condition()
+        self._thread_started = False
+        self._sp = False
+
+    def schedule(self, timeout, callback):
+        """Call callback in timeout seconds unless the returned handle is
+        cancelled before that"""
+        retry = _ScheduledRetry(callback)
+        with self._condition:
+            heapq.heappush(self._heap,
+                           (_clock() + timeout, next(self._counter), retry))
+            if not self._thread_started:
+                self._thread_started = True
+                self.start()
+            self._condition.notify()
+        return retry
+
+    def cancel_all(self):
+        """Cancel all the pending retries"""
+        with self._condition:
+            for _, _, retry in self._heap:
+                retry.cancel()
+            self._heap = []
+
+    def pending(self):
+        """Number of retries that are scheduled and not cancelled"""
+        with self._condition:
+            return sum(1 for _, _, retry in self._heap if not retry.cancelled)
+
+    def stop(self):
+        """Stop the scheduler thread, pending retries are dropped. Waits for
+        the thread to exit unless called from a retry callback."""
+        with self._condition:
+            self._sp = True
+            self._condition.notify()
+        if self._thread_started and current_thread() is not self:
+            self.join()
+
+    def _next_expired(self):
+        """Wait for the next retry to expire and return it, or None if the
+        scheduler has been stopped"""
+        with self._condition:
+            while not self._sp:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                deadline, _, retry = self._heap[0]
+                if retry.cancelled:
+                    heapq.heappop(self._heap)
+                    continue
+                delay = deadline - _clock()
+                if delay <= 0:
+                    heapq.heappop(self._heap)
+                    return retry
+                self._condition.wait(delay)
+        return None
+
+    def run(self):
+        while True:
+            retry = self._next_expired()
+            if retry is None:
+                break
+            if retry.cancelled:
+                continue
+            try:
+                retry.callback()
+            except Exception:  # pylint: disable=W0703
+                import traceback
+
+                logger.error('Exception in retry callback\n\n%s',
+                             traceback.format_exc())
@@ -21,6 +21,8 @@
 #  along with this program; if not, write to the Free Software
 #  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
 #  MA  02110-1301, USA.
+from threading import Event
+from threading import Lock
 from threading import Thread
 
 from cflib.crazyflie import Crazyflie
@@ -183,6 +185,35 @@ class Swarm:
             raise Exception('One or more threads raised an exception when '
                             'executing parallel task')
 
+    def set_param_values(self, values, timeout=5):
+        """
+        Set parameter values on all Crazyflies in the swarm, in parallel, and
+        wait for all Crazyflies to confirm the new values. Raises an
+        exception if a Crazyflie did not confirm all values within the
+        timeout.
+
+        :param values: dict of values keyed on complete parameter names
+        :param timeout: time to wait for the confirmations, in seconds
+        """
+        args_dict = dict((uri, [values, timeout]) for uri in self._cfs)
+        self.parallel_safe(self._set_param_values, args_dict)
+
+    def _set_param_values(self, scf, values, timeout):
+        remaining = set(values)
+        lock = Lock()
+        done = Event()
+
+        def written_cb(name, value):
+            with lock:
+                remaining.discard(name)
+                if not remaining:
+                    done.set()
+
+        if values:
+            scf.cf.param.set_values(values, written_cb)
+            if not done.wait(timeout):
+                raise Exception('Timeout while setting parameters')
+
     def _thread_function_wrapper(self, *args):
         try:
             func = args[0]
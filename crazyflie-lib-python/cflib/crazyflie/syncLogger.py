@@ -28,26 +28,136 @@ This class provides synchronous access to log data from the Crazyflie.
 
 It acts as an iterator and returns the next value on each iteration.
 If no value is available it blocks until log data is received again.
+
+The received samples are buffered until they are read. The buffer can be
+bounded, samples are then dropped according to a drop policy when it is
+full.
 """
-import sys
+import time
+from collections import deque
+from collections import OrderedDict
+from threading import Condition
 
 from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
 
-if sys.version_info < (3,):
-    from Queue import Queue
-else:
-    from queue import Queue
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class _SampleBuffer:
+    """Buffer of (timestamp, data, log config) samples, with a maximum
+    size and a drop policy"""
+
+    def __init__(self, max_size, drop_policy):
+        self._max_size = max_size
+        self._drop_policy = drop_policy
+        self._samples = deque()
+        # Log config -> latest sample, in the order the samples were
+        # received, used instead of _samples when keeping the latest samples
+        self._latest = OrderedDict()
+        self._condition = Condition()
+        self.dropped = 0
+        self.dropped_by_config = {}
+
+    def _count_dropped(self, sample):
+        self.dropped += 1
+        log_config = sample[2]
+        self.dropped_by_config[log_config] = \
+            self.dropped_by_config.get(log_config, 0) + 1
+
+    def _is_full(self):
+        return (self._max_size is not None and
+                len(self._samples) + len(self._latest) >= self._max_size)
+
+    def put(self, sample):
+        with self._condition:
+            if self._drop_policy == SyncLogger.KEEP_LATEST:
+                log_config = sample[2]
+                replaced = self._latest.pop(log_config, None)
+                if replaced is not None:
+                    self._count_dropped(replaced)
+                elif self._is_full():
+                    self._count_dropped(self._latest.popitem(last=False)[1])
+                self._latest[log_config] = sample
+            else:
+                if self._is_full():
+                    if self._drop_policy == SyncLogger.DROP_NEWEST:
+                        self._count_dropped(sample)
+                        return
+                    self._count_dropped(self._samples.popleft())
+                self._samples.append(sample)
+            self._condition.notify()
+
+    def put_event(self, event):
+        """Add an event, that is never dropped. Events are returned after
+        the samples received before them."""
+        with self._condition:
+            self._samples.append(event)
+            self._condition.notify()
+
+    def _has_data(self):
+        return bool(self._samples or self._latest)
+
+    def _peek(self):
+        if self._latest:
+            return next(iter(self._latest.values()))
+        return self._samples[0]
+
+    def _pop(self):
+        if self._latest:
+            return self._latest.popitem(last=False)[1]
+        return self._samples.popleft()
+
+    def get(self):
+        with self._condition:
+            while not self._has_data():
+                self._condition.wait()
+            return self._pop()
+
+    def get_many(self, max_count, timeout, stop_event):
+        """Get up to max_count samples, waiting at most timeout seconds for
+        the first one. Samples after stop_event are not returned."""
+        with self._condition:
+            if timeout is not None:
+                deadline = _clock() + timeout
+            while not self._has_data():
+                if timeout is None:
+                    self._condition.wait()
+                else:
+                    remaining = deadline - _clock()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+            samples = []
+            while self._has_data() and (max_count is None or
+                                        len(samples) < max_count):
+                if self._peek() == stop_event:
+                    break
+                samples.append(self._pop())
+            return samples
+
+    def clear(self):
+        with self._condition:
+            self._samples.clear()
+            self._latest.clear()
 
 
 class SyncLogger:
     DISCONNECT_EVENT = 'DISCONNECT_EVENT'
 
-    def __init__(self, crazyflie, log_config):
+    # Drop policies used when the buffer is full
+    DROP_OLDEST = 0
+    DROP_NEWEST = 1
+    KEEP_LATEST = 2  # Keep only the latest sample of each log configuration
+
+    def __init__(self, crazyflie, log_config, max_size=None,
+                 drop_policy=DROP_OLDEST):
         """
         Construct an instance of a SyncLogger
 
         Takes an Crazyflie or SyncCrazyflie instance and one log configuration
-        or an array of log configurations
+        or an array of log configurations. At most max_size samples are
+        buffered if it is given, the drop policy tells which samples are
+        dropped when the buffer is full.
         """
         if isinstance(crazyflie, SyncCrazyflie):
             self._cf = crazyflie.cf
@@ -59,7 +169,7 @@ class SyncLogger:
         else:
             self._log_config = [log_config]
 
-        self._queue = Queue()
+        self._queue = _SampleBuffer(max_size, drop_policy)
 
         self._is_connected = False
 
@@ -91,6 +201,30 @@ class SyncLogger:
     def is_connected(self):
         return self._is_connected
 
+    def _get_dropped(self):
+        return self._queue.dropped
+
+    # Number of samples dropped because the buffer was full
+    dropped = property(_get_dropped)
+
+    def _get_dropped_by_config(self):
+        return dict(self._queue.dropped_by_config)
+
+    # Number of samples dropped, per log configuration
+    dropped_by_config = property(_get_dropped_by_config)
+
+    def get_many(self, max_count=None, timeout=None):
+        """
+        Get the buffered samples, at most max_count if given. Blocks until
+        a sample is available, at most timeout seconds if given. Returns an
+        empty list on timeout or when disconnected.
+        """
+        if not self._is_connected:
+            return []
+
+        return self._queue.get_many(max_count, timeout,
+                                    self.DISCONNECT_EVENT)
+
     def __iter__(self):
         return self
 
@@ -104,7 +238,7 @@ class SyncLogger:
         data = self._queue.get()
 
         if data == self.DISCONNECT_EVENT:
-            self._queue.empty()
+            self._queue.clear()
             raise StopIteration
 
         return data
@@ -115,11 +249,11 @@ class SyncLogger:
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.disconnect()
-        self._queue.empty()
+        self._queue.clear()
 
     def _log_callback(self, ts, data, logblock):
         self._queue.put((ts, data, logblock))
 
     def _disconnected(self, link_uri):
         self.disconnect()
-        self._queue.put(self.DISCONNECT_EVENT)
+        self._queue.put_event(self.DISCONNECT_EVENT)
@@ -52,38 +52,126 @@ GET_TOC_INFO = 'GET_TOC_INFO'
 GET_TOC_ELEMENT = 'GET_TOC_ELEMENT'
 
 
-class Toc:
-    """Container for TocElements."""
+class Toc(object):
+    """Container for TocElements.
+
+    Besides the group/name structure in toc, indices by id and by complete
+    name are kept so that lookups are constant time. The indices are rebuilt
+    when toc is assigned (for instance from the cache), elements should
+    otherwise be added with add_element().
+
+    A Toc can share its content with other instances, see share_from(), and
+    can create its elements on demand, see set_source().
+    """
 
     def __init__(self):
+        self._toc = {}
+        self._elements_by_id = {}
+        self._elements_by_name = {}
+        self._shared = False
+        self._source = None
+        # CRC of the TOC as reported by the Crazyflie, None if not known
+        self.crc = None
+
+    def _get_toc(self):
+        if self._source is not None:
+            self._load_all()
+        return self._toc
+
+    def _set_toc(self, toc):
+        self._toc = toc
+        self._elements_by_id = {}
+        self._elements_by_name = {}
+        self._shared = False
+        self._source = None
+        for group in toc.values():
+            for element in group.values():
+                self._index_element(element)
+
+    toc = property(_get_toc, _set_toc)
+
+    def set_source(self, source):
+        """Replace the content with the elements of source, which are only
+        created when they are looked up or when toc is accessed. source
+        provides element_by_id(ident), element_by_name(complete_name) and
+        elements(), and must return the same object for an element every
+        time."""
         self.toc = {}
+        self._source = source
+
+    def _add_loaded(self, element):
+        self._toc.setdefault(element.group, {})[element.name] = element
+        self._index_element(element)
+        return element
+
+    def _load_all(self):
+        for element in self._source.elements():
+            self._add_loaded(element)
+        self._source = None
 
     def clear(self):
         """Clear the TOC"""
         self.toc = {}
+        self.crc = None
+
+    def share_from(self, other):
+        """Use the elements and indices of other without copying them. The
+        content is copied the first time an element is added to either of
+        the instances."""
+        other._shared = True
+        self._toc = other._toc
+        self._elements_by_id = other._elements_by_id
+        self._elements_by_name = other._elements_by_name
+        self._source = other._source
+        self._shared = True
+
+    def _unshare(self):
+        self._toc = dict((group, dict(elements))
+                         for group, elements in self._toc.items())
+        self._elements_by_id = dict(self._elements_by_id)
+        self._elements_by_name = dict(self._elements_by_name)
+        self._shared = False
+
+    def _index_element(self, element):
+        self._elements_by_id[element.ident] = element
+        self._elements_by_name[
+            '{}.{}'.format(element.group, element.name)] = element
 
     def add_element(self, element):
         """Add a new TocElement to the TOC container."""
+        if self._source is not None:
+            self._load_all()
+        if self._shared:
+            self._unshare()
         try:
-            self.toc[element.group][element.name] = element
+            old_element = self._toc[element.group].get(element.name)
         except KeyError:
-            self.toc[element.group] = {}
-            self.toc[element.group][element.name] = element
+            self._toc[element.group] = {}
+            old_element = None
+        if (old_element is not None and
+                self._elements_by_id.get(old_element.ident) is old_element):
+            del self._elements_by_id[old_element.ident]
+        self._toc[element.group][element.name] = element
+        self._index_element(element)
 
     def get_element_by_complete_name(self, complete_name):
         """Get a TocElement element identified by complete name from the
         container."""
-        try:
-            return self.get_element_by_id(self.get_element_id(complete_name))
-        except ValueError:
-            # Item not found
-            return None
+        element = self._elements_by_name.get(complete_name)
+        if element is None and self._source is not None:
+            element = self._source.element_by_name(complete_name)
+            if element is not None:
+                self._add_loaded(element)
+        return element
 
     def get_element_id(self, complete_name):
         """Get the TocElement element id-number of the element with the
         supplied name."""
-        [group, name] = complete_name.split('.')
-        element = self.get_element(group, name)
+        element = self.get_element_by_complete_name(complete_name)
+        if element is None:
+            # Raises ValueError for names that are not on group.name form
+            [group, name] = complete_name.split('.')
+            element = self.get_element(group, name)
         if element:
             return element.ident
         else:
@@ -94,18 +182,22 @@ class Toc:
         """Get a TocElement element identified by name and group from the
         container."""
         try:
-            return self.toc[group][name]
+            return self._toc[group][name]
         except KeyError:
-            return None
+            if self._source is None:
+                return None
+            return self.get_element_by_complete_name(
+                '{}.{}'.format(group, name))
 
     def get_element_by_id(self, ident):
         """Get a TocElement element identified by index number from the
         container."""
-        for group in list(self.toc.keys()):
-            for name in list(self.toc[group].keys()):
-                if self.toc[group][name].ident == ident:
-                    return self.toc[group][name]
-        return None
+        element = self._elements_by_id.get(ident)
+        if element is None and self._source is not None:
+            element = self._source.element_by_id(ident)
+            if element is not None:
+                self._add_loaded(element)
+        return element
 
 
 class TocFetcher:
@@ -124,12 +216,21 @@ class TocFetcher:
         self.finished_callback = finished_callback
         self.element_class = element_class
         self._useV2 = False
+        # Number of element requests kept in flight
+        self._window_size = 1
+        self._next_index = 0
+        self._in_flight = set()
+        self._nbr_of_received = 0
 
     def start(self):
         """Initiate fetching of the TOC."""
         self._useV2 = self.cf.platform.get_protocol_version() >= 4
+        self._window_size = max(
+            1, getattr(self.cf.link, 'toc_window_size', 1))
 
         logger.debug('[%d]: Using V2 protocol: %d', self.port, self._useV2)
+        logger.debug('[%d]: Using request window of %d', self.port,
+                     self._window_size)
 
         logger.debug('[%d]: Start fetching...', self.port)
         # Register callback in this class for the port
@@ -168,41 +269,61 @@ class TocFetcher:
                     '<BI', payload[:5])
             logger.debug('[%d]: Got TOC CRC, %d items and crc=0x%08X',
                          self.port, self.nbr_of_items, self._crc)
+            self.toc.crc = self._crc
 
-            cache_data = self._toc_cache.fetch(self._crc)
-            if (cache_data):
-                self.toc.toc = cache_data
+            cached_toc = self._toc_cache.fetch_toc(self._crc)
+            if (cached_toc is not None and cached_toc.toc):
+                self.toc.share_from(cached_toc)
                 logger.info('TOC for port [%s] found in cache' % self.port)
                 self._toc_fetch_finished()
+            elif self.nbr_of_items == 0:
+                self._toc_cache.insert(self._crc, self.toc.toc)
+                self._toc_fetch_finished()
             else:
                 self.state = GET_TOC_ELEMENT
-                self.requested_index = 0
-                self._request_toc_element(self.requested_index)
+                self._next_index = 0
+                self._in_flight = set()
+                self._nbr_of_received = 0
+                # Fill the request window, the replies can then arrive in
+                # any order
+                while (self._next_index < self.nbr_of_items and
+                       len(self._in_flight) < self._window_size):
+                    self._request_next_toc_element()
 
         elif (self.state == GET_TOC_ELEMENT):
-            # Always add new element, but only request new if it's not the
-            # last one.
             if self._useV2:
                 ident = struct.unpack('<H', payload[:2])[0]
             else:
                 ident = payload[0]
 
-            if ident != self.requested_index:
+            # Ignore duplicates and replies to requests we have not sent
+            if ident not in self._in_flight:
                 return
+            self._in_flight.discard(ident)
+            self._nbr_of_received += 1
+
             if self._useV2:
                 self.toc.add_element(self.element_class(ident, payload[2:]))
             else:
                 self.toc.add_element(self.element_class(ident, payload[1:]))
             logger.debug('Added element [%s]', ident)
-            if (self.requested_index < (self.nbr_of_items - 1)):
-                logger.debug('[%d]: More variables, requesting index %d',
-                             self.port, self.requested_index + 1)
-                self.requested_index = self.requested_index + 1
-                self._request_toc_element(self.requested_index)
-            else:  # No more variables in TOC
+
+            if self._next_index < self.nbr_of_items:
+                self._request_next_toc_element()
+            elif self._nbr_of_received == self.nbr_of_items:
+                # No more variables in TOC
                 self._toc_cache.insert(self._crc, self.toc.toc)
                 self._toc_fetch_finished()
 
+    def _request_next_toc_element(self):
+        """Request the next element that has not been requested yet. Lost
+        requests are resent by the Crazyflie retry mechanism."""
+        index = self._next_index
+        self._next_index += 1
+        self._in_flight.add(index)
+        self.requested_index = index
+        self._request_toc_element(index)
+
     def _request_toc_element(self, index):
         """Request information about a specific item in the TOC"""
         logger.debug('Requesting index %d on port %d', index, self.port)
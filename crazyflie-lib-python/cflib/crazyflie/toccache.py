@@ -27,97 +27,405 @@
 """
 Access the TOC cache for reading/writing. It supports both user
 cache and dist cache.
+
+TOCs are stored in a binary format (<CRC>.toc): a header, one fixed size
+record per element and a table of the strings used by the records. The
+files are memory mapped and the elements are only created when they are
+looked up, the strings shared by several elements are decoded once.
+
+When a cache directory is used, TOCs that have been read or downloaded are
+also kept in memory and shared by all the TocCache instances of the process,
+so that a TOC used by several Crazyflies is only parsed once.
+
+JSON files (<CRC>.json) written by earlier versions are still read, and can
+be converted with convert_json_cache().
+
+The parameter values read from a Crazyflie can be cached in the same
+directory with ParamValueCache, keyed by the param TOC CRC and the identity
+of the Crazyflie, its unique CPU id (<CRC>-<identity hash>.params).
 """
+import hashlib
 import json
 import logging
+import mmap
 import os
+import re
+import struct
+import sys
+import threading
 from glob import glob
 
-from .log import LogTocElement  # noqa
-from .param import ParamTocElement  # noqa
+from .log import LogTocElement
+from .param import ParamTocElement
+from .toc import Toc
 
 __author__ = 'Bitcraze AB'
-__all__ = ['TocCache']
+__all__ = ['TocCache', 'ParamValueCache', 'convert_json_cache',
+           'clear_shared_tocs']
 
 logger = logging.getLogger(__name__)
 
+# Classes that can be stored in the cache, looked up by name instead of
+# evaluating the name found in the file
+_ELEMENT_CLASSES = [LogTocElement, ParamTocElement]
+_ELEMENT_CLASS_BY_NAME = dict((c.__name__, c) for c in _ELEMENT_CLASSES)
+
+_MAGIC = b'CFTC'
+_VERSION = 1
+# magic, version, number of elements, offset of the string table
+_HEADER = struct.Struct('<4sBxxxII')
+# ident, class index, access, then offset and length of group, name, ctype
+# and pytype in the string table
+_RECORD = struct.Struct('<HBBIHIHIHIH')
+_IDENT = struct.Struct('<H')
+
+# CRC -> Toc, shared by all the TocCache instances
+_shared_tocs = {}
+_shared_tocs_lock = threading.Lock()
+
+_CACHE_FILE_RE = re.compile('([0-9A-Fa-f]{8})\\.(json|toc)$')
+
+
+def _decode_string(data):
+    if sys.version_info < (3,):
+        return data
+    return data.decode('UTF-8')
+
+
+def _encode_string(string):
+    if sys.version_info < (3,):
+        return string
+    return string.encode('UTF-8')
+
+
+class _BinaryTocFile(object):
+    """
+    Read access to a memory mapped binary TOC file, used as the source of a
+    Toc. An element is created from its record the first time it is looked
+    up, by id or by name, and the same object is returned afterwards.
+    """
+
+    def __init__(self, filename):
+        with open(filename, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._map) < _HEADER.size:
+                raise ValueError('Truncated TOC cache file')
+            magic, version, self._count, self._strings_offset = \
+                _HEADER.unpack_from(self._map, 0)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError('Not a version {} TOC cache file'.format(
+                    _VERSION))
+            if (_HEADER.size + self._count * _RECORD.size >
+                    self._strings_offset or
+                    self._strings_offset > len(self._map)):
+                raise ValueError('Truncated TOC cache file')
+        except Exception:
+            self._map.close()
+            raise
+        self._strings = {}
+        self._elements = [None] * self._count
+        # Record index by complete name, built on the first lookup by name
+        self._names = None
+        # Record index of the ids that are not the index of their record
+        self._ids = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def _string(self, offset, length):
+        key = (offset, length)
+        string = self._strings.get(key)
+        if string is None:
+            start = self._strings_offset + offset
+            string = _decode_string(self._map[start:start + length])
+            self._strings[key] = string
+        return string
+
+    def _record(self, index):
+        return _RECORD.unpack_from(self._map,
+                                   _HEADER.size + index * _RECORD.size)
+
+    def _ident(self, index):
+        return _IDENT.unpack_from(self._map,
+                                  _HEADER.size + index * _RECORD.size)[0]
+
+    def _element(self, index):
+        elem = self._elements[index]
+        if elem is None:
+            (ident, class_index, access,
+             group_offset, group_length, name_offset, name_length,
+             ctype_offset, ctype_length, pytype_offset, pytype_length) = \
+                self._record(index)
+            elem = _ELEMENT_CLASSES[class_index]()
+            elem.ident = ident
+            elem.group = self._string(group_offset, group_length)
+            elem.name = self._string(name_offset, name_length)
+            elem.ctype = self._string(ctype_offset, ctype_length)
+            elem.pytype = self._string(pytype_offset, pytype_length)
+            elem.access = access
+            self._elements[index] = elem
+        return elem
+
+    def element_by_id(self, ident):
+        """Get the element with id ident, None if there is none"""
+        with self._lock:
+            # The elements of a TOC are usually stored in id order
+            if ident < self._count and self._ident(ident) == ident:
+                return self._element(ident)
+            if self._ids is None:
+                self._ids = dict((self._ident(index), index)
+                                 for index in range(self._count))
+            index = self._ids.get(ident)
+            if index is None:
+                return None
+            return self._element(index)
+
+    def element_by_name(self, complete_name):
+        """Get the element named group.name, None if there is none"""
+        with self._lock:
+            if self._names is None:
+                self._names = {}
+                for index in range(self._count):
+                    record = self._record(index)
+                    name = '{}.{}'.format(self._string(*record[3:5]),
+                                          self._string(*record[5:7]))
+                    self._names[name] = index
+            index = self._names.get(complete_name)
+            if index is None:
+                return None
+            return self._element(index)
+
+    def elements(self):
+        """Get all the elements"""
+        with self._lock:
+            return [self._element(index) for index in range(self._count)]
+
+
+def _write_binary_toc(filename, toc):
+    """Write the group/name dictionary toc to filename"""
+    records = []
+    strings = bytearray()
+    string_offsets = {}
+
+    def add_string(string):
+        if string not in string_offsets:
+            encoded = _encode_string(string)
+            string_offsets[string] = (len(strings), len(encoded))
+            strings.extend(encoded)
+        return string_offsets[string]
+
+    for group in toc.values():
+        for elem in group.values():
+            class_index = _ELEMENT_CLASSES.index(
+                _ELEMENT_CLASS_BY_NAME[elem.__class__.__name__])
+            fields = [elem.ident, class_index, elem.access]
+            for string in (elem.group, elem.name, elem.ctype, elem.pytype):
+                fields.extend(add_string(string))
+            records.append(_RECORD.pack(*fields))
+
+    with open(filename, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(records),
+                             _HEADER.size + len(records) * _RECORD.size))
+        for record in records:
+            f.write(record)
+        f.write(strings)
+
+
+def _read_json_toc(filename):
+    """Read a TOC in the JSON format used by earlier versions"""
+    with open(filename) as f:
+        return json.load(f, object_hook=_json_decoder)
+
+
+def _json_decoder(obj):
+    """ Decode a toc element leaf-node """
+    if '__class__' in obj:
+        elem = _ELEMENT_CLASS_BY_NAME[obj['__class__']]()
+        elem.ident = obj['ident']
+        elem.group = str(obj['group'])
+        elem.name = str(obj['name'])
+        elem.ctype = str(obj['ctype'])
+        elem.pytype = str(obj['pytype'])
+        elem.access = obj['access']
+        return elem
+    return obj
+
+
+def convert_json_cache(path, remove_json=False):
+    """
+    Convert all the JSON cache files in the directory path to the binary
+    format. Returns the list of written files.
+    """
+    converted = []
+    for json_file in glob(os.path.join(path, '*.json')):
+        try:
+            toc = _read_json_toc(json_file)
+            binary_file = json_file[:-len('.json')] + '.toc'
+            _write_binary_toc(binary_file, toc)
+        except Exception as exp:
+            logger.warning('Could not convert cache file [%s]: %s',
+                           json_file, str(exp))
+            continue
+        converted.append(binary_file)
+        if remove_json:
+            os.remove(json_file)
+    return converted
+
+
+def clear_shared_tocs():
+    """Forget the TOCs kept in memory by the TocCache instances"""
+    with _shared_tocs_lock:
+        _shared_tocs.clear()
+
 
 class TocCache():
     """
-    Access to TOC cache. To turn of the cache functionality
-    don't supply any directories.
+    Access to TOC cache. To turn of the cache functionality, including the
+    sharing of TOCs between instances, don't supply any directories.
     """
 
     def __init__(self, ro_cache=None, rw_cache=None):
-        self._cache_files = []
+        # CRC -> file, files in the rw cache take precedence over the ro
+        # cache and binary files over JSON files
+        self._cache_files = {}
         if (ro_cache):
-            self._cache_files += glob(ro_cache + '/*.json')
+            self._add_cache_files(ro_cache)
         if (rw_cache):
-            self._cache_files += glob(rw_cache + '/*.json')
+            self._add_cache_files(rw_cache)
             if not os.path.exists(rw_cache):
                 os.makedirs(rw_cache)
 
         self._rw_cache = rw_cache
+        self._enabled = bool(ro_cache or rw_cache)
+
+    def _add_cache_files(self, path):
+        for extension in ('json', 'toc'):
+            for name in glob(os.path.join(path, '*.' + extension)):
+                match = _CACHE_FILE_RE.search(name)
+                if match:
+                    self._cache_files[int(match.group(1), 16)] = name
+
+    def _open(self, crc):
+        """ Get a Toc reading the cache file of crc, None if there is none.
+        The elements of a binary file are created on demand. """
+        hit = self._cache_files.get(crc)
+        if not hit:
+            return None
+
+        toc = Toc()
+        try:
+            if hit.endswith('.toc'):
+                toc.set_source(_BinaryTocFile(hit))
+            else:
+                toc.toc = _read_json_toc(hit)
+        except Exception as exp:
+            logger.warning('Error while parsing cache file [%s]:%s',
+                           hit, str(exp))
+            return None
+        return toc
 
     def fetch(self, crc):
         """ Try to get a hit in the cache, return None otherwise """
-        cache_data = None
-        pattern = '%08X.json' % crc
-        hit = None
+        toc = self._open(crc)
+        if toc is None:
+            return None
+        return toc.toc
 
-        for name in self._cache_files:
-            if (name.endswith(pattern)):
-                hit = name
+    def fetch_toc(self, crc):
+        """
+        Get the TOC with the given CRC as a Toc shared with the other
+        Crazyflie instances of the process, return None if it is neither in
+        memory nor in the cache files. The returned Toc must not be modified,
+        use Toc.share_from() to get a Toc that can.
+        """
+        if not self._enabled:
+            return None
 
-        if (hit):
-            try:
-                cache = open(hit)
-                cache_data = json.load(cache,
-                                       object_hook=self._decoder)
-                cache.close()
-            except Exception as exp:
-                logger.warning('Error while parsing cache file [%s]:%s',
-                               hit, str(exp))
-
-        return cache_data
+        with _shared_tocs_lock:
+            toc = _shared_tocs.get(crc)
+            if toc is None:
+                toc = self._open(crc)
+                if toc is None:
+                    return None
+                _shared_tocs[crc] = toc
+        return toc
 
     def insert(self, crc, toc):
         """ Save a new cache to file """
+        if not self._enabled:
+            return
+
+        shared_toc = Toc()
+        shared_toc.toc = dict((group, dict(elements))
+                              for group, elements in toc.items())
+        with _shared_tocs_lock:
+            _shared_tocs[crc] = shared_toc
+
         if self._rw_cache:
             try:
-                filename = '%s/%08X.json' % (self._rw_cache, crc)
-                cache = open(filename, 'w')
-                cache.write(json.dumps(toc, indent=2,
-                                       default=self._encoder))
-                cache.close()
+                filename = '%s/%08X.toc' % (self._rw_cache, crc)
+                _write_binary_toc(filename, toc)
                 logger.info('Saved cache to [%s]', filename)
-                self._cache_files += [filename]
+                self._cache_files[crc] = filename
             except Exception as exp:
                 logger.warning('Could not save cache to file [%s]: %s',
                                filename, str(exp))
         else:
             logger.warning('Could not save cache, no writable directory')
 
-    def _encoder(self, obj):
-        """ Encode a toc element leaf-node """
-        return {'__class__': obj.__class__.__name__,
-                'ident': obj.ident,
-                'group': obj.group,
-                'name': obj.name,
-                'ctype': obj.ctype,
-                'pytype': obj.pytype,
-                'access': obj.access}
-        raise TypeError(repr(obj) + ' is not JSON serializable')
-
-    def _decoder(self, obj):
-        """ Decode a toc element leaf-node """
-        if '__class__' in obj:
-            elem = eval(obj['__class__'])()
-            elem.ident = obj['ident']
-            elem.group = str(obj['group'])
-            elem.name = str(obj['name'])
-            elem.ctype = str(obj['ctype'])
-            elem.pytype = str(obj['pytype'])
-            elem.access = obj['access']
-            return elem
-        return obj
+
+class ParamValueCache():
+    """
+    Access to the parameter value cache. To turn of the cache functionality
+    don't supply a directory.
+    """
+
+    def __init__(self, rw_cache=None):
+        if rw_cache and not os.path.exists(rw_cache):
+            os.makedirs(rw_cache)
+        self._rw_cache = rw_cache
+
+    def _filename(self, crc, identity):
+        digest = hashlib.sha1(identity.encode('utf-8')).hexdigest()
+        return os.path.join(self._rw_cache,
+                            '%08X-%s.params' % (crc, digest[:16]))
+
+    def fetch(self, crc, identity):
+        """
+        Get the values cached for the param TOC CRC and Crazyflie identity,
+        as a {group: {name: value}} dict, and the list of the complete names
+        of the params written by the host. Return None if there are none.
+        """
+        if not self._rw_cache:
+            return None
+
+        filename = self._filename(crc, identity)
+        if not os.path.exists(filename):
+            return None
+        try:
+            with open(filename) as f:
+                cache = json.load(f)
+            if cache['crc'] == crc and cache['identity'] == identity:
+                return cache['values'], cache.get('written', [])
+        except Exception as exp:
+            logger.warning('Error while parsing cache file [%s]:%s',
+                           filename, str(exp))
+        return None
+
+    def insert(self, crc, identity, values, written=()):
+        """ Save the values, and the names of the params written by the
+        host, to file """
+        if not self._rw_cache:
+            return
+
+        filename = self._filename(crc, identity)
+        try:
+            with open(filename, 'w') as f:
+                json.dump({'crc': crc, 'identity': identity,
+                           'values': values, 'written': list(written)}, f)
+            logger.info('Saved param values to [%s]', filename)
+        except Exception as exp:
+            logger.warning('Could not save param values to file [%s]: %s',
+                           filename, str(exp))
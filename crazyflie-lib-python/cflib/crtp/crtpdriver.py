@@ -38,6 +38,13 @@ class CRTPDriver:
     This class in inherited by all the CRTP link drivers.
     """
 
+    # Number of TOC element requests that are kept in flight when fetching a
+    # TOC over this type of link. Can be changed per driver class.
+    toc_window_size = 1
+    # Number of parameter read/write requests that are kept in flight over
+    # this type of link. Can be changed per driver class.
+    param_window_size = 1
+
     def __init__(self):
         """Driver constructor. Throw an exception if the driver is unable to
         open the URI
@@ -57,21 +57,43 @@ class CRTPPort:
 class CRTPPacket(object):
     """
     A packet that can be sent via the CRTP.
+
+    Packets created from a received buffer (see from_buffer) wrap the buffer
+    without copying it and expose data as a read-only memoryview. Packets
+    created by the library for sending keep a mutable bytearray.
     """
 
+    __slots__ = ('size', 'header', '_port', '_channel', '_data')
+
     def __init__(self, header=0, data=None):
         """
         Create an empty packet with default values.
         """
         self.size = 0
         self._data = bytearray()
+        self._set_raw_header(header)
+        if data:
+            self._set_data(data)
+
+    @classmethod
+    def from_buffer(cls, buf):
+        """
+        Create a packet from a raw CRTP frame (header byte followed by the
+        payload). On Python 3 the payload is not copied, the packet holds a
+        read-only view into buf, so buf must not be reused while the packet
+        is in use.
+        """
+        pk = cls(buf[0])
+        pk._data = _readonly_view(buf, 1)
+        return pk
+
+    def _set_raw_header(self, header):
+        """Set port, channel and header from a header byte"""
         # The two bits in position 3 and 4 needs to be set for legacy
         # support of the bootloader
         self.header = header | 0x3 << 2
         self._port = (header & 0xF0) >> 4
         self._channel = header & 0x03
-        if data:
-            self._set_data(data)
 
     def _get_channel(self):
         """Get the packet channel"""
@@ -93,7 +115,6 @@ class CRTPPacket(object):
 
     def get_header(self):
         """Get the header"""
-        self._update_header()
         return self.header
 
     def set_header(self, port, channel):
@@ -101,7 +122,7 @@ class CRTPPacket(object):
         Set the port and channel for this packet.
         """
         self._port = port
-        self.channel = channel
+        self._channel = channel
         self._update_header()
 
     def _update_header(self):
@@ -109,7 +130,7 @@ class CRTPPacket(object):
         # The two bits in position 3 and 4 needs to be set for legacy
         # support of the bootloader
         self.header = ((self._port & 0x0f) << 4 | 3 << 2 |
-                       (self.channel & 0x03))
+                       (self._channel & 0x03))
 
     # Some python madness to access different format of the data
     def _get_data(self):
@@ -118,16 +139,19 @@ class CRTPPacket(object):
 
     def _set_data(self, data):
         """Set the packet data"""
-        if type(data) == bytearray:
+        data_type = type(data)
+        if data_type is bytearray:
             self._data = data
-        elif type(data) == str:
+        elif data_type is list or data_type is tuple:
+            self._data = bytearray(data)
+        elif data_type is memoryview:
+            self._data = _readonly_view(data, 0)
+        elif data_type is str:
             if sys.version_info < (3,):
                 self._data = bytearray(data)
             else:
                 self._data = bytearray(data.encode('ISO-8859-1'))
-        elif type(data) == list or type(data) == tuple:
-            self._data = bytearray(data)
-        elif sys.version_info >= (3,) and type(data) == bytes:
+        elif sys.version_info >= (3,) and data_type is bytes:
             self._data = bytearray(data)
         else:
             raise Exception('Data must be bytearray, string, list or tuple,'
@@ -143,7 +167,7 @@ class CRTPPacket(object):
 
     def __str__(self):
         """Get a string representation of the packet"""
-        return '{}:{} {}'.format(self._port, self.channel, self.datat)
+        return '{}:{} {}'.format(self._port, self._channel, self.datat)
 
     data = property(_get_data, _set_data)
     datal = property(_get_data_l, _set_data)
@@ -151,3 +175,19 @@ class CRTPPacket(object):
     datas = property(_get_data, _set_data)
     port = property(_get_port, _set_port)
     channel = property(_get_channel, _set_channel)
+
+
+if sys.version_info < (3,):
+    def _readonly_view(buf, offset):
+        """Python 2 memoryviews index as str, fall back to a copy"""
+        return bytearray(buf[offset:])
+else:
+    def _readonly_view(buf, offset):
+        """Return a read-only byte view of buf starting at offset"""
+        view = memoryview(buf)
+        if view.format != 'B':
+            view = view.cast('B')
+        view = view[offset:]
+        if not view.readonly and hasattr(view, 'toreadonly'):
+            view = view.toreadonly()
+        return view
@@ -61,6 +61,12 @@ __all__ = ['DebugDriver']
 
 logger = logging.getLogger(__name__)
 
+# Round trip time (in seconds) added to every reply for debug://0/7
+SIMULATED_LINK_LATENCY = 0.005
+
+# Protocol version reported by the fake platform service
+FAKE_PROTOCOL_VERSION = 3
+
 # This setup is used to debug raw memory logging
 memlogging = {0x01: {'min': 0, 'max': 255, 'mod': 1, 'vartype': 1},
               0x02: {'min': 0, 'max': 65000, 'mod': 100, 'vartype': 2},
@@ -92,6 +98,9 @@ class DebugDriver(CRTPDriver):
     """ Debug driver used for debugging UI/communication without using a
     Crazyflie"""
 
+    toc_window_size = 8
+    param_window_size = 8
+
     def __init__(self):
         self.fakeLoggingThreads = []
         self._fake_mems = []
@@ -292,7 +301,8 @@ class DebugDriver(CRTPDriver):
                 ['debug://0/4',
                  'Insert random delays on replies and random TOC CRCs'],
                 ['debug://0/5', 'Normal but random TOC CRCs'],
-                ['debug://0/6', 'Normal but empty I2C and OW mems']]
+                ['debug://0/6', 'Normal but empty I2C and OW mems'],
+                ['debug://0/7', 'Normal with simulated radio latency']]
 
     def get_status(self):
         return 'Ok'
@@ -315,6 +325,7 @@ class DebugDriver(CRTPDriver):
         self._packet_handler.bootloader = False
         self._packet_handler._random_answer_delay = False
         self._packet_handler._random_toc_crcs = False
+        self._packet_handler.link_latency = 0
 
         if (re.search('^debug://.*/1$', uri)):
             self._packet_handler.inhibitAnswers = True
@@ -329,6 +340,8 @@ class DebugDriver(CRTPDriver):
             self._packet_handler._random_toc_crcs = True
         if (re.search('^debug://.*/5$', uri)):
             self._packet_handler._random_toc_crcs = True
+        if (re.search('^debug://.*/7$', uri)):
+            self._packet_handler.link_latency = SIMULATED_LINK_LATENCY
 
         if len(self._fake_mems) == 0:
             # Add empty EEPROM
@@ -429,6 +442,10 @@ class _PacketHandlingThread(Thread):
 
         self.nowAnswerCounter = 4
 
+        self.link_latency = 0
+        self._delayed_queue = queue.Queue()
+        self._delivery_thread = None
+
     def handle_packet(self, pk):
         self._in_queue.put(pk)
 
@@ -456,6 +473,10 @@ class _PacketHandlingThread(Thread):
                     self.handleParam(pk)
                 elif (pk.port == CRTPPort.MEM):
                     self._handle_mem_access(pk)
+                elif (pk.port == CRTPPort.LINKCTRL):
+                    self._handle_link_service(pk)
+                elif (pk.port == CRTPPort.PLATFORM):
+                    self._handle_platform(pk)
                 else:
                     logger.warning(
                         'Not handling incoming packets on port [%d]',
@@ -538,6 +559,20 @@ class _PacketHandlingThread(Thread):
         else:
             logger.warning('Bootloader: Unknown command 0x%02X', cmd)
 
+    def _handle_link_service(self, pk):
+        if (pk.channel == 1):  # Source, used to detect the platform
+            p = CRTPPacket()
+            p.set_header(CRTPPort.LINKCTRL, 1)
+            p.data = 'Bitcraze Crazyflie'
+            self._send_packet(p)
+
+    def _handle_platform(self, pk):
+        if (pk.channel == 1 and pk.data[0] == 0):  # Get protocol version
+            p = CRTPPacket()
+            p.set_header(CRTPPort.PLATFORM, 1)
+            p.data = (0, FAKE_PROTOCOL_VERSION)
+            self._send_packet(p)
+
     def _handle_debugmessage(self, pk):
         if (pk.channel == 0):
             cmd = struct.unpack('B', pk.data[0])[0]
@@ -753,7 +788,24 @@ class _PacketHandlingThread(Thread):
             delay = random.randint(0, 250) / 1000.0
             logger.debug('Delaying answer %.2fms', delay * 1000)
             time.sleep(delay)
-        self.queue.put(pk)
+        if self.link_latency > 0:
+            # Deliver the reply later without blocking the handling of the
+            # next request, like a radio link with requests in flight
+            if self._delivery_thread is None:
+                self._delivery_thread = Thread(target=self._deliver_delayed)
+                self._delivery_thread.setDaemon(True)
+                self._delivery_thread.start()
+            self._delayed_queue.put((time.time() + self.link_latency, pk))
+        else:
+            self.queue.put(pk)
+
+    def _deliver_delayed(self):
+        while True:
+            deadline, pk = self._delayed_queue.get(True)
+            delay = deadline - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            self.queue.put(pk)
 
 
 class _FakeLoggingDataThread(Thread):
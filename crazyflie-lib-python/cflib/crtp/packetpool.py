@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2020 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Pool of reusable CRTP packets for the driver receive threads.
+
+The pool is opt-in. When enabled, drivers copy each received frame into a
+packet taken from the pool instead of allocating a new one, and the
+Crazyflie incoming packet handler hands the packet back once all callbacks
+have been called. Callbacks must therefore not keep a reference to a
+received packet (or to its data) after they return when the pool is enabled.
+"""
+import logging
+import sys
+import threading
+
+from .crtpstack import CRTPPacket
+
+__author__ = 'Bitcraze AB'
+__all__ = ['PacketPool', 'enable_packet_pool', 'disable_packet_pool',
+           'get_packet_pool']
+
+logger = logging.getLogger(__name__)
+
+MTU = 32
+DEFAULT_POOL_SIZE = 64
+
+
+class _PooledPacket(CRTPPacket):
+    """
+    A packet owning a fixed size frame buffer and one pre-built read-only
+    view per possible payload length, so that refilling it does not allocate.
+    """
+
+    __slots__ = ('_owner', '_buffer', '_views')
+
+    def __init__(self, owner):
+        CRTPPacket.__init__(self)
+        self._owner = owner
+        self._buffer = bytearray(MTU + 1)
+        if sys.version_info < (3,):
+            self._views = None
+        else:
+            view = memoryview(self._buffer)
+            if hasattr(view, 'toreadonly'):
+                view = view.toreadonly()
+            self._views = [view[1:n + 1] for n in range(MTU + 1)]
+
+    def _fill(self, buf):
+        """Copy the raw frame buf (header followed by payload) into the
+        packet"""
+        length = len(buf)
+        self._buffer[:length] = buf
+        self._set_raw_header(self._buffer[0])
+        if self._views is None:
+            self._data = self._buffer[1:length]
+        else:
+            self._data = self._views[length - 1]
+
+
+class PacketPool(object):
+    """
+    A thread safe free-list of packets.
+
+    Packets are taken from the pool by driver threads and returned by the
+    incoming packet handler. The counters can be used to size the pool: hits
+    and misses count packets taken from the free-list and newly allocated
+    ones, high_water is the largest number of packets in use at the same
+    time.
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE):
+        self.size = size
+        self._free = [_PooledPacket(self) for _ in range(size)]
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self.hits = 0
+        self.misses = 0
+        self.high_water = 0
+
+    def acquire(self, buf):
+        """Get a packet containing the raw frame buf"""
+        if len(buf) > MTU + 1:
+            return CRTPPacket.from_buffer(bytearray(buf))
+
+        with self._lock:
+            if self._free:
+                pk = self._free.pop()
+                self.hits += 1
+            else:
+                pk = None
+                self.misses += 1
+            self._in_use += 1
+            if self._in_use > self.high_water:
+                self.high_water = self._in_use
+
+        if pk is None:
+            pk = _PooledPacket(self)
+        pk._fill(buf)
+        return pk
+
+    def release(self, pk):
+        """Return a packet to the pool. Packets that do not belong to this
+        pool are ignored."""
+        if type(pk) is not _PooledPacket or pk._owner is not self:
+            return
+        with self._lock:
+            self._in_use -= 1
+            if len(self._free) < self.size:
+                self._free.append(pk)
+
+    def get_stats(self):
+        """Get the pool counters as a dictionary"""
+        with self._lock:
+            return {'size': self.size,
+                    'free': len(self._free),
+                    'in_use': self._in_use,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'high_water': self.high_water}
+
+
+_pool = None
+
+
+def enable_packet_pool(size=DEFAULT_POOL_SIZE):
+    """Enable the packet pool for all drivers and return it"""
+    global _pool
+    _pool = PacketPool(size)
+    logger.info('Packet pool enabled with %d packets', size)
+    return _pool
+
+
+def disable_packet_pool():
+    """Disable the packet pool, drivers allocate a new packet per frame"""
+    global _pool
+    _pool = None
+
+
+def get_packet_pool():
+    """Get the active packet pool, or None if the pool is disabled"""
+    return _pool
+
+
+def packet_from_buffer(buf, copy=False):
+    """
+    Create a packet from a raw frame received by a driver. Without a pool
+    the packet wraps buf, set copy if the driver reuses buf for the next
+    frame.
+    """
+    pool = _pool
+    if pool is not None:
+        return pool.acquire(buf)
+    if copy:
+        buf = bytearray(buf)
+    return CRTPPacket.from_buffer(buf)
+
+
+def release_packet(pk):
+    """Give a packet back to the pool once it has been dispatched"""
+    pool = _pool
+    if pool is not None:
+        pool.release(pk)
@@ -38,10 +38,12 @@ import re
 import struct
 import sys
 import threading
+import time
 
 import cflib.drivers.crazyradio as crazyradio
-from .crtpstack import CRTPPacket
+from .crtpstack import CRTPPort
 from .exceptions import WrongUriType
+from .packetpool import packet_from_buffer
 from cflib.crtp.crtpdriver import CRTPDriver
 from cflib.drivers.crazyradio import Crazyradio
 
@@ -61,6 +63,32 @@ _nr_of_arc_retries = 3
 
 DEFAULT_ADDR_A = [0xe7, 0xe7, 0xe7, 0xe7, 0xe7]
 DEFAULT_ADDR = 0xE7E7E7E7E7
+# Address used by radiobroadcast:// links unless one is given in the URI
+DEFAULT_BROADCAST_ADDR_A = (0xff, 0xe7, 0xe7, 0xe7, 0xe7)
+
+# Ports carrying commander setpoints (on channel 0), only the latest one
+# is kept and it is sent before other uplink traffic
+_SETPOINT_PORTS = (CRTPPort.COMMANDER, CRTPPort.COMMANDER_GENERIC)
+# Ports carrying bulk transfers, sent when there is no other traffic
+_BULK_PORTS = (CRTPPort.MEM,)
+
+# Size of the uplink lanes. They are kept short to avoid a "ReadBack" effect
+# where the copter reacts to commands long after they were sent.
+_FIFO_LANE_SIZE = 8
+_BULK_LANE_SIZE = 4
+# Send at least one bulk packet every this many protocol packets
+_BULK_SHARE = 4
+
+# Largest payload of a radio packet, after the CRTP header
+_MAX_PAYLOAD = 31
+
+# Idle polling backs off exponentially from this period after empty acks
+_IDLE_POLL_PERIOD_START = 0.0005
+DEFAULT_MIN_POLL_RATE = 100
+
+_clock = getattr(time, 'monotonic', time.time)
+# CPU time of the calling thread where available
+_cpu_clock = getattr(time, 'thread_time', _clock)
 
 
 class _SharedRadio():
@@ -71,6 +99,7 @@ class _SharedRadio():
         self.radio = Crazyradio(devid=devid)
         self.lock = threading.Lock()
         self.usage_counter = 0
+        self.scheduler = _RadioScheduler()
 
 
 class _RadioManager():
@@ -88,11 +117,13 @@ class _RadioManager():
 
     _radios = []  # Hardware Crazyradio objects
 
-    def __init__(self, devid, channel=0, datarate=0, address=DEFAULT_ADDR_A):
+    def __init__(self, devid, channel=0, datarate=0, address=DEFAULT_ADDR_A,
+                 ack_enable=True):
         self._devid = devid
         self._channel = channel
         self._datarate = datarate
         self._address = address
+        self._ack_enable = ack_enable
 
         with _RadioManager._config_lock:
             if len(_RadioManager._radios) <= self._devid or \
@@ -108,6 +139,7 @@ class _RadioManager():
             _RadioManager._radios[self._devid].usage_counter -= 1
 
             if _RadioManager._radios[self._devid].usage_counter == 0:
+                _RadioManager._radios[self._devid].scheduler.stop()
                 try:
                     _RadioManager._radios[self._devid].radio.close()
                 except Exception:
@@ -120,16 +152,120 @@ class _RadioManager():
         _RadioManager._radios[self._devid].radio.set_channel(self._channel)
         _RadioManager._radios[self._devid].radio.set_data_rate(self._datarate)
         _RadioManager._radios[self._devid].radio.set_address(self._address)
+        radio = _RadioManager._radios[self._devid].radio
+        if radio.current_ack_enable != self._ack_enable:
+            radio.set_ack_enable(self._ack_enable)
 
         return _RadioManager._radios[self._devid].radio
 
     def __exit__(self, type, value, traceback):
         _RadioManager._radios[self._devid].lock.release()
 
+    def add_link(self, link):
+        """ Let the scheduler of this radio service link """
+        _RadioManager._radios[self._devid].scheduler.add_link(link)
+
+    def remove_link(self, link):
+        """ Stop servicing link, returns once no transfer is ongoing """
+        _RadioManager._radios[self._devid].scheduler.remove_link(link)
+
+    def wakeup(self):
+        """ Tell the scheduler that a link has new data to send """
+        _RadioManager._radios[self._devid].scheduler.wakeup()
+
+
+def _is_setpoint(pk):
+    return pk.port in _SETPOINT_PORTS and pk.channel == 0
+
+
+class _UplinkQueue():
+    """
+    Outgoing packets of one link, sorted in three lanes. Setpoints go to a
+    single slot where a new setpoint replaces the one not sent yet, bulk
+    memory transfers go to a bulk lane and all other packets go to a FIFO.
+    get() serves the setpoint first, then the FIFO, and the bulk lane when
+    the FIFO is empty or every _BULK_SHARE packets.
+
+    put() and get() behave as for a queue.Queue.
+    """
+
+    def __init__(self, fifo_size=_FIFO_LANE_SIZE, bulk_size=_BULK_LANE_SIZE):
+        self._setpoint = None
+        self._fifo = collections.deque()
+        self._bulk = collections.deque()
+        self._fifo_size = fifo_size
+        self._bulk_size = bulk_size
+        self._fifo_served = 0
+        self._cond = threading.Condition()
+
+    def put(self, pk, block=True, timeout=None):
+        with self._cond:
+            if _is_setpoint(pk):
+                self._setpoint = pk
+                return
+
+            if pk.port in _BULK_PORTS:
+                lane = self._bulk
+                size = self._bulk_size
+            else:
+                lane = self._fifo
+                size = self._fifo_size
+
+            if len(lane) >= size:
+                if not block:
+                    raise queue.Full
+                end = None
+                if timeout is not None:
+                    end = _clock() + timeout
+                while len(lane) >= size:
+                    if end is None:
+                        self._cond.wait()
+                    else:
+                        remaining = end - _clock()
+                        if remaining <= 0:
+                            raise queue.Full
+                        self._cond.wait(remaining)
+            lane.append(pk)
+
+    def get(self, block=False):
+        """ Return the next packet to send, only non-blocking gets """
+        with self._cond:
+            if self._setpoint is not None:
+                pk = self._setpoint
+                self._setpoint = None
+                return pk
+
+            if self._fifo and (not self._bulk or
+                               self._fifo_served < _BULK_SHARE):
+                self._fifo_served += 1
+                pk = self._fifo.popleft()
+            elif self._bulk:
+                self._fifo_served = 0
+                pk = self._bulk.popleft()
+            else:
+                raise queue.Empty
+            self._cond.notify_all()
+            return pk
+
+    # empty() and has_setpoint() are checked by the scheduler on every turn.
+    # Like for a queue.Queue the answer may be outdated when it is used, so
+    # they read the lanes without taking the lock.
+
+    def empty(self):
+        return (self._setpoint is None and not self._fifo and
+                not self._bulk)
+
+    def has_setpoint(self):
+        """ True if a setpoint is waiting, without dequeuing it """
+        return self._setpoint is not None
+
 
 class RadioDriver(CRTPDriver):
     """ Crazyradio link driver """
 
+    toc_window_size = 4
+    param_window_size = 4
+
     def __init__(self):
         """ Create the link driver """
         CRTPDriver.__init__(self)
@@ -140,6 +276,10 @@ class RadioDriver(CRTPDriver):
         self.in_queue = None
         self.out_queue = None
         self._thread = None
+        self._weight = 1
+        self._broadcast = False
+        self._max_poll_rate = None
+        self._min_poll_rate = DEFAULT_MIN_POLL_RATE
         self.needs_resending = True
 
     def connect(self, uri, link_quality_callback, link_error_callback):
@@ -147,6 +287,11 @@ class RadioDriver(CRTPDriver):
         Connect the link driver to a specified URI of the format:
         radio://<dongle nbr>/<radio channel>/[250K,1M,2M]
 
+        A radiobroadcast:// URI, with the same format, opens a send-only
+        link with ack disabled. Each packet is sent once and is received by
+        every Crazyflie listening on the channel and address, by default
+        DEFAULT_BROADCAST_ADDR_A.
+
         The callback for linkQuality can be called at any moment from the
         driver to report back the link quality in percentage. The
         callback from linkError will be called when a error occurs with
@@ -155,12 +300,17 @@ class RadioDriver(CRTPDriver):
 
         devid, channel, datarate, address = self.parse_uri(uri)
         self.uri = uri
+        self._broadcast = uri.startswith('radiobroadcast://')
+        # Broadcast packets are sent once and never acked, there is no
+        # safelink to set up and nothing to resend
+        self.needs_resending = not self._broadcast
 
         if self._radio_manager is None:
             self._radio_manager = _RadioManager(devid,
                                                 channel,
                                                 datarate,
-                                                address)
+                                                address,
+                                                not self._broadcast)
         else:
             raise Exception('Link already open!')
 
@@ -172,16 +322,17 @@ class RadioDriver(CRTPDriver):
 
         # Prepare the inter-thread communication queue
         self.in_queue = queue.Queue()
-        # Limited size out queue to avoid "ReadBack" effect
-        self.out_queue = queue.Queue(1)
-
-        # Launch the comm thread
-        self._thread = _RadioDriverThread(self._radio_manager,
-                                          self.in_queue,
-                                          self.out_queue,
-                                          link_quality_callback,
-                                          link_error_callback,
-                                          self)
+        self.out_queue = _UplinkQueue()
+
+        # Hand the link over to the radio scheduler
+        self._thread = _RadioLink(self._radio_manager,
+                                  self.in_queue,
+                                  self.out_queue,
+                                  link_quality_callback,
+                                  link_error_callback,
+                                  self,
+                                  self._broadcast)
+        self._configure_link()
         self._thread.start()
 
         self.link_error_callback = link_error_callback
@@ -189,15 +340,16 @@ class RadioDriver(CRTPDriver):
     @staticmethod
     def parse_uri(uri):
         # check if the URI is a radio URI
-        if not re.search('^radio://', uri):
+        if not re.search('^radio(broadcast)?://', uri):
             raise WrongUriType('Not a radio URI')
 
         # Open the USB dongle
-        if not re.search('^radio://([0-9a-fA-F]+)((/([0-9]+))'
+        if not re.search('^radio(?:broadcast)?://([0-9a-fA-F]+)((/([0-9]+))'
                          '((/(250K|1M|2M))?(/([A-F0-9]+))?)?)?$', uri):
             raise WrongUriType('Wrong radio URI format!')
 
-        uri_data = re.search('^radio://([0-9a-fA-F]+)((/([0-9]+))'
+        uri_data = re.search('^radio(?:broadcast)?://([0-9a-fA-F]+)'
+                             '((/([0-9]+))'
                              '((/(250K|1M|2M))?(/([A-F0-9]+))?)?)?$', uri)
 
         if len(uri_data.group(1)) < 10 and uri_data.group(1).isdigit():
@@ -223,6 +375,8 @@ class RadioDriver(CRTPDriver):
             datarate = Crazyradio.DR_2MPS
 
         address = DEFAULT_ADDR_A
+        if uri.startswith('radiobroadcast://'):
+            address = DEFAULT_BROADCAST_ADDR_A
         if uri_data.group(9):
             addr = str(uri_data.group(9))
             new_addr = struct.unpack('<BBBBB', binascii.unhexlify(addr))
@@ -259,6 +413,55 @@ class RadioDriver(CRTPDriver):
             if self.link_error_callback:
                 self.link_error_callback('RadioDriver: Could not send packet'
                                          ' to copter')
+            return
+
+        radio_manager = self._radio_manager
+        if radio_manager is not None:
+            radio_manager.wakeup()
+
+    def set_weight(self, weight):
+        """
+        Set the share of the radio this link gets when several links use the
+        same Crazyradio. A link with weight 2 gets twice as many packets as a
+        link with weight 1 when both have data to send.
+        """
+        if weight <= 0:
+            raise ValueError('The weight must be positive')
+        self._weight = weight
+        self._configure_link()
+
+    def set_poll_rate(self, max_rate=None, min_rate=DEFAULT_MIN_POLL_RATE):
+        """
+        Configure how often the Crazyflie is polled for downlink data when
+        there is nothing to send. Polling backs off exponentially while the
+        acks are empty, down to min_rate polls per second, and goes back to
+        full speed as soon as data is received. max_rate caps the poll rate
+        of a busy link, None means as fast as the radio allows. Packets sent
+        by the application are not limited.
+        """
+        if min_rate <= 0 or (max_rate is not None and max_rate < min_rate):
+            raise ValueError('Invalid poll rates')
+        self._max_poll_rate = max_rate
+        self._min_poll_rate = min_rate
+        self._configure_link()
+
+    def get_link_stats(self):
+        """
+        Return the traffic statistics of the link since it was connected as
+        a dict. See _RadioLink.get_stats() for the content.
+        """
+        if self._thread is None:
+            return None
+        return self._thread.get_stats()
+
+    def _configure_link(self):
+        if self._thread:
+            self._thread.weight = self._weight
+            self._thread.max_idle_period = 1.0 / self._min_poll_rate
+            if self._max_poll_rate is None:
+                self._thread.min_poll_period = 0
+            else:
+                self._thread.min_poll_period = 1.0 / self._max_poll_rate
 
     def pause(self):
         self._thread.stop()
@@ -268,11 +471,13 @@ class RadioDriver(CRTPDriver):
         if self._thread:
             return
 
-        self._thread = _RadioDriverThread(self._radio_manager, self.in_queue,
-                                          self.out_queue,
-                                          self.link_quality_callback,
-                                          self.link_error_callback,
-                                          self)
+        self._thread = _RadioLink(self._radio_manager, self.in_queue,
+                                  self.out_queue,
+                                  self.link_quality_callback,
+                                  self.link_error_callback,
+                                  self,
+                                  self._broadcast)
+        self._configure_link()
         self._thread.start()
 
     def close(self):
@@ -402,20 +607,158 @@ class RadioDriver(CRTPDriver):
         return 'radio'
 
 
-# Transmit/receive radio thread
-class _RadioDriverThread(threading.Thread):
+class _RadioScheduler(threading.Thread):
+    """
+    Services all the links sharing one Crazyradio from a single thread.
+
+    Each turn one link gets one transfer. Links that have a setpoint waiting
+    go first, the other links with data to send or an idle poll due take
+    turns in a smooth weighted round-robin so that a link with weight 2 gets
+    twice as many transfers as a link with weight 1.
+    """
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self._links = []
+        self._cond = threading.Condition()
+        self._current = None
+        self._running = False
+        self._sp = False
+
+    def add_link(self, link):
+        with self._cond:
+            if link not in self._links:
+                link.credit = 0
+                self._links.append(link)
+            self._cond.notify_all()
+            if not self._running:
+                self._running = True
+                self.start()
+
+    def remove_link(self, link):
+        with self._cond:
+            if link in self._links:
+                self._links.remove(link)
+            # Wait for an ongoing transfer, unless called from a callback
+            # run by the scheduler itself
+            if threading.current_thread() is not self:
+                while self._current is link:
+                    self._cond.wait()
+
+    def wakeup(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def stop(self):
+        """ Stop the thread """
+        with self._cond:
+            self._sp = True
+            self._cond.notify_all()
+        if self._running and threading.current_thread() is not self:
+            self.join()
+
+    def _select(self, now):
+        """
+        Return the link to service next, or None and the time to wait until
+        a link is due.
+        """
+        ready = []
+        urgent = []
+        wait = None
+        for link in self._links:
+            if link.has_uplink():
+                ready.append(link)
+                if link.has_setpoint():
+                    urgent.append(link)
+            elif link.next_poll is None:
+                # Only serviced when there is something to send
+                continue
+            elif link.next_poll <= now:
+                ready.append(link)
+            elif wait is None or link.next_poll - now < wait:
+                wait = link.next_poll - now
+
+        candidates = urgent or ready
+        if not candidates:
+            return None, wait
+
+        total = 0
+        selected = None
+        for link in candidates:
+            link.credit += link.weight
+            total += link.weight
+            if selected is None or link.credit > selected.credit:
+                selected = link
+        selected.credit -= total
+        return selected, 0
+
+    def run(self):
+        while True:
+            with self._cond:
+                if self._sp:
+                    break
+                link, wait = self._select(_clock())
+                if link is None:
+                    self._cond.wait(wait)
+                    continue
+                self._current = link
+
+            try:
+                link.transfer()
+            except Exception:
+                logger.exception('Unexpected error in radio link')
+            finally:
+                with self._cond:
+                    self._current = None
+                    self._cond.notify_all()
+
+
+class _TxBuffers():
+    """
+    Preallocated transmit buffers, one per packet length. A packet is packed
+    into the buffer of its length with a single slice assignment, and the
+    buffers are arrays of bytes that pyusb sends without a copy.
+    """
+
+    def __init__(self):
+        self._buffers = [array.array('B', bytearray(size + 1))
+                         for size in range(_MAX_PAYLOAD + 1)]
+        if sys.version_info < (3,):
+            # Python 2 arrays do not support memoryviews
+            self._payloads = None
+        else:
+            self._payloads = [memoryview(buf)[1:] for buf in self._buffers]
+
+    def pack(self, header, data):
+        """ Return a buffer holding the packet, valid until the next call """
+        size = len(data)
+        if size > _MAX_PAYLOAD:
+            # Let the dongle decide what to do with it
+            return array.array('B', bytearray((header,)) + bytearray(data))
+        buf = self._buffers[size]
+        buf[0] = header
+        if self._payloads is None:
+            buf[1:] = array.array('B', data)
+        else:
+            self._payloads[size][:] = data
+        return buf
+
+
+class _RadioLink():
+    """
+    One Crazyflie link on a Crazyradio, serviced by the scheduler of the
+    radio it uses.
     """
-    Radio link receiver thread used to read data from the
-    Crazyradio USB driver. """
 
     def __init__(self, radio_manager, inQueue, outQueue,
-                 link_quality_callback, link_error_callback, link):
+                 link_quality_callback, link_error_callback, link,
+                 broadcast=False):
         """ Create the object """
-        threading.Thread.__init__(self)
+        self._broadcast = broadcast
         self._radio_manager = radio_manager
         self._in_queue = inQueue
         self._out_queue = outQueue
-        self._sp = False
         self._link_error_callback = link_error_callback
         self._link_quality_callback = link_quality_callback
         self._retry_before_disconnect = _nr_of_retries
@@ -428,13 +771,89 @@ class _RadioDriverThread(threading.Thread):
         self._has_safelink = False
         self._link = link
 
+        self.weight = 1
+        self.credit = 0
+        self.next_poll = 0
+        self.min_poll_period = 0
+        self.max_idle_period = 1.0 / DEFAULT_MIN_POLL_RATE
+        self._idle_period = 0
+        self._setup_done = False
+        self._out_packet = None
+        self._tx_buffers = _TxBuffers()
+        self._null_packet = array.array('B', (0xFF,))
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._start_time = _clock()
+        self._sent = 0
+        self._polls = 0
+        self._received = 0
+        self._lost = 0
+        self._cpu_time = 0.0
+
+    def start(self):
+        """ Start servicing the link """
+        # Broadcast links have no downlink to poll
+        self._setup_done = self._broadcast
+        self.next_poll = None if self._broadcast else 0
+        self._idle_period = 0
+        self._reset_stats()
+        self._radio_manager.add_link(self)
+
+    def get_stats(self):
+        """
+        Return a dict with the number of packets sent, null packets sent to
+        poll (polls), packets received and transfers without ack (lost), the
+        time since the link started (duration, in seconds), the transfer rate
+        (packets/s) and the share of one CPU spent on the link (cpu_usage).
+        """
+        duration = _clock() - self._start_time
+        transfers = self._sent + self._polls + self._lost
+        if duration > 0:
+            packet_rate = transfers / duration
+            cpu_usage = self._cpu_time / duration
+        else:
+            packet_rate = 0.0
+            cpu_usage = 0.0
+        return {
+            'sent': self._sent,
+            'polls': self._polls,
+            'received': self._received,
+            'lost': self._lost,
+            'duration': duration,
+            'packet_rate': packet_rate,
+            'cpu_usage': cpu_usage,
+        }
+
     def stop(self):
-        """ Stop the thread """
-        self._sp = True
-        try:
-            self.join()
-        except Exception:
-            pass
+        """ Stop servicing the link """
+        self._radio_manager.remove_link(self)
+
+    def has_uplink(self):
+        """ True if a packet is waiting to be sent """
+        return self._out_packet is not None or not self._out_queue.empty()
+
+    def has_setpoint(self):
+        return self._out_queue.has_setpoint() or (
+            self._out_packet is not None and _is_setpoint(self._out_packet))
+
+    def _next_packet(self):
+        """
+        Take the packet to send from the queue when the transfer starts. A
+        packet that was not acked is sent again, unless it is a setpoint and
+        a newer setpoint has been queued.
+        """
+        if self._out_packet is None:
+            take = not self._out_queue.empty()
+        else:
+            take = (_is_setpoint(self._out_packet) and
+                    self._out_queue.has_setpoint())
+        if take:
+            try:
+                self._out_packet = self._out_queue.get(False)
+            except queue.Empty:
+                pass
+        return self._out_packet
 
     def _send_packet_safe(self, cr, packet):
         """
@@ -455,103 +874,127 @@ class _RadioDriverThread(threading.Thread):
 
         return resp
 
-    def run(self):
-        """ Run the receiver thread """
-        dataOut = array.array('B', [0xFF])
-        waitTime = 0
-        emptyCtr = 0
-
-        # Try up to 10 times to enable the safelink mode
-        with self._radio_manager as cradio:
-            for _ in range(10):
-                resp = cradio.send_packet((0xff, 0x05, 0x01))
-                if resp and resp.data and tuple(resp.data) == (
-                        0xff, 0x05, 0x01):
-                    self._has_safelink = True
-                    self._curr_up = 0
-                    self._curr_down = 0
-                    break
-        self._link.needs_resending = not self._has_safelink
-
-        while (True):
-            if (self._sp):
+    def _enable_safelink(self, cradio):
+        """ Try up to 10 times to enable the safelink mode """
+        for _ in range(10):
+            resp = cradio.send_packet((0xff, 0x05, 0x01))
+            if resp and resp.data and tuple(resp.data) == (
+                    0xff, 0x05, 0x01):
+                self._has_safelink = True
+                self._curr_up = 0
+                self._curr_down = 0
                 break
+        self._link.needs_resending = not self._has_safelink
 
-            with self._radio_manager as cradio:
-                try:
-                    if self._has_safelink:
-                        ackStatus = self._send_packet_safe(cradio, dataOut)
-                    else:
-                        ackStatus = cradio.send_packet(dataOut)
-                except Exception as e:
-                    import traceback
-
-                    self._link_error_callback(
-                        'Error communicating with crazy radio ,it has '
-                        'probably been unplugged!\nException:%s\n\n%s' % (
-                            e, traceback.format_exc()))
-
-            # Analyse the in data packet ...
-            if ackStatus is None:
-                logger.info('Dongle reported ACK status == None')
-                continue
+    def transfer(self):
+        """ Send the next packet, or a null packet, and handle the ack """
+        start = _cpu_clock()
+        try:
+            self._transfer()
+        finally:
+            self._cpu_time += _cpu_clock() - start
 
-            if (self._link_quality_callback is not None):
-                # track the mean of a sliding window of the last N packets
-                retry = 10 - ackStatus.retry
-                self._retries.append(retry)
-                self._retry_sum += retry
-                if len(self._retries) > 100:
-                    self._retry_sum -= self._retries.popleft()
-                link_quality = float(self._retry_sum) / len(self._retries) * 10
-                self._link_quality_callback(link_quality)
-
-            # If no copter, retry
-            if ackStatus.ack is False:
-                self._retry_before_disconnect = \
-                    self._retry_before_disconnect - 1
-                if (self._retry_before_disconnect == 0 and
-                        self._link_error_callback is not None):
-                    self._link_error_callback('Too many packets lost')
-                continue
-            self._retry_before_disconnect = _nr_of_retries
+    def _transfer(self):
+        if not self._setup_done:
+            try:
+                with self._radio_manager as cradio:
+                    self._enable_safelink(cradio)
+            except Exception as e:
+                self._radio_error(e)
+                return
+            self._setup_done = True
+            return
 
-            data = ackStatus.data
+        if self._next_packet():
+            dataOut = self._tx_buffers.pack(self._out_packet.header,
+                                            self._out_packet.data)
+        else:
+            dataOut = self._null_packet
 
-            # If there is a copter in range, the packet is analysed and the
-            # next packet to send is prepared
-            if (len(data) > 0):
-                inPacket = CRTPPacket(data[0], list(data[1:]))
-                self._in_queue.put(inPacket)
-                waitTime = 0
-                emptyCtr = 0
-            else:
-                emptyCtr += 1
-                if (emptyCtr > 10):
-                    emptyCtr = 10
-                    # Relaxation time if the last 10 packet where empty
-                    waitTime = 0.01
+        try:
+            with self._radio_manager as cradio:
+                if self._broadcast:
+                    cradio.send_packet_no_ack(dataOut)
+                    self._sent += 1
+                    self._out_packet = None
+                    return
+                if self._has_safelink:
+                    ackStatus = self._send_packet_safe(cradio, dataOut)
                 else:
-                    waitTime = 0
-
-            # get the next packet to send of relaxation (wait 10ms)
-            outPacket = None
-            try:
-                outPacket = self._out_queue.get(True, waitTime)
-            except queue.Empty:
-                outPacket = None
+                    ackStatus = cradio.send_packet(dataOut)
+        except Exception as e:
+            self._radio_error(e)
+            return
 
-            dataOut = array.array('B')
+        self._handle_ack(ackStatus)
+
+    def _radio_error(self, e):
+        """ Stop servicing the link and report the error """
+        import traceback
+
+        error = ('Error communicating with crazy radio ,it has '
+                 'probably been unplugged!\nException:%s\n\n%s' % (
+                     e, traceback.format_exc()))
+        # Do not fail again on every turn of the scheduler
+        self.next_poll = None
+        self._radio_manager.remove_link(self)
+        if self._link_error_callback is not None:
+            self._link_error_callback(error)
+
+    def _handle_ack(self, ackStatus):
+        # Analyse the in data packet ...
+        if ackStatus is None:
+            logger.info('Dongle reported ACK status == None')
+            return
 
-            if outPacket:
-                dataOut.append(outPacket.header)
-                for X in outPacket.data:
-                    if type(X) == int:
-                        dataOut.append(X)
-                    else:
-                        dataOut.append(ord(X))
-            else:
-                dataOut.append(0xFF)
+        if (self._link_quality_callback is not None):
+            # track the mean of a sliding window of the last N packets
+            retry = 10 - ackStatus.retry
+            self._retries.append(retry)
+            self._retry_sum += retry
+            if len(self._retries) > 100:
+                self._retry_sum -= self._retries.popleft()
+            link_quality = float(self._retry_sum) / len(self._retries) * 10
+            self._link_quality_callback(link_quality)
+
+        # If no copter, retry
+        if ackStatus.ack is False:
+            self._lost += 1
+            self._retry_before_disconnect = \
+                self._retry_before_disconnect - 1
+            if (self._retry_before_disconnect == 0 and
+                    self._link_error_callback is not None):
+                self._link_error_callback('Too many packets lost')
+            return
+        self._retry_before_disconnect = _nr_of_retries
+        if self._out_packet is None:
+            self._polls += 1
+        else:
+            self._sent += 1
+            # An answer is likely on its way, poll at full speed
+            self._idle_period = 0
+        self._out_packet = None
+
+        data = ackStatus.data
+
+        # If there is a copter in range, the packet is analysed and the
+        # next packet to send is prepared
+        if (len(data) > 0):
+            inPacket = packet_from_buffer(data)
+            self._in_queue.put(inPacket)
+            self._received += 1
+            self._idle_period = 0
+        else:
+            # Back off exponentially while the copter has nothing to send
+            self._idle_period = min(
+                max(self._idle_period * 2, _IDLE_POLL_PERIOD_START),
+                self.max_idle_period)
+
+        period = max(self._idle_period, self.min_poll_period)
+        if period > 0:
+            self.next_poll = _clock() + period
+        else:
+            self.next_poll = 0
 
 
 def set_retries_before_disconnect(nr_of_retries):
@@ -35,6 +35,7 @@ import threading
 
 from .crtpstack import CRTPPacket
 from .exceptions import WrongUriType
+from .packetpool import packet_from_buffer
 from cflib.crtp.crtpdriver import CRTPDriver
 
 if sys.version_info < (3,):
@@ -224,7 +225,8 @@ class _SerialReceiveThread(threading.Thread):
                         cksum[1] != received_data_chk[-1]:
                     continue
 
-                pk = CRTPPacket(received[2], received[3:expected])
+                pk = packet_from_buffer(memoryview(received)[2:expected],
+                                        copy=True)
                 self.in_queue.put(pk)
 
             except Exception as e:
@@ -34,8 +34,8 @@ import re
 import sys
 import threading
 
-from .crtpstack import CRTPPacket
 from .exceptions import WrongUriType
+from .packetpool import packet_from_buffer
 from cflib.crtp.crtpdriver import CRTPDriver
 from cflib.drivers.cfusb import CfUsb
 if sys.version_info < (3,):
@@ -52,6 +52,9 @@ logger = logging.getLogger(__name__)
 class UsbDriver(CRTPDriver):
     """ Crazyradio link driver """
 
+    toc_window_size = 4
+    param_window_size = 4
+
     def __init__(self):
         """ Create the link driver """
         CRTPDriver.__init__(self)
@@ -243,7 +246,7 @@ class _UsbReceiveThread(threading.Thread):
                 # Blocking until USB data available
                 data = self.cfusb.receive_packet()
                 if len(data) > 0:
-                    pk = CRTPPacket(data[0], list(data[1:]))
+                    pk = packet_from_buffer(data)
                     self.in_queue.put(pk)
             except Exception as e:
                 import traceback
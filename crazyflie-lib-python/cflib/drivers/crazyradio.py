@@ -121,6 +121,8 @@ class Crazyradio:
         self.current_channel = None
         self.current_address = None
         self.current_datarate = None
+        # The dongle powers up with ack enabled
+        self.current_ack_enable = True
 
         if device is None:
             try:
@@ -179,6 +181,7 @@ class Crazyradio:
         self.current_channel = None
         self.current_address = None
         self.current_datarate = None
+        self.current_ack_enable = None
 
     # Dongle configuration
     def set_channel(self, channel):
@@ -242,6 +245,7 @@ class Crazyradio:
             _send_vendor_setup(self.handle, ACK_ENABLE, 1, 0, ())
         else:
             _send_vendor_setup(self.handle, ACK_ENABLE, 0, 0, ())
+        self.current_ack_enable = enable
 
     def _has_fw_scan(self):
         # return self.version >= 0.5
@@ -307,6 +311,17 @@ class Crazyradio:
 
         return ackIn
 
+    def send_packet_no_ack(self, dataOut):
+        """ Send a packet without waiting for an ack, to be used when ack
+            is disabled. Every Crazyflie listening on the address gets it. """
+        try:
+            if (pyusb1 is False):
+                self.handle.bulkWrite(1, dataOut, 1000)
+            else:
+                self.handle.write(endpoint=1, data=dataOut, timeout=1000)
+        except usb.USBError:
+            pass
+
 
 # Private utility functions
 def _send_vendor_setup(handle, request, value, index, data):
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2020 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Measures how many log data packets per second the LogRecorder can record,
+compared to the maximum packet rate of a 2 Mbit/s radio link.
+
+The packets are fed directly to the recorder, the time includes writing
+all of them to file.
+"""
+import os
+import struct
+import tempfile
+import time
+
+from cflib.crazyflie.log import CHAN_LOGDATA
+from cflib.crazyflie.log import LogConfig
+from cflib.crazyflie.logrecorder import LogReader
+from cflib.crazyflie.logrecorder import LogRecorder
+from cflib.crtp.crtpstack import CRTPPacket
+from cflib.crtp.crtpstack import CRTPPort
+
+PACKETS = 200000
+# 2 Mbit/s with 32 byte packets, not counting any protocol overhead
+RADIO_MAX_PACKETS_PER_SECOND = 2000000 // (32 * 8)
+
+
+class _FakeCrazyflie:
+
+    def add_port_callback(self, port, cb):
+        self.packet_cb = cb
+
+    def remove_port_callback(self, port, cb):
+        pass
+
+
+def create_packets(log_config):
+    packets = []
+    for i in range(PACKETS):
+        pk = CRTPPacket()
+        pk.set_header(CRTPPort.LOGGING, CHAN_LOGDATA)
+        pk.data = struct.pack('<BI', log_config.id, i)[:4] + \
+            struct.pack('<fffffff', *range(7)) + b'\x00\x00'
+        packets.append(pk)
+    return packets
+
+
+if __name__ == '__main__':
+    log_config = LogConfig('state', 10)
+    for i in range(7):
+        log_config.add_variable('state.var{}'.format(i), 'float')
+    log_config.add_variable('state.flags', 'uint16_t')
+    log_config.id = 1
+    packets = create_packets(log_config)
+
+    filename = os.path.join(tempfile.mkdtemp(), 'benchmark.cflr')
+    cf = _FakeCrazyflie()
+
+    start = time.time()
+    recorder = LogRecorder(cf, filename)
+    recorder.add_config(log_config)
+    for pk in packets:
+        cf.packet_cb(pk)
+    recorder.close()
+    elapsed = time.time() - start
+
+    rate = PACKETS / elapsed
+    print('Recorded {} packets in {:.2f} s: {:.0f} packets/s, {:.1f} times '
+          'the radio maximum of {} packets/s'.format(
+              PACKETS, elapsed, rate, rate / RADIO_MAX_PACKETS_PER_SECOND,
+              RADIO_MAX_PACKETS_PER_SECOND))
+    print('File size: {:.1f} MB'.format(os.path.getsize(filename) / 1e6))
+
+    start = time.time()
+    samples = sum(1 for _ in LogReader(filename))
+    print('Read {} samples in {:.2f} s'.format(samples, time.time() - start))
+    os.remove(filename)
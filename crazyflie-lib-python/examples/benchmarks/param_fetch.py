@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2020 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Measures the time from connection until all parameter values have been
+fetched (param.all_updated) against the debug driver for different param
+request window sizes.
+
+The debug driver is connected with simulated radio latency (debug://0/7).
+"""
+import logging
+import time
+from threading import Event
+
+import cflib.crtp
+from cflib.crazyflie import Crazyflie
+from cflib.crtp.debugdriver import DebugDriver
+
+URI = 'debug://0/7'
+WINDOW_SIZES = [1, 2, 4, 8, 16]
+RUNS = 5
+
+# Only output errors from the logging framework
+logging.basicConfig(level=logging.ERROR)
+
+
+def measure_param_fetch_time():
+    cf = Crazyflie()
+    times = {}
+    done = Event()
+
+    def connected(uri):
+        times['connected'] = time.time()
+
+    def all_updated():
+        times['updated'] = time.time()
+        done.set()
+
+    cf.connected.add_callback(connected)
+    cf.param.all_updated.add_callback(all_updated)
+    cf.open_link(URI)
+    done.wait(10)
+    cf.close_link()
+    return times['updated'] - times['connected']
+
+
+if __name__ == '__main__':
+    cflib.crtp.init_drivers(enable_debug_driver=True)
+
+    print('window  param fetch time (median of {} runs)'.format(RUNS))
+    for window_size in WINDOW_SIZES:
+        DebugDriver.param_window_size = window_size
+        times = sorted(measure_param_fetch_time() for _ in range(RUNS))
+        print('{:6d}  {:7.1f} ms'.format(window_size, times[RUNS // 2] * 1000))
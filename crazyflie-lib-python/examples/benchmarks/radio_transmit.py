@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2020 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+"""
+Measures how many packets per second the radio link can prepare and hand to
+the Crazyradio driver, with the USB transfer replaced by a fake dongle that
+acks every packet at once.
+
+The result is the CPU bound of the transmit path, the real link is limited
+by the radio to a few thousand packets per second. The best of a few runs
+is reported.
+"""
+import sys
+import time
+
+from cflib.crtp.crtpstack import CRTPPacket
+from cflib.crtp.crtpstack import CRTPPort
+from cflib.crtp.radiodriver import _RadioLink
+from cflib.crtp.radiodriver import _UplinkQueue
+from cflib.drivers.crazyradio import _radio_ack
+
+if sys.version_info < (3,):
+    import Queue as queue
+else:
+    import queue
+
+PACKETS = 50000
+RUNS = 5
+
+
+class _FakeRadio:
+
+    def __init__(self):
+        self.ack = _radio_ack()
+        self.ack.ack = True
+        self.ack.retry = 0
+        self.ack.data = bytearray()
+
+    def send_packet(self, data_out):
+        return self.ack
+
+
+class _FakeRadioManager:
+
+    def __init__(self):
+        self.radio = _FakeRadio()
+
+    def __enter__(self):
+        return self.radio
+
+    def __exit__(self, type, value, traceback):
+        pass
+
+
+class _FakeLink:
+    needs_resending = True
+
+
+def measure_once(payload_size):
+    out_queue = _UplinkQueue(fifo_size=PACKETS)
+    link = _RadioLink(_FakeRadioManager(), queue.Queue(), out_queue,
+                      None, None, _FakeLink())
+    link.transfer()  # Safelink handshake
+
+    if payload_size is not None:
+        for _ in range(PACKETS):
+            pk = CRTPPacket()
+            pk.set_header(CRTPPort.PARAM, 0)
+            pk.data = bytearray(range(payload_size))
+            out_queue.put(pk)
+
+    start = time.time()
+    for _ in range(PACKETS):
+        link.has_uplink()
+        link.transfer()
+    return PACKETS / (time.time() - start)
+
+
+def measure(payload_size):
+    return max(measure_once(payload_size) for _ in range(RUNS))
+
+
+if __name__ == '__main__':
+    print('Null packets: {:.0f} packets/s'.format(measure(None)))
+    for size in (1, 10, 30):
+        print('{} byte payload: {:.0f} packets/s'.format(size, measure(size)))
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2020 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Measures the connection time against the debug driver for different TOC
+request window sizes.
+
+The debug driver is connected with simulated radio latency (debug://0/7) and
+without TOC cache, so that every connection downloads the log and param TOCs.
+"""
+import logging
+import time
+
+import cflib.crtp
+from cflib.crazyflie import Crazyflie
+from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
+from cflib.crtp.debugdriver import DebugDriver
+
+URI = 'debug://0/7'
+WINDOW_SIZES = [1, 2, 4, 8, 16]
+RUNS = 5
+
+# Only output errors from the logging framework
+logging.basicConfig(level=logging.ERROR)
+
+
+def measure_connect_time():
+    start = time.time()
+    with SyncCrazyflie(URI, cf=Crazyflie()):
+        return time.time() - start
+
+
+if __name__ == '__main__':
+    cflib.crtp.init_drivers(enable_debug_driver=True)
+
+    print('window  connect time (median of {} runs)'.format(RUNS))
+    for window_size in WINDOW_SIZES:
+        DebugDriver.toc_window_size = window_size
+        times = sorted(measure_connect_time() for _ in range(RUNS))
+        print('{:6d}  {:7.1f} ms'.format(window_size, times[RUNS // 2] * 1000))
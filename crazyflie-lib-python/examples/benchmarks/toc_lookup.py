@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2020 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Micro-benchmark of the Toc lookups done when connecting, on a synthetic TOC
+with 2000 entries.
+
+Every parameter reply is looked up by id and every log variable or parameter
+name by complete name. The linear scan that Toc used to do is included for
+comparison.
+"""
+import timeit
+
+from cflib.crazyflie.param import ParamTocElement
+from cflib.crazyflie.toc import Toc
+
+NBR_OF_GROUPS = 100
+NBR_OF_ELEMENTS = 2000
+
+
+def create_toc():
+    toc = Toc()
+    for ident in range(NBR_OF_ELEMENTS):
+        element = ParamTocElement()
+        element.ident = ident
+        element.group = 'group{}'.format(ident % NBR_OF_GROUPS)
+        element.name = 'name{}'.format(ident)
+        toc.add_element(element)
+    return toc
+
+
+def linear_get_element_by_id(toc, ident):
+    for group in list(toc.toc.keys()):
+        for name in list(toc.toc[group].keys()):
+            if toc.toc[group][name].ident == ident:
+                return toc.toc[group][name]
+    return None
+
+
+def lookup_all_by_id(toc):
+    for ident in range(NBR_OF_ELEMENTS):
+        toc.get_element_by_id(ident)
+
+
+def linear_lookup_all_by_id(toc):
+    for ident in range(NBR_OF_ELEMENTS):
+        linear_get_element_by_id(toc, ident)
+
+
+def lookup_all_by_name(toc, names):
+    for name in names:
+        toc.get_element_by_complete_name(name)
+
+
+if __name__ == '__main__':
+    toc = create_toc()
+    names = ['group{}.name{}'.format(i % NBR_OF_GROUPS, i)
+             for i in range(NBR_OF_ELEMENTS)]
+
+    runs = 10
+    results = [
+        ('by id (indexed)', lambda: lookup_all_by_id(toc), runs),
+        ('by id (linear scan)', lambda: linear_lookup_all_by_id(toc), 1),
+        ('by complete name (indexed)',
+         lambda: lookup_all_by_name(toc, names), runs),
+    ]
+
+    print('Looking up all {} elements'.format(NBR_OF_ELEMENTS))
+    for label, function, number in results:
+        elapsed = timeit.timeit(function, number=number) / number
+        print('{:30s} {:10.3f} ms'.format(label, elapsed * 1000))
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2020 Bitcraze AB
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Example of a swarm that takes off and lands at the same time, using a
+broadcast link.
+
+Each Crazyflie is connected to enable the High level commander. The takeoff
+and land commands are then sent once on a radiobroadcast:// link, on the same
+channel, and are received by all Crazyflies at the same time instead of one
+packet per Crazyflie.
+
+Broadcast packets are not acknowledged, the Crazyflie firmware must support
+the broadcast address.
+"""
+import time
+
+import cflib.crtp
+from cflib.crazyflie.high_level_commander import HighLevelCommander
+from cflib.crazyflie.swarm import CachedCfFactory
+from cflib.crazyflie.swarm import Swarm
+
+broadcast_uri = 'radiobroadcast://0/30/2M'
+
+uris = {
+    'radio://0/30/2M/E7E7E7E711',
+    'radio://0/30/2M/E7E7E7E712',
+    # Add more URIs if you want more copters in the swarm
+}
+
+
+def activate_high_level_commander(scf):
+    scf.cf.param.set_value('commander.enHighLevel', '1')
+
+
+def broadcast_link_error(msg):
+    print('Broadcast link error: {}'.format(msg))
+
+
+if __name__ == '__main__':
+    cflib.crtp.init_drivers(enable_debug_driver=False)
+    factory = CachedCfFactory(rw_cache='./cache')
+    with Swarm(uris, factory=factory) as swarm:
+        swarm.parallel_safe(activate_high_level_commander)
+
+        link = cflib.crtp.get_link_driver(
+            broadcast_uri, link_error_callback=broadcast_link_error)
+        try:
+            commander = HighLevelCommander(link)
+
+            commander.takeoff(0.5, 2.0)
+            time.sleep(4)
+            commander.land(0.0, 2.0)
+            time.sleep(2)
+            commander.stop()
+            # Let the last packet go out before closing the link
+            time.sleep(0.1)
+        finally:
+            link.close()
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2020 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import sys
+import time
+import unittest
+
+from cflib.crazyflie import _AnswerPatterns
+from cflib.crazyflie import _IncomingPacketHandler
+from cflib.crazyflie import Crazyflie
+from cflib.crtp.crtpstack import CRTPPacket
+from cflib.utils.callbacks import Caller
+
+if sys.version_info < (3, 3):
+    from mock import MagicMock
+else:
+    from unittest.mock import MagicMock
+
+
+class IncomingPacketHandlerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cf_mock = MagicMock()
+        self.cf_mock.packet_received = Caller()
+        self.sut = _IncomingPacketHandler(self.cf_mock)
+
+    def test_that_port_callback_is_called_for_all_channels(self):
+        # Fixture
+        cb = MagicMock()
+        self.sut.add_port_callback(5, cb)
+        pk1 = CRTPPacket()
+        pk1.set_header(5, 0)
+        pk2 = CRTPPacket()
+        pk2.set_header(5, 2)
+
+        # Test
+        self.sut._dispatch_packet(pk1)
+        self.sut._dispatch_packet(pk2)
+
+        # Assert
+        self.assertEqual(2, cb.call_count)
+
+    def test_that_port_callback_is_not_called_for_other_ports(self):
+        # Fixture
+        cb = MagicMock()
+        self.sut.add_port_callback(5, cb)
+        pk = CRTPPacket()
+        pk.set_header(4, 0)
+
+        # Test
+        self.sut._dispatch_packet(pk)
+
+        # Assert
+        cb.assert_not_called()
+
+    def test_that_header_callback_is_only_called_for_its_channel(self):
+        # Fixture
+        cb = MagicMock()
+        self.sut.add_header_callback(cb, 2, 1)
+        pk1 = CRTPPacket()
+        pk1.set_header(2, 1)
+        pk2 = CRTPPacket()
+        pk2.set_header(2, 0)
+
+        # Test
+        self.sut._dispatch_packet(pk1)
+        self.sut._dispatch_packet(pk2)
+
+        # Assert
+        cb.assert_called_once_with(pk1)
+
+    def test_that_removed_callback_is_not_called(self):
+        # Fixture
+        cb = MagicMock()
+        other_cb = MagicMock()
+        self.sut.add_port_callback(5, cb)
+        self.sut.add_port_callback(5, other_cb)
+        pk = CRTPPacket()
+        pk.set_header(5, 0)
+
+        # Test
+        self.sut.remove_port_callback(5, cb)
+        self.sut._dispatch_packet(pk)
+
+        # Assert
+        cb.assert_not_called()
+        other_cb.assert_called_once_with(pk)
+
+    def test_that_callback_can_remove_itself_during_dispatch(self):
+        # Fixture
+        pk = CRTPPacket()
+        pk.set_header(5, 0)
+        other_cb = MagicMock()
+
+        def cb(packet):
+            self.sut.remove_port_callback(5, cb)
+
+        self.sut.add_port_callback(5, cb)
+        self.sut.add_port_callback(5, other_cb)
+
+        # Test
+        self.sut._dispatch_packet(pk)
+
+        # Assert
+        other_cb.assert_called_once_with(pk)
+
+
+class CrazyflieRetryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.link_mock = MagicMock()
+        self.link_mock.needs_resending = True
+        self.link_mock.receive_packet.return_value = None
+        self.sut = Crazyflie()
+        self.sut.link = self.link_mock
+
+    def tearDown(self):
+        self.sut.link = None
+        self.sut._retry_scheduler.cancel_all()
+
+    def test_that_packet_expecting_answer_is_resent(self):
+        # Fixture
+        pk = CRTPPacket()
+        pk.set_header(2, 0)
+        pk.data = (1, 2)
+
+        # Test
+        self.sut.send_packet(pk, expected_reply=(1,), timeout=0.01)
+        time.sleep(0.1)
+        self.sut.link = None
+
+        # Assert
+        self.assertTrue(self.link_mock.send_packet.call_count > 1)
+        self.assertTrue(self.sut.get_retry_stats()[2] > 0)
+
+    def test_that_packet_is_not_resent_when_answered(self):
+        # Fixture
+        pk = CRTPPacket()
+        pk.set_header(2, 0)
+        pk.data = (1, 2)
+        answer = CRTPPacket()
+        answer.set_header(2, 0)
+        answer.data = (1, 3)
+
+        # Test
+        self.sut.send_packet(pk, expected_reply=(1,), timeout=0.05)
+        self.sut._check_for_answers(answer)
+        time.sleep(0.1)
+
+        # Assert
+        self.link_mock.send_packet.assert_called_once_with(pk)
+        self.assertEqual({}, self.sut.get_retry_stats())
+
+    def test_that_close_link_stops_retry_thread(self):
+        # Fixture
+        pk = CRTPPacket()
+        pk.set_header(2, 0)
+        self.sut.send_packet(pk, expected_reply=(1,), timeout=10)
+        scheduler = self.sut._retry_scheduler
+
+        # Test
+        self.sut.close_link()
+
+        # Assert
+        self.assertFalse(scheduler.is_alive())
+        self.assertEqual(0, self.sut._retry_scheduler.pending())
+
+    def test_that_link_error_stops_retry_thread(self):
+        # Fixture
+        pk = CRTPPacket()
+        pk.set_header(2, 0)
+        self.sut.send_packet(pk, expected_reply=(1,), timeout=10)
+        scheduler = self.sut._retry_scheduler
+
+        # Test
+        self.sut._link_error_cb('Unplugged')
+
+        # Assert
+        self.assertFalse(scheduler.is_alive())
+        self.assertEqual(0, self.sut._retry_scheduler.pending())
+        self.assertEqual(0, len(self.sut._answer_patterns))
+
+
+class AnswerPatternsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sut = _AnswerPatterns()
+
+    def test_that_longest_matching_pattern_is_popped(self):
+        # Fixture
+        self.sut[(0x2c, 1)] = 'short'
+        self.sut[(0x2c, 1, 2)] = 'long'
+
+        # Test
+        actual = self.sut.pop_longest_match(0x2c, bytearray((1, 2, 3)))
+
+        # Assert
+        self.assertEqual('long', actual)
+        self.assertFalse((0x2c, 1, 2) in self.sut)
+        self.assertTrue((0x2c, 1) in self.sut)
+
+    def test_that_other_header_does_not_match(self):
+        # Fixture
+        self.sut[(0x2c, 1)] = 'retry'
+
+        # Test
+        actual = self.sut.pop_longest_match(0x5c, bytearray((1, 2)))
+
+        # Assert
+        self.assertIsNone(actual)
+        self.assertEqual(1, len(self.sut))
+
+    def test_that_partial_match_does_not_match(self):
+        # Fixture
+        self.sut[(0x2c, 1, 2)] = 'retry'
+
+        # Test
+        actual = self.sut.pop_longest_match(0x2c, bytearray((1, 3)))
+
+        # Assert
+        self.assertIsNone(actual)
+
+    def test_that_popped_pattern_is_removed_from_index(self):
+        # Fixture
+        self.sut[(0x2c, 1, 2)] = 'retry'
+        self.sut.pop_longest_match(0x2c, bytearray((1, 2)))
+
+        # Test
+        actual = self.sut.pop_longest_match(0x2c, bytearray((1, 2)))
+
+        # Assert
+        self.assertIsNone(actual)
+        self.assertEqual(0, len(self.sut))
+        self.assertEqual({}, self.sut._index)
+
+    def test_that_pattern_can_be_replaced(self):
+        # Fixture
+        self.sut[(0x2c, 1)] = 'first'
+
+        # Test
+        self.sut[(0x2c, 1)] = 'second'
+
+        # Assert
+        self.assertEqual('second',
+                         self.sut.pop_longest_match(0x2c, bytearray((1,))))
+        self.assertEqual(0, len(self.sut))
+
+    def test_that_pop_does_not_fail_when_cleared_concurrently(self):
+        # Fixture
+        self.sut[(0x2c, 1)] = 'retry'
+        sut = self.sut
+
+        class ClearingLock(object):
+            """Clears the patterns just before the lock is taken"""
+
+            def __enter__(self):
+                sut._patterns = {}
+                sut._index = {}
+
+            def __exit__(self, type, value, traceback):
+                pass
+
+        self.sut._lock = ClearingLock()
+
+        # Test
+        actual = self.sut.pop_longest_match(0x2c, bytearray((1,)))
+
+        # Assert
+        self.assertIsNone(actual)
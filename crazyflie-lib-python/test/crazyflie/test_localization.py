@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2020 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import sys
+import unittest
+
+from cflib.crazyflie.localization import Localization
+from cflib.crtp.packetpool import PacketPool
+
+if sys.version_info < (3, 3):
+    from mock import MagicMock
+else:
+    from unittest.mock import MagicMock
+
+
+class LocalizationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sut = Localization(MagicMock())
+        self.received = []
+        self.sut.receivedLocationPacket.add_callback(self.received.append)
+
+    def test_that_raw_data_is_kept_when_pooled_packet_is_reused(self):
+        # Fixture
+        pool = PacketPool(1)
+        pk = pool.acquire(bytearray((0x61, 0x02, 1, 2, 3)))
+
+        # Test
+        self.sut._incoming(pk)
+        pool.release(pk)
+        pool.acquire(bytearray((0x61, 0x02, 4, 5, 6)))
+
+        # Assert
+        self.assertEqual(Localization.LPS_SHORT_LPP_PACKET,
+                         self.received[0].type)
+        self.assertEqual(bytearray((1, 2, 3)),
+                         bytearray(self.received[0].raw_data))
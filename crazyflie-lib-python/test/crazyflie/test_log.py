@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2020 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import struct
+import sys
+import unittest
+
+from cflib.crazyflie.log import _TimestampUnwrapper
+from cflib.crazyflie.log import CHAN_LOGDATA
+from cflib.crazyflie.log import CHAN_SETTINGS
+from cflib.crazyflie.log import CMD_DELETE_BLOCK
+from cflib.crazyflie.log import ClockEstimator
+from cflib.crazyflie.log import CMD_RESET_LOGGING
+from cflib.crazyflie.log import Log
+from cflib.crazyflie.log import LogConfig
+from cflib.crazyflie.log import LogTocElement
+from cflib.crazyflie.toc import Toc
+from cflib.crtp.crtpstack import CRTPPacket
+from cflib.crtp.crtpstack import CRTPPort
+
+if sys.version_info < (3, 3):
+    from mock import MagicMock
+else:
+    from unittest.mock import MagicMock
+
+
+class LogConfigTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = struct.pack('<fhB', 1.5, -2, 3)
+        self.received = []
+
+    def _log_config(self, data_format=LogConfig.DICT):
+        log_config = LogConfig('test', 10, data_format)
+        log_config.add_variable('stabilizer.roll', 'float')
+        log_config.add_variable('motor.m1', 'int16_t')
+        log_config.add_variable('pm.state', 'uint8_t')
+        log_config.data_received_cb.add_callback(
+            lambda timestamp, data, logconf: self.received.append(
+                (timestamp, data)))
+        return log_config
+
+    def test_that_data_is_unpacked_to_dict(self):
+        # Fixture
+        sut = self._log_config()
+
+        # Test
+        sut.unpack_log_data(self.data, 1234)
+
+        # Assert
+        self.assertEqual(
+            [(1234, {'stabilizer.roll': 1.5, 'motor.m1': -2, 'pm.state': 3})],
+            self.received)
+
+    def test_that_data_is_unpacked_to_tuple(self):
+        # Fixture
+        sut = self._log_config(LogConfig.TUPLE)
+
+        # Test
+        sut.unpack_log_data(self.data, 1234)
+
+        # Assert
+        self.assertEqual([(1234, (1.5, -2, 3))], self.received)
+        self.assertEqual(('stabilizer.roll', 'motor.m1', 'pm.state'),
+                         sut.variable_names)
+
+    def test_that_data_is_unpacked_to_named_tuple(self):
+        # Fixture
+        sut = self._log_config(LogConfig.NAMED_TUPLE)
+
+        # Test
+        sut.unpack_log_data(self.data, 1234)
+
+        # Assert
+        sample = self.received[0][1]
+        self.assertEqual(1.5, sample.stabilizer_roll)
+        self.assertEqual(-2, sample.motor_m1)
+        self.assertEqual(3, sample.pm_state)
+
+    def test_that_variable_added_after_unpacking_is_unpacked(self):
+        # Fixture
+        sut = self._log_config(LogConfig.TUPLE)
+        sut.unpack_log_data(self.data, 1)
+
+        # Test
+        sut.add_variable('pm.vbat', 'float')
+        sut.unpack_log_data(self.data + struct.pack('<f', 3.5), 2)
+
+        # Assert
+        self.assertEqual((2, (1.5, -2, 3, 3.5)), self.received[1])
+
+    def test_that_data_is_unpacked_from_memoryview(self):
+        # Fixture
+        sut = self._log_config(LogConfig.TUPLE)
+        packet = bytearray(4) + bytearray(self.data)
+
+        # Test
+        sut.unpack_log_data(memoryview(packet)[4:], 1234)
+
+        # Assert
+        self.assertEqual([(1234, (1.5, -2, 3))], self.received)
+
+
+class LogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cf_mock = MagicMock()
+        self.cf_mock.platform.get_protocol_version.return_value = 3
+        self.cf_mock.link.toc_window_size = 1
+        self.sut = Log(self.cf_mock)
+        self.sut.toc = Toc()
+        self._add_element()
+
+    def _add_element(self):
+        element = LogTocElement()
+        element.ident = 0
+        element.group = 'pm'
+        element.name = 'vbat'
+        element.ctype = 'float'
+        self.sut.toc.add_element(element)
+
+    def _add_config(self):
+        log_config = LogConfig('test', 100)
+        log_config.add_variable('pm.vbat')
+        self.sut.add_config(log_config)
+        return log_config
+
+    def _packet(self, channel, data):
+        pk = CRTPPacket()
+        pk.set_header(CRTPPort.LOGGING, channel)
+        pk.data = data
+        return pk
+
+    def test_that_added_configs_get_different_ids(self):
+        # Fixture
+
+        # Test
+        ids = set(self._add_config().id for _ in range(10))
+
+        # Assert
+        self.assertEqual(10, len(ids))
+
+    def test_that_log_data_is_dispatched_by_block_id(self):
+        # Fixture
+        self._add_config()
+        log_config = self._add_config()
+        data_received = MagicMock()
+        log_config.data_received_cb.add_callback(data_received)
+
+        # Test
+        self.sut._new_packet_cb(self._packet(
+            CHAN_LOGDATA, struct.pack('<B3sf', log_config.id,
+                                      b'\x01\x00\x00', 3.5)))
+
+        # Assert
+        data_received.assert_called_once_with(1, {'pm.vbat': 3.5},
+                                              log_config)
+        timestamp = data_received.call_args[0][0]
+        self.assertIsNotNone(timestamp.host_time)
+
+    def test_that_deleted_block_is_removed(self):
+        # Fixture
+        log_config = self._add_config()
+        id = log_config.id
+
+        # Test
+        self.sut._new_packet_cb(self._packet(
+            CHAN_SETTINGS, (CMD_DELETE_BLOCK, id, 0)))
+
+        # Assert
+        self.assertEqual([], self.sut.log_blocks)
+        self.assertIsNone(self.sut._find_block(id))
+        self.assertIsNone(log_config.id)
+
+    def test_that_deleted_block_gets_new_id_when_started(self):
+        # Fixture
+        self.cf_mock.log = self.sut
+        for _ in range(253):
+            self._add_config()
+        log_config = self._add_config()
+        self.sut._new_packet_cb(self._packet(
+            CHAN_SETTINGS, (CMD_DELETE_BLOCK, log_config.id, 0)))
+        other = self._add_config()
+        self.sut._new_packet_cb(self._packet(
+            CHAN_SETTINGS, (CMD_DELETE_BLOCK, 1, 0)))
+
+        # Test
+        log_config.start()
+
+        # Assert
+        self.assertEqual(1, log_config.id)
+        self.assertIs(log_config, self.sut._find_block(1))
+        self.assertIs(other, self.sut._find_block(254))
+        pk = self.cf_mock.send_packet.call_args[0][0]
+        self.assertEqual(1, pk.data[1])
+
+    def test_that_ids_of_active_blocks_are_never_reused(self):
+        # Fixture
+        active = [self._add_config() for _ in range(253)]
+        deleted_id = active.pop(0).id
+        self.sut._new_packet_cb(self._packet(
+            CHAN_SETTINGS, (CMD_DELETE_BLOCK, deleted_id, 0)))
+
+        # Test
+        log_config = self._add_config()
+
+        # Assert
+        self.assertEqual(254, log_config.id)
+        self.assertEqual(
+            254, len(set(c.id for c in active + [log_config]) | {deleted_id}))
+
+    def test_that_no_free_id_raises(self):
+        # Fixture
+        for _ in range(254):
+            self._add_config()
+
+        # Test
+        # Assert
+        with self.assertRaises(Exception):
+            self._add_config()
+
+    def test_that_reset_removes_all_blocks(self):
+        # Fixture
+        self._add_config()
+        self.sut.toc = None
+
+        # Test
+        self.sut._new_packet_cb(self._packet(
+            CHAN_SETTINGS, (CMD_RESET_LOGGING, 0, 0)))
+
+        # Assert
+        self.assertEqual([], self.sut.log_blocks)
+        self._add_element()
+        self.assertEqual(1, self._add_config().id)
+
+
+class TimestampUnwrapperTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sut = _TimestampUnwrapper()
+
+    def test_that_timestamps_continue_after_wrap_around(self):
+        # Fixture
+        self.sut.unwrap(0xFFFFF0)
+
+        # Test
+        actual = self.sut.unwrap(0x000010)
+
+        # Assert
+        self.assertEqual(0x1000010, actual)
+
+    def test_that_late_timestamp_from_before_wrap_around_is_kept(self):
+        # Fixture
+        self.sut.unwrap(0xFFFFF0)
+        self.sut.unwrap(0x000010)
+
+        # Test
+        actual = self.sut.unwrap(0xFFFFF8)
+
+        # Assert
+        self.assertEqual(0xFFFFF8, actual)
+        self.assertEqual(0x1000020, self.sut.unwrap(0x000020))
+
+
+class ClockEstimatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sut = ClockEstimator()
+
+    def test_that_offset_and_drift_are_estimated(self):
+        # Fixture
+        offset = 100.0
+        drift = 50e-6
+        latencies = [0.002, 0.015, 0.004, 0.009, 0.001, 0.020, 0.007]
+
+        # Test
+        for i in range(3000):
+            copter_time = i * 0.01
+            host_time = (copter_time * (1 + drift) + offset +
+                         latencies[i % len(latencies)])
+            self.sut.update(copter_time, host_time)
+
+        # Assert
+        self.assertAlmostEqual(drift, self.sut.drift, delta=5e-6)
+        copter_time = 40.0
+        expected = copter_time * (1 + drift) + offset
+        self.assertAlmostEqual(expected, self.sut.to_host(copter_time),
+                               delta=0.002)
+
+    def test_that_first_update_gives_offset(self):
+        # Fixture
+
+        # Test
+        self.sut.update(5.0, 105.01)
+
+        # Assert
+        self.assertAlmostEqual(105.01, self.sut.to_host(5.0))
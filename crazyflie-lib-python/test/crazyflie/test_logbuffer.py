@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2020 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import struct
+import unittest
+
+from cflib.crazyflie.log import LogConfig
+from cflib.crazyflie.log import LogTimestamp
+from cflib.crazyflie.logbuffer import found_numpy
+from cflib.crazyflie.logbuffer import LogRingBuffer
+
+
+@unittest.skipIf(not found_numpy, 'NumPy is not installed')
+class LogRingBufferTest(unittest.TestCase):
+
+    def setUp(self):
+        self.log_config = LogConfig('test', 10)
+        self.log_config.add_variable('stabilizer.roll', 'float')
+        self.log_config.add_variable('motor.m1', 'uint16_t')
+
+        self.sut = LogRingBuffer(self.log_config, 4)
+
+    def _receive(self, *timestamps):
+        for timestamp in timestamps:
+            self.log_config.unpack_log_data(
+                struct.pack('<fH', timestamp / 2.0, timestamp), timestamp)
+
+    def test_that_samples_are_written_in_columns(self):
+        # Fixture
+
+        # Test
+        self._receive(1, 2)
+
+        # Assert
+        actual = self.sut.snapshot()
+        self.assertEqual([1, 2], list(actual['timestamp']))
+        self.assertEqual([0.5, 1.0], list(actual['stabilizer.roll']))
+        self.assertEqual([1, 2], list(actual['motor.m1']))
+
+    def test_that_host_time_is_written(self):
+        # Fixture
+        timestamp = LogTimestamp(1 << 30)
+        timestamp.host_time = 12.5
+
+        # Test
+        self.log_config.unpack_log_data(struct.pack('<fH', 1, 2), timestamp)
+
+        # Assert
+        actual = self.sut.snapshot()
+        self.assertEqual(1 << 30, actual['timestamp'][0])
+        self.assertEqual(12.5, actual['host_time'][0])
+
+    def test_that_snapshot_has_last_samples_in_order(self):
+        # Fixture
+
+        # Test
+        self._receive(1, 2, 3, 4, 5, 6)
+
+        # Assert
+        self.assertEqual([3, 4, 5, 6],
+                         list(self.sut.snapshot()['timestamp']))
+        self.assertEqual(4, len(self.sut))
+
+    def test_that_drain_returns_new_samples_once(self):
+        # Fixture
+        self._receive(1, 2)
+        self.sut.drain()
+
+        # Test
+        self._receive(3, 4, 5)
+        actual = self.sut.drain()
+
+        # Assert
+        self.assertEqual([3, 4, 5], list(actual['timestamp']))
+        self.assertEqual(0, len(self.sut.drain()))
+
+    def test_that_full_snapshot_is_not_changed_by_new_samples(self):
+        # Fixture
+        self._receive(0, 1, 2, 3)
+        actual = self.sut.snapshot()
+
+        # Test
+        self._receive(4)
+
+        # Assert
+        self.assertEqual([0, 1, 2, 3], list(actual['timestamp']))
+
+    def test_that_drained_samples_are_not_changed_by_new_samples(self):
+        # Fixture
+        self._receive(0, 1, 2, 3)
+        actual = self.sut.drain()
+
+        # Test
+        self._receive(4, 5)
+
+        # Assert
+        self.assertEqual([0, 1, 2, 3], list(actual['timestamp']))
+
+    def test_that_overwritten_samples_are_counted(self):
+        # Fixture
+
+        # Test
+        self._receive(1, 2, 3, 4, 5, 6)
+
+        # Assert
+        self.assertEqual(2, self.sut.overruns)
+        self.assertEqual([3, 4, 5, 6], list(self.sut.drain()['timestamp']))
+
+    def test_that_empty_buffer_gives_empty_snapshot(self):
+        # Fixture
+
+        # Test
+        actual = self.sut.snapshot()
+
+        # Assert
+        self.assertEqual(0, len(actual))
+
+    def test_that_closed_buffer_gets_no_samples(self):
+        # Fixture
+        self.sut.close()
+
+        # Test
+        self._receive(1)
+
+        # Assert
+        self.assertEqual(0, len(self.sut))
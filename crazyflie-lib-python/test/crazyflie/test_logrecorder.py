@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2020 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import unittest
+
+from cflib.crazyflie.log import CHAN_LOGDATA
+from cflib.crazyflie.log import CHAN_SETTINGS
+from cflib.crazyflie.log import LogConfig
+from cflib.crazyflie.logrecorder import found_numpy
+from cflib.crazyflie.logrecorder import LogReader
+from cflib.crazyflie.logrecorder import LogRecorder
+from cflib.crtp.crtpstack import CRTPPacket
+from cflib.crtp.crtpstack import CRTPPort
+
+if sys.version_info < (3, 3):
+    from mock import MagicMock
+else:
+    from unittest.mock import MagicMock
+
+
+class LogRecorderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'log.cflr')
+        self.cf_mock = MagicMock()
+
+        self.stab = LogConfig('stab', 10)
+        self.stab.add_variable('stabilizer.roll', 'float')
+        self.stab.add_variable('motor.m1', 'uint16_t')
+        self.stab.id = 1
+        self.stab.added = True
+        self.pm = LogConfig('pm', 100)
+        self.pm.add_variable('pm.state', 'int8_t')
+        self.pm.id = 2
+        self.pm.added = True
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _record(self, packets, chunk_size=2):
+        sut = LogRecorder(self.cf_mock, self.filename, chunk_size)
+        packet_cb = self.cf_mock.add_port_callback.call_args[0][1]
+        sut.add_config(self.stab)
+        sut.add_config(self.pm)
+        for pk in packets:
+            if callable(pk):
+                pk()
+            else:
+                packet_cb(pk)
+        sut.close()
+
+    def _delete(self, log_config):
+        def delete():
+            log_config.added = False
+            log_config.id = None
+        return delete
+
+    def _add(self, log_config, block_id):
+        def add():
+            log_config.id = block_id
+            log_config.added = True
+        return add
+
+    def _packet(self, block_id, timestamp, data, channel=CHAN_LOGDATA):
+        pk = CRTPPacket()
+        pk.set_header(CRTPPort.LOGGING, channel)
+        pk.data = struct.pack('<BI', block_id, timestamp)[:4] + data
+        return pk
+
+    def _stab_packet(self, timestamp):
+        data = struct.pack('<fH', timestamp / 2.0, timestamp & 0xFFFF)
+        return self._packet(1, timestamp, data)
+
+    def test_that_recorded_samples_are_read_back(self):
+        # Fixture
+        self._record([self._stab_packet(10),
+                      self._packet(2, 15, struct.pack('<b', -3)),
+                      self._stab_packet(20),
+                      self._stab_packet(30)])
+
+        # Test
+        actual = [(name, timestamp, data)
+                  for name, timestamp, _, data in LogReader(self.filename)]
+
+        # Assert
+        self.assertEqual(
+            [('stab', 10, {'stabilizer.roll': 5.0, 'motor.m1': 10}),
+             ('stab', 20, {'stabilizer.roll': 10.0, 'motor.m1': 20}),
+             ('stab', 30, {'stabilizer.roll': 15.0, 'motor.m1': 30})],
+            [sample for sample in actual if sample[0] == 'stab'])
+        self.assertEqual([('pm', 15, {'pm.state': -3})],
+                         [sample for sample in actual if sample[0] == 'pm'])
+
+    def test_that_other_packets_are_not_recorded(self):
+        # Fixture
+        self._record([self._packet(3, 10, b'\x01'),
+                      self._packet(1, 10, b'\x00\x00', CHAN_SETTINGS)])
+
+        # Test
+        actual = list(LogReader(self.filename))
+
+        # Assert
+        self.assertEqual([], actual)
+
+    def test_that_reused_id_of_deleted_config_is_not_recorded(self):
+        # Fixture
+        self._record([self._stab_packet(10),
+                      self._delete(self.stab),
+                      self._stab_packet(20)])
+
+        # Test
+        actual = [(name, timestamp) for name, timestamp, _, _ in
+                  LogReader(self.filename)]
+
+        # Assert
+        self.assertEqual([('stab', 10)], actual)
+
+    def test_that_config_added_again_with_new_id_is_recorded(self):
+        # Fixture
+        self._record([self._packet(2, 10, struct.pack('<b', 1)),
+                      self._delete(self.pm),
+                      self._add(self.pm, 3),
+                      self._packet(3, 20, struct.pack('<b', 2)),
+                      self._packet(2, 30, struct.pack('<b', 3))])
+
+        # Test
+        actual = [(name, timestamp, data) for name, timestamp, _, data in
+                  LogReader(self.filename)]
+
+        # Assert
+        self.assertEqual([('pm', 10, {'pm.state': 1}),
+                          ('pm', 20, {'pm.state': 2})], actual)
+
+    def test_that_timestamps_are_unwrapped(self):
+        # Fixture
+        self._record([self._stab_packet(0xFFFFF0),
+                      self._stab_packet(0x000010)])
+
+        # Test
+        actual = [timestamp for _, timestamp, _, _ in
+                  LogReader(self.filename)]
+
+        # Assert
+        self.assertEqual([0xFFFFF0, 0x1000010], actual)
+
+    def test_that_port_callback_is_removed_when_closed(self):
+        # Fixture
+
+        # Test
+        self._record([])
+
+        # Assert
+        self.cf_mock.remove_port_callback.assert_called_once_with(
+            CRTPPort.LOGGING, self.cf_mock.add_port_callback.call_args[0][1])
+
+    @unittest.skipIf(not found_numpy, 'NumPy is not installed')
+    def test_that_samples_are_read_as_arrays(self):
+        # Fixture
+        self._record([self._stab_packet(t) for t in range(10, 60, 10)])
+
+        # Test
+        actual = LogReader(self.filename).to_numpy()
+
+        # Assert
+        stab = actual['stab']
+        self.assertEqual([10, 20, 30, 40, 50], list(stab['timestamp']))
+        self.assertEqual([5.0, 10.0, 15.0, 20.0, 25.0],
+                         list(stab['stabilizer.roll']))
+        self.assertEqual([10, 20, 30, 40, 50], list(stab['motor.m1']))
+        self.assertEqual(5, len(stab['host_time']))
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2020 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import sys
+import unittest
+
+from cflib.crazyflie.log import CMD_DELETE_BLOCK
+from cflib.crazyflie.log import LogTocElement
+from cflib.crazyflie.logsession import _pack_variables
+from cflib.crazyflie.logsession import LogSession
+from cflib.crazyflie.toc import Toc
+
+if sys.version_info < (3, 3):
+    from mock import MagicMock
+else:
+    from unittest.mock import MagicMock
+
+
+class PackVariablesTest(unittest.TestCase):
+
+    def test_that_variables_are_packed_first_fit_decreasing(self):
+        # Fixture
+        variables = [('f%d' % i, 4) for i in range(9)] + \
+            [('h%d' % i, 2) for i in range(5)] + [('b0', 1), ('b1', 1)]
+
+        # Test
+        actual = _pack_variables(variables)
+
+        # Assert
+        self.assertEqual(2, len(actual))
+        self.assertEqual(sorted(name for name, _ in variables),
+                         sorted(sum(actual, [])))
+        sizes = dict(variables)
+        for names in actual:
+            self.assertLessEqual(sum(sizes[name] for name in names), 30)
+
+    def test_that_number_of_variables_per_bin_is_limited(self):
+        # Fixture
+        variables = [('b%d' % i, 1) for i in range(20)]
+
+        # Test
+        actual = _pack_variables(variables, max_count=9)
+
+        # Assert
+        self.assertEqual([9, 9, 2], [len(names) for names in actual])
+
+
+class LogSessionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cf_mock = MagicMock()
+        self.cf_mock.log.toc = Toc()
+        self.cf_mock.log.add_config.side_effect = self._add_config
+        self.cf_mock.platform.get_protocol_version.return_value = 4
+        for i in range(10):
+            self._add_element(i, 'float')
+        self._add_element(10, 'uint8_t')
+
+        self.sut = LogSession(self.cf_mock)
+        self.received = []
+        self.sut.data_received_cb.add_callback(
+            lambda timestamp, data, session: self.received.append(
+                (timestamp, data)))
+
+    def test_that_variables_are_split_in_blocks_per_period(self):
+        # Fixture
+        for i in range(10):
+            self.sut.add_variable('group.var%d' % i, 10)
+        self.sut.add_variable('group.var10', 100)
+
+        # Test
+        self.sut.start()
+
+        # Assert
+        periods = sorted(log_config.period_in_ms
+                         for log_config in self.sut.log_configs)
+        self.assertEqual([10, 10, 100], periods)
+        self.assertEqual(3, self.cf_mock.log.add_config.call_count)
+
+    def test_that_create_block_packet_of_small_variables_fits(self):
+        # Fixture
+        for i in range(11, 36):
+            self._add_element(i, 'uint8_t')
+            self.sut.add_variable('group.var%d' % i, 10)
+
+        # Test
+        self.sut.start()
+
+        # Assert
+        self.assertEqual(3, len(self.sut.log_configs))
+        for log_config in self.sut.log_configs:
+            self.assertLessEqual(2 + 3 * len(log_config.variables), 30)
+
+    def test_that_create_block_packet_fits_with_old_protocol(self):
+        # Fixture
+        self.cf_mock.platform.get_protocol_version.return_value = 3
+        for i in range(11, 36):
+            self._add_element(i, 'uint8_t')
+            self.sut.add_variable('group.var%d' % i, 10)
+
+        # Test
+        self.sut.start()
+
+        # Assert
+        self.assertEqual(2, len(self.sut.log_configs))
+        for log_config in self.sut.log_configs:
+            self.assertLessEqual(2 + 2 * len(log_config.variables), 30)
+
+    def test_that_data_of_blocks_with_same_period_is_merged(self):
+        # Fixture
+        for i in range(10):
+            self.sut.add_variable('group.var%d' % i, 10)
+        self.sut.start()
+        first, second = self.sut.log_configs
+
+        # Test
+        self._receive(first, 1000)
+        self._receive(second, 1003)
+
+        # Assert
+        self.assertEqual(1, len(self.received))
+        timestamp, data = self.received[0]
+        self.assertEqual(1000, timestamp)
+        self.assertEqual(dict(('group.var%d' % i, float(i))
+                              for i in range(10)), data)
+
+    def test_that_incomplete_sample_is_dropped(self):
+        # Fixture
+        for i in range(10):
+            self.sut.add_variable('group.var%d' % i, 10)
+        self.sut.start()
+        first, second = self.sut.log_configs
+
+        # Test
+        self._receive(first, 1000)
+        self._receive(first, 1010)
+        self._receive(second, 1012)
+
+        # Assert
+        self.assertEqual([1010], [ts for ts, _ in self.received])
+        self.assertEqual(1, self.sut.dropped_frames)
+
+    def test_that_unknown_variable_raises(self):
+        # Fixture
+        self.sut.add_variable('group.unknown', 10)
+
+        # Test
+        # Assert
+        with self.assertRaises(KeyError):
+            self.sut.start()
+
+    def test_that_added_blocks_are_deleted_if_a_block_is_rejected(self):
+        # Fixture
+        for i in range(10):
+            self.sut.add_variable('group.var%d' % i, 10)
+        self.cf_mock.log.add_config.side_effect = self._reject_second_config
+
+        # Test
+        with self.assertRaises(AttributeError):
+            self.sut.start()
+
+        # Assert
+        first = self.sut.log_configs[0]
+        self.assertEqual([], first.data_received_cb.callbacks)
+        self.assertEqual([CMD_DELETE_BLOCK], self._sent_commands())
+
+    def test_that_blocks_are_deleted_when_crazyflie_fails_to_create_one(self):
+        # Fixture
+        for i in range(10):
+            self.sut.add_variable('group.var%d' % i, 10)
+        self.sut.start()
+        self.cf_mock.send_packet.reset_mock()
+        errors = []
+        self.sut.error_cb.add_callback(
+            lambda session, msg: errors.append(msg))
+        first, second = self.sut.log_configs
+
+        # Test
+        first.error_cb.call(first, 'No memory')
+        second.error_cb.call(second, 'No memory')
+
+        # Assert
+        self.assertEqual(['No memory'], errors)
+        self.assertEqual([CMD_DELETE_BLOCK] * 2, self._sent_commands())
+
+    def _reject_second_config(self, log_config):
+        if self.cf_mock.log.add_config.call_count == 2:
+            raise AttributeError('Too large')
+        self._add_config(log_config)
+
+    def _sent_commands(self):
+        return [call[0][0].data[0]
+                for call in self.cf_mock.send_packet.call_args_list]
+
+    def _add_element(self, ident, ctype):
+        element = LogTocElement()
+        element.ident = ident
+        element.group = 'group'
+        element.name = 'var%d' % ident
+        element.ctype = ctype
+        self.cf_mock.log.toc.add_element(element)
+
+    def _add_config(self, log_config):
+        log_config.cf = self.cf_mock
+        log_config.valid = True
+
+    def _receive(self, log_config, timestamp):
+        values = tuple(float(name[len('group.var'):])
+                       for name in log_config.variable_names)
+        log_config.data_received_cb.call(timestamp, values, log_config)
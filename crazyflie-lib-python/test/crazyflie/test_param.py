@@ -0,0 +1,486 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2020 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import struct
+import sys
+import time
+import unittest
+from threading import Event
+
+from cflib.crazyflie.param import _ParamUpdater
+from cflib.crazyflie.param import Param
+from cflib.crazyflie.param import ParamTocElement
+from cflib.crazyflie.param import READ_CHANNEL
+from cflib.crazyflie.param import WRITE_CHANNEL
+from cflib.crtp.crtpstack import CRTPPacket
+from cflib.crtp.crtpstack import CRTPPort
+
+if sys.version_info < (3, 3):
+    from mock import MagicMock
+else:
+    from unittest.mock import MagicMock
+
+
+class ParamTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cf_mock = MagicMock()
+        self.cf_mock.platform.get_protocol_version.return_value = 3
+        self.cf_mock.link.param_window_size = 4
+        self.cf_mock.send_packet.side_effect = self._answer_request
+
+        self.cf_mock.link_uri = 'debug://0/0'
+        self.sut = Param(self.cf_mock)
+        self.sut.toc.crc = 0x1234
+        self._add_element(0, 'pid', 'kp')
+        self._add_element(1, 'pid', 'ki')
+        self._add_element(2, 'motor', 'm1')
+        self.values_on_copter = {0: 10, 1: 11, 2: 12}
+
+    def tearDown(self):
+        self.sut.param_updater.close()
+
+    def test_that_get_value_fetches_value_not_yet_fetched(self):
+        # Fixture
+
+        # Test
+        actual = self.sut.get_value('pid.ki')
+
+        # Assert
+        self.assertEqual(11, actual)
+        self.assertEqual([1], self._requested_var_ids())
+
+    def test_that_get_value_uses_already_fetched_value(self):
+        # Fixture
+        self.sut.values['pid'] = {'kp': 3}
+
+        # Test
+        actual = self.sut.get_value('pid.kp')
+
+        # Assert
+        self.assertEqual(3, actual)
+        self.cf_mock.send_packet.assert_not_called()
+
+    def test_that_get_value_of_unknown_param_raises(self):
+        # Fixture
+
+        # Test
+        # Assert
+        with self.assertRaises(KeyError):
+            self.sut.get_value('pid.unknown')
+
+    def test_that_group_update_only_fetches_the_group(self):
+        # Fixture
+        updated = Event()
+        self.sut.add_update_callback(
+            group='pid', name='ki', cb=lambda name, value: updated.set())
+
+        # Test
+        self.sut.request_group_update('pid')
+
+        # Assert
+        self.assertTrue(updated.wait(1))
+        self.assertEqual({'pid': {'kp': 10, 'ki': 11}}, self.sut.values)
+        self.assertFalse(self.sut.is_updated)
+
+    def test_that_all_updated_is_called_when_last_value_is_fetched(self):
+        # Fixture
+        all_updated = Event()
+        self.sut.all_updated.add_callback(all_updated.set)
+        self.sut.get_value('pid.kp')
+        self.sut.get_value('pid.ki')
+
+        # Test
+        self.sut.get_value('motor.m1')
+
+        # Assert
+        self.assertTrue(all_updated.wait(1))
+        self.assertTrue(self.sut.is_updated)
+
+    def test_that_identity_is_requested_first_with_value_cache(self):
+        # Fixture
+        self._add_identity()
+        self.sut.value_cache = MagicMock()
+        self.sut.value_cache.fetch.return_value = None
+        all_updated = Event()
+        self.sut.all_updated.add_callback(all_updated.set)
+
+        # Test
+        self.sut.request_update_of_all_params()
+
+        # Assert
+        self.assertTrue(all_updated.wait(1))
+        self.assertEqual([10, 11, 12], self._requested_var_ids()[:3])
+        self.sut.value_cache.fetch.assert_called_once_with(
+            0x1234, '000000A1000000B2000000C3')
+
+    def test_that_only_volatile_and_written_values_are_read(self):
+        # Fixture
+        self._add_identity()
+        self._add_element(3, 'motor', 'm2')
+        self.values_on_copter[3] = 13
+        self.sut.toc.get_element_by_id(2).access = ParamTocElement.RO_ACCESS
+        self.sut.value_cache = MagicMock()
+        self.sut.value_cache.fetch.return_value = (
+            {'pid': {'kp': 1, 'ki': 2}, 'motor': {'m1': 3}}, ['pid.ki'])
+        all_updated = Event()
+        self.sut.all_updated.add_callback(all_updated.set)
+
+        # Test
+        self.sut.request_update_of_all_params()
+
+        # Assert
+        self.assertTrue(all_updated.wait(1))
+        self.assertEqual([10, 11, 12], self._requested_var_ids()[:3])
+        self.assertEqual([1, 2, 3], sorted(self._requested_var_ids()[3:]))
+        self.assertEqual({'kp': 1, 'ki': 11}, self.sut.values['pid'])
+        self.assertEqual({'m1': 12, 'm2': 13}, self.sut.values['motor'])
+
+    def test_that_fetched_values_are_saved_in_cache(self):
+        # Fixture
+        self._add_identity()
+        self.sut.value_cache = MagicMock()
+        self.sut.value_cache.fetch.return_value = None
+        all_updated = Event()
+        self.sut.all_updated.add_callback(all_updated.set)
+
+        # Test
+        self.sut.request_update_of_all_params()
+
+        # Assert
+        self.assertTrue(all_updated.wait(1))
+        self._wait_for_calls(self.sut.value_cache.insert, 1)
+        self.sut.value_cache.insert.assert_called_once_with(
+            0x1234, '000000A1000000B2000000C3',
+            {'pid': {'kp': 10, 'ki': 11}, 'motor': {'m1': 12},
+             'cpu': {'id0': 0xA1, 'id1': 0xB2, 'id2': 0xC3}}, [])
+
+    def test_that_cache_is_updated_when_write_is_confirmed(self):
+        # Fixture
+        self._add_identity()
+        self.sut.value_cache = MagicMock()
+        self.sut.value_cache.fetch.return_value = None
+        self.sut.request_update_of_all_params()
+        self._wait_for_calls(self.sut.value_cache.insert, 1)
+
+        # Test
+        self.sut.set_value('pid.kp', 5)
+
+        # Assert
+        self._wait_for_calls(self.sut.value_cache.insert, 2)
+        saved = self.sut.value_cache.insert.call_args[0]
+        self.assertEqual(5, saved[2]['pid']['kp'])
+        self.assertEqual(['pid.kp'], saved[3])
+
+    def test_that_cache_is_saved_once_for_several_writes(self):
+        # Fixture
+        self._add_identity()
+        self.sut.value_cache = MagicMock()
+        self.sut.value_cache.fetch.return_value = None
+        self.sut.request_update_of_all_params()
+        self._wait_for_calls(self.sut.value_cache.insert, 1)
+        written_cb = MagicMock()
+
+        # Test
+        self.sut.set_values({'pid.kp': 5, 'pid.ki': 6}, written_cb)
+        self._wait_for_calls(written_cb, 2)
+        self.sut._disconnected('debug://0/0')
+
+        # Assert
+        self.assertEqual(2, self.sut.value_cache.insert.call_count)
+        saved = self.sut.value_cache.insert.call_args[0]
+        self.assertEqual({'kp': 5, 'ki': 6}, saved[2]['pid'])
+        self.assertEqual(['pid.ki', 'pid.kp'], saved[3])
+
+    def test_that_values_are_not_cached_without_identity(self):
+        # Fixture
+        self.sut.value_cache = MagicMock()
+        all_updated = Event()
+        self.sut.all_updated.add_callback(all_updated.set)
+
+        # Test
+        self.sut.request_update_of_all_params()
+
+        # Assert
+        self.assertTrue(all_updated.wait(1))
+        self.sut.value_cache.fetch.assert_not_called()
+        self.sut.value_cache.insert.assert_not_called()
+
+    def test_that_set_values_reports_each_written_param(self):
+        # Fixture
+        written = []
+        all_written = Event()
+
+        def written_cb(name, value):
+            written.append((name, value))
+            if len(written) == 2:
+                all_written.set()
+
+        # Test
+        self.sut.set_values({'pid.kp': 3, 'motor.m1': '0x10'}, written_cb)
+
+        # Assert
+        self.assertTrue(all_written.wait(1))
+        self.assertEqual([('motor.m1', 16), ('pid.kp', 3)], sorted(written))
+
+    def test_that_set_values_sends_nothing_if_a_param_is_unknown(self):
+        # Fixture
+
+        # Test
+        with self.assertRaises(KeyError):
+            self.sut.set_values({'pid.kp': 3, 'pid.unknown': 4})
+
+        # Assert
+        time.sleep(0.05)
+        self.cf_mock.send_packet.assert_not_called()
+
+    def test_that_values_are_packed_with_param_type(self):
+        # Fixture
+        float_element = self.sut.toc.get_element_by_id(2)
+        float_element.pytype = '<f'
+
+        # Test
+        pk_int = self.sut._write_packet('pid.kp', '12')
+        pk_float = self.sut._write_packet('motor.m1', '1.5')
+
+        # Assert
+        self.assertEqual(struct.pack('<BB', 0, 12), bytes(pk_int.data))
+        self.assertEqual(struct.pack('<Bf', 2, 1.5), bytes(pk_float.data))
+
+    def test_that_writes_use_v2_ids_before_any_read(self):
+        # Fixture
+        self.cf_mock.platform.get_protocol_version.return_value = 4
+        self.cf_mock.link.toc_window_size = 1
+        self.cf_mock.send_packet.side_effect = None
+        self.sut.refresh_toc(MagicMock(), MagicMock())
+        self.cf_mock.send_packet.reset_mock()
+        self.cf_mock.send_packet.side_effect = self._answer_request_v2
+        self._add_element(5, 'g', 'low')
+        self._add_element(261, 'g', 'high')
+        self.values_on_copter.update({5: 0, 261: 0})
+        written_cb = MagicMock()
+
+        # Test
+        self.sut.set_values({'g.low': 1, 'g.high': 2}, written_cb)
+
+        # Assert
+        self._wait_for_calls(written_cb, 2)
+        self.assertEqual({5: 1, 261: 2},
+                         dict((var_id, self.values_on_copter[var_id])
+                              for var_id in (5, 261)))
+        self.assertEqual({'low': 1, 'high': 2}, self.sut.values['g'])
+
+    def test_that_non_integral_float_is_rejected_for_int_param(self):
+        # Fixture
+
+        # Test
+        pk = self.sut._write_packet('pid.kp', 3.0)
+
+        # Assert
+        self.assertEqual(struct.pack('<BB', 0, 3), bytes(pk.data))
+        with self.assertRaises(ValueError):
+            self.sut.set_value('pid.kp', 2.7)
+
+    def _wait_for_value(self, group, name, value):
+        deadline = time.time() + 1.0
+        while (self.sut.values.get(group, {}).get(name) != value and
+               time.time() < deadline):
+            time.sleep(0.001)
+        self.assertEqual(value, self.sut.values[group][name])
+
+    def _wait_for_calls(self, mock, count):
+        deadline = time.time() + 1.0
+        while mock.call_count < count and time.time() < deadline:
+            time.sleep(0.001)
+        self.assertEqual(count, mock.call_count)
+
+    def _add_identity(self):
+        for ident, name, value in ((10, 'id0', 0xA1), (11, 'id1', 0xB2),
+                                   (12, 'id2', 0xC3)):
+            self._add_element(ident, 'cpu', name)
+            self.sut.toc.get_element_by_id(ident).access = \
+                ParamTocElement.RO_ACCESS
+            self.values_on_copter[ident] = value
+
+    def _add_element(self, ident, group, name):
+        element = ParamTocElement()
+        element.ident = ident
+        element.group = group
+        element.name = name
+        element.pytype = '<B'
+        element.access = ParamTocElement.RW_ACCESS
+        self.sut.toc.add_element(element)
+
+    def _answer_request(self, pk, expected_reply=()):
+        var_id = pk.data[0]
+        if pk.channel == WRITE_CHANNEL:
+            self.values_on_copter[var_id] = pk.data[1]
+        answer = CRTPPacket()
+        answer.set_header(CRTPPort.PARAM, pk.channel)
+        answer.data = struct.pack('<BB', var_id, self.values_on_copter[var_id])
+        self.sut.param_updater._new_packet_cb(answer)
+
+    def _answer_request_v2(self, pk, expected_reply=()):
+        var_id = struct.unpack('<H', pk.data[:2])[0]
+        if pk.channel == WRITE_CHANNEL:
+            self.values_on_copter[var_id] = pk.data[2]
+        answer = CRTPPacket()
+        answer.set_header(CRTPPort.PARAM, pk.channel)
+        answer.data = struct.pack('<HB', var_id,
+                                  self.values_on_copter[var_id])
+        self.sut.param_updater._new_packet_cb(answer)
+
+    def _requested_var_ids(self):
+        return [call[0][0].data[0]
+                for call in self.cf_mock.send_packet.call_args_list]
+
+
+class ParamUpdaterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cf_mock = MagicMock()
+        self.cf_mock.platform.get_protocol_version.return_value = 3
+        self.cf_mock.link.param_window_size = 2
+        self.updated_callback = MagicMock()
+
+        self.sut = _ParamUpdater(self.cf_mock, False, self.updated_callback)
+        self.sut.start()
+
+    def tearDown(self):
+        self.sut.close()
+
+    def test_that_requests_are_limited_by_window_size(self):
+        # Fixture
+
+        # Test
+        for var_id in range(3):
+            self.sut.request_param_update(var_id)
+
+        # Assert
+        self._wait_for_sent(2)
+        time.sleep(0.05)
+        self.assertEqual([0, 1], self._sent_var_ids())
+
+    def test_that_answer_frees_a_slot_in_the_window(self):
+        # Fixture
+        for var_id in range(3):
+            self.sut.request_param_update(var_id)
+        self._wait_for_sent(2)
+
+        # Test
+        self.sut._new_packet_cb(self._answer(READ_CHANNEL, 1, 17))
+
+        # Assert
+        self._wait_for_sent(3)
+        self.assertEqual([0, 1, 2], self._sent_var_ids())
+        self.assertEqual(1, self.updated_callback.call_count)
+
+    def test_that_requests_for_same_param_are_sent_in_order(self):
+        # Fixture
+        self.sut.request_param_update(5)
+        self.sut.request_param_setvalue(self._write(5, 3))
+        self._wait_for_sent(1)
+        time.sleep(0.05)
+        self.assertEqual(1, self.cf_mock.send_packet.call_count)
+
+        # Test
+        self.sut._new_packet_cb(self._answer(READ_CHANNEL, 5, 2))
+
+        # Assert
+        self._wait_for_sent(2)
+        sent = self.cf_mock.send_packet.call_args_list[1][0][0]
+        self.assertEqual(WRITE_CHANNEL, sent.channel)
+
+    def test_that_answer_for_param_not_in_flight_is_ignored(self):
+        # Fixture
+        self.sut.request_param_update(0)
+        self._wait_for_sent(1)
+
+        # Test
+        self.sut._new_packet_cb(self._answer(READ_CHANNEL, 4, 1))
+        self.sut._new_packet_cb(self._answer(WRITE_CHANNEL, 0, 1))
+
+        # Assert
+        self.updated_callback.assert_not_called()
+
+    def test_that_queued_writes_to_same_param_are_merged(self):
+        # Fixture
+        self.cf_mock.link.param_window_size = 1
+        self.sut.request_param_update(0)
+        self._wait_for_sent(1)
+        written_cb_1 = MagicMock()
+        written_cb_2 = MagicMock()
+        self.sut.request_param_setvalue(self._write(5, 3), written_cb_1)
+        self.sut.request_param_setvalue(self._write(5, 4), written_cb_2)
+
+        # Test
+        self.sut._new_packet_cb(self._answer(READ_CHANNEL, 0, 1))
+        self._wait_for_sent(2)
+        self.sut._new_packet_cb(self._answer(WRITE_CHANNEL, 5, 4))
+
+        # Assert
+        time.sleep(0.05)
+        self.assertEqual(2, self.cf_mock.send_packet.call_count)
+        sent = self.cf_mock.send_packet.call_args_list[1][0][0]
+        self.assertEqual(struct.pack('<BB', 5, 4), bytes(sent.data))
+        written_cb_1.assert_called_once_with()
+        written_cb_2.assert_called_once_with()
+
+    def test_that_close_releases_the_window(self):
+        # Fixture
+        for var_id in range(3):
+            self.sut.request_param_update(var_id)
+        self._wait_for_sent(2)
+
+        # Test
+        self.sut.close()
+        self.sut.request_param_update(7)
+
+        # Assert
+        self._wait_for_sent(3)
+        self.assertEqual(7, self._sent_var_ids()[2])
+
+    def _write(self, var_id, value):
+        pk = CRTPPacket()
+        pk.set_header(CRTPPort.PARAM, WRITE_CHANNEL)
+        pk.data = struct.pack('<BB', var_id, value)
+        return pk
+
+    def _answer(self, channel, var_id, value):
+        pk = CRTPPacket()
+        pk.set_header(CRTPPort.PARAM, channel)
+        pk.data = struct.pack('<BB', var_id, value)
+        return pk
+
+    def _sent_var_ids(self):
+        return [call[0][0].data[0]
+                for call in self.cf_mock.send_packet.call_args_list]
+
+    def _wait_for_sent(self, count):
+        deadline = time.time() + 1.0
+        while (self.cf_mock.send_packet.call_count < count and
+               time.time() < deadline):
+            time.sleep(0.001)
+        self.assertEqual(count, self.cf_mock.send_packet.call_count)
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2020 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import threading
+import unittest
+
+from cflib.crazyflie.retryscheduler import RetryScheduler
+
+
+class RetrySchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sut = RetryScheduler()
+
+    def tearDown(self):
+        self.sut.stop()
+
+    def test_that_callback_is_called_after_timeout(self):
+        # Fixture
+        called = threading.Event()
+
+        # Test
+        self.sut.schedule(0.01, called.set)
+
+        # Assert
+        self.assertTrue(called.wait(1))
+
+    def test_that_cancelled_callback_is_not_called(self):
+        # Fixture
+        cancelled = threading.Event()
+        called = threading.Event()
+        retry = self.sut.schedule(0.05, cancelled.set)
+
+        # Test
+        retry.cancel()
+        self.sut.schedule(0.1, called.set)
+
+        # Assert
+        self.assertTrue(called.wait(1))
+        self.assertFalse(cancelled.is_set())
+
+    def test_that_callbacks_are_called_in_deadline_order(self):
+        # Fixture
+        order = []
+        done = threading.Event()
+
+        def last():
+            order.append(2)
+            done.set()
+
+        # Test
+        self.sut.schedule(0.1, last)
+        self.sut.schedule(0.01, lambda: order.append(1))
+
+        # Assert
+        self.assertTrue(done.wait(1))
+        self.assertEqual([1, 2], order)
+
+    def test_that_cancel_all_removes_pending_retries(self):
+        # Fixture
+        self.sut.schedule(10, lambda: None)
+        self.sut.schedule(10, lambda: None)
+
+        # Test
+        self.sut.cancel_all()
+
+        # Assert
+        self.assertEqual(0, self.sut.pending())
+
+    def test_that_one_thread_is_used_for_all_retries(self):
+        # Fixture
+        threads_before = threading.active_count()
+
+        # Test
+        for _ in range(10):
+            self.sut.schedule(10, lambda: None)
+
+        # Assert
+        self.assertEqual(threads_before + 1, threading.active_count())
+
+    def test_that_stop_ends_the_thread(self):
+        # Fixture
+        self.sut.schedule(10, lambda: None)
+
+        # Test
+        self.sut.stop()
+
+        # Assert
+        self.assertFalse(self.sut.is_alive())
@@ -28,8 +28,10 @@ from cflib.crazyflie.swarm import Swarm
 from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
 
 if sys.version_info < (3, 3):
+    from mock import ANY
     from mock import MagicMock
 else:
+    from unittest.mock import ANY
     from unittest.mock import MagicMock
 
 
@@ -209,6 +211,35 @@ class TestSwarm(unittest.TestCase):
         with self.assertRaises(Exception):
             self.sut.parallel_safe(func_fail, args_dict=args_dict)
 
+    def test_that_param_values_are_set_on_all_crazyflies(self):
+        # Fixture
+        values = {'pid.kp': 1.5, 'pid.ki': 2}
+        for mock in self.factory.mocks.values():
+            mock.cf = MagicMock()
+            mock.cf.param.set_values.side_effect = self._confirm_values
+
+        # Test
+        self.sut.set_param_values(values)
+
+        # Assert
+        for mock in self.factory.mocks.values():
+            mock.cf.param.set_values.assert_called_once_with(
+                values, ANY)
+
+    def test_that_unconfirmed_param_values_raises_exception(self):
+        # Fixture
+        for mock in self.factory.mocks.values():
+            mock.cf = MagicMock()
+
+        # Test
+        # Assert
+        with self.assertRaises(Exception):
+            self.sut.set_param_values({'pid.kp': 1.5}, timeout=0.01)
+
+    def _confirm_values(self, values, written_cb):
+        for name, value in values.items():
+            written_cb(name, value)
+
 
 class MockFactory:
 
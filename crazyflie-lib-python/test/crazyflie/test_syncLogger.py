@@ -24,6 +24,7 @@
 #  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
 #  MA  02110-1301, USA.
 import sys
+import threading
 import unittest
 from test.support.asyncCallbackCaller import AsyncCallbackCaller
 
@@ -274,3 +275,110 @@ class SyncLoggerTest(unittest.TestCase):
         # Assert
         with self.assertRaises(StopIteration):
             self.sut.__next__()
+
+    def test_that_oldest_samples_are_dropped_by_default(self):
+        # Fixture
+        sut = SyncLogger(self.cf_mock, self.log_config_mock, max_size=2)
+        sut.connect()
+
+        # Test
+        self._receive(self.log_config_mock, 1, 2, 3)
+
+        # Assert
+        self.assertEqual([2, 3], [ts for ts, _, _ in sut.get_many()])
+        self.assertEqual(1, sut.dropped)
+
+    def test_that_newest_samples_are_dropped(self):
+        # Fixture
+        sut = SyncLogger(self.cf_mock, self.log_config_mock, max_size=2,
+                         drop_policy=SyncLogger.DROP_NEWEST)
+        sut.connect()
+
+        # Test
+        self._receive(self.log_config_mock, 1, 2, 3)
+
+        # Assert
+        self.assertEqual([1, 2], [ts for ts, _, _ in sut.get_many()])
+        self.assertEqual({self.log_config_mock: 1}, sut.dropped_by_config)
+
+    def test_that_latest_samples_of_each_config_are_kept(self):
+        # Fixture
+        sut = SyncLogger(self.cf_mock,
+                         [self.log_config_mock, self.log_config_mock2],
+                         max_size=2, drop_policy=SyncLogger.KEEP_LATEST)
+        sut.connect()
+
+        # Test
+        self._receive(self.log_config_mock2, 1)
+        self._receive(self.log_config_mock, 2, 3, 4)
+
+        # Assert
+        self.assertEqual([(1, self.log_config_mock2),
+                          (4, self.log_config_mock)],
+                         [(ts, conf) for ts, _, conf in sut.get_many()])
+        self.assertEqual({self.log_config_mock: 2}, sut.dropped_by_config)
+
+    def test_that_only_latest_sample_of_each_config_is_buffered(self):
+        # Fixture
+        sut = SyncLogger(self.cf_mock,
+                         [self.log_config_mock, self.log_config_mock2],
+                         drop_policy=SyncLogger.KEEP_LATEST)
+        sut.connect()
+
+        # Test
+        self._receive(self.log_config_mock, 1, 2)
+        self._receive(self.log_config_mock2, 3)
+        self._receive(self.log_config_mock, 4)
+
+        # Assert
+        self.assertEqual([(3, self.log_config_mock2),
+                          (4, self.log_config_mock)],
+                         [(ts, conf) for ts, _, conf in sut.get_many()])
+        self.assertEqual({self.log_config_mock: 2}, sut.dropped_by_config)
+
+    def test_that_get_many_returns_at_most_max_count_samples(self):
+        # Fixture
+        self.sut.connect()
+        self._receive(self.log_config_mock, 1, 2, 3)
+
+        # Test
+        actual = self.sut.get_many(2)
+
+        # Assert
+        self.assertEqual([1, 2], [ts for ts, _, _ in actual])
+        self.assertEqual([3], [ts for ts, _, _ in self.sut.get_many()])
+
+    def test_that_get_many_times_out_without_samples(self):
+        # Fixture
+        self.sut.connect()
+
+        # Test
+        actual = self.sut.get_many(timeout=0.01)
+
+        # Assert
+        self.assertEqual([], actual)
+
+    def test_that_get_many_keeps_waiting_after_spurious_wakeup(self):
+        # Fixture
+        self.sut.connect()
+        buffer = self.sut._queue
+        result = []
+        thread = threading.Thread(
+            target=lambda: result.extend(self.sut.get_many()))
+        thread.start()
+
+        # Test
+        thread.join(0.05)
+        with buffer._condition:
+            buffer._condition.notify()
+        thread.join(0.05)
+        self._receive(self.log_config_mock, 1)
+        thread.join(1)
+
+        # Assert
+        self.assertFalse(thread.is_alive())
+        self.assertEqual([1], [ts for ts, _, _ in result])
+
+    def _receive(self, log_config, *timestamps):
+        for ts in timestamps:
+            log_config.data_received_cb.call(ts, {}, log_config)
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2020 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import struct
+import sys
+import unittest
+
+from cflib.crazyflie.log import LogTocElement
+from cflib.crazyflie.toc import Toc
+from cflib.crazyflie.toc import TocFetcher
+from cflib.crtp.crtpstack import CRTPPacket
+
+if sys.version_info < (3, 3):
+    from mock import MagicMock
+else:
+    from unittest.mock import MagicMock
+
+
+class TocTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sut = Toc()
+
+    def _element(self, ident, group, name):
+        element = LogTocElement()
+        element.ident = ident
+        element.group = group
+        element.name = name
+        return element
+
+    def test_that_added_element_is_found_by_id_and_name(self):
+        # Fixture
+        element = self._element(7, 'group', 'name')
+
+        # Test
+        self.sut.add_element(element)
+
+        # Assert
+        self.assertIs(element, self.sut.get_element_by_id(7))
+        self.assertIs(element,
+                      self.sut.get_element_by_complete_name('group.name'))
+        self.assertEqual(7, self.sut.get_element_id('group.name'))
+
+    def test_that_replaced_element_is_not_found_by_old_id(self):
+        # Fixture
+        self.sut.add_element(self._element(1, 'group', 'name'))
+
+        # Test
+        self.sut.add_element(self._element(2, 'group', 'name'))
+
+        # Assert
+        self.assertIsNone(self.sut.get_element_by_id(1))
+        self.assertEqual(2, self.sut.get_element_id('group.name'))
+
+    def test_that_cleared_toc_has_no_elements(self):
+        # Fixture
+        self.sut.add_element(self._element(1, 'group', 'name'))
+
+        # Test
+        self.sut.clear()
+
+        # Assert
+        self.assertIsNone(self.sut.get_element_by_id(1))
+        self.assertIsNone(
+            self.sut.get_element_by_complete_name('group.name'))
+
+    def test_that_assigned_toc_is_indexed(self):
+        # Fixture
+        element = self._element(3, 'group', 'name')
+
+        # Test
+        self.sut.toc = {'group': {'name': element}}
+
+        # Assert
+        self.assertIs(element, self.sut.get_element_by_id(3))
+        self.assertIs(element,
+                      self.sut.get_element_by_complete_name('group.name'))
+
+    def test_that_shared_toc_is_copied_when_element_is_added(self):
+        # Fixture
+        other = Toc()
+        other.add_element(self._element(1, 'group', 'name'))
+        self.sut.share_from(other)
+
+        # Test
+        self.sut.add_element(self._element(2, 'group', 'other'))
+
+        # Assert
+        self.assertEqual(1, self.sut.get_element_id('group.name'))
+        self.assertEqual(2, self.sut.get_element_id('group.other'))
+        self.assertIsNone(other.get_element_by_id(2))
+        self.assertEqual(['name'], list(other.toc['group'].keys()))
+
+    def test_that_elements_of_source_are_loaded_on_lookup(self):
+        # Fixture
+        element = self._element(1, 'group', 'name')
+        source = MagicMock()
+        source.element_by_id.return_value = element
+
+        # Test
+        self.sut.set_source(source)
+        actual = self.sut.get_element_by_id(1)
+
+        # Assert
+        self.assertIs(element, actual)
+        self.assertIs(element,
+                      self.sut.get_element_by_complete_name('group.name'))
+        self.assertFalse(source.element_by_name.called)
+        self.assertFalse(source.elements.called)
+
+    def test_that_source_is_loaded_when_element_is_added(self):
+        # Fixture
+        source = MagicMock()
+        source.elements.return_value = [self._element(1, 'group', 'name')]
+        other = Toc()
+        other.set_source(source)
+        self.sut.share_from(other)
+
+        # Test
+        self.sut.add_element(self._element(2, 'group', 'other'))
+
+        # Assert
+        self.assertEqual(1, self.sut.get_element_id('group.name'))
+        self.assertEqual(2, self.sut.get_element_id('group.other'))
+        self.assertEqual(['name'], list(other.toc['group'].keys()))
+
+    def test_that_unknown_name_is_not_found(self):
+        # Fixture
+
+        # Test
+        # Assert
+        self.assertIsNone(self.sut.get_element_by_complete_name('no.name'))
+        self.assertIsNone(self.sut.get_element_by_complete_name('noname'))
+        self.assertIsNone(self.sut.get_element_id('no.name'))
+
+
+class TocFetcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cf_mock = MagicMock()
+        self.cf_mock.platform.get_protocol_version.return_value = 4
+        self.cf_mock.link.toc_window_size = 3
+        self.toc_cache_mock = MagicMock()
+        self.toc_cache_mock.fetch_toc.return_value = None
+        self.finished = MagicMock()
+        self.toc = Toc()
+        self.sut = TocFetcher(self.cf_mock, LogTocElement, 5, self.toc,
+                              self.finished, self.toc_cache_mock)
+
+    def _info_packet(self, nbr_of_items):
+        pk = CRTPPacket()
+        pk.set_header(5, 0)
+        pk.data = struct.pack('<BHI', 3, nbr_of_items, 0x1234)
+        return pk
+
+    def _element_packet(self, ident):
+        pk = CRTPPacket()
+        pk.set_header(5, 0)
+        pk.data = struct.pack('<BHB', 2, ident, 0x07)
+        pk.data += 'group\0name{}\0'.format(ident).encode('ISO-8859-1')
+        return pk
+
+    def _requested_indices(self):
+        requested = []
+        for call in self.cf_mock.send_packet.call_args_list:
+            data = call[0][0].data
+            if data[0] == 2:
+                requested.append(data[1] | data[2] << 8)
+        return requested
+
+    def test_that_window_of_requests_is_sent(self):
+        # Fixture
+        self.sut.start()
+
+        # Test
+        self.sut._new_packet_cb(self._info_packet(10))
+
+        # Assert
+        self.assertEqual([0, 1, 2], self._requested_indices())
+
+    def test_that_new_request_is_sent_for_each_reply(self):
+        # Fixture
+        self.sut.start()
+        self.sut._new_packet_cb(self._info_packet(10))
+
+        # Test
+        self.sut._new_packet_cb(self._element_packet(1))
+
+        # Assert
+        self.assertEqual([0, 1, 2, 3], self._requested_indices())
+
+    def test_that_out_of_order_replies_complete_the_toc(self):
+        # Fixture
+        self.sut.start()
+        self.sut._new_packet_cb(self._info_packet(4))
+
+        # Test
+        for ident in [2, 0, 1, 3]:
+            self.sut._new_packet_cb(self._element_packet(ident))
+
+        # Assert
+        self.finished.assert_called_once_with()
+        for ident in range(4):
+            self.assertEqual(
+                ident, self.toc.get_element_id('group.name{}'.format(ident)))
+        self.assertEqual([0, 1, 2, 3], self._requested_indices())
+
+    def test_that_duplicate_replies_are_ignored(self):
+        # Fixture
+        self.sut.start()
+        self.sut._new_packet_cb(self._info_packet(4))
+
+        # Test
+        for ident in [0, 0, 1, 2]:
+            self.sut._new_packet_cb(self._element_packet(ident))
+
+        # Assert
+        self.finished.assert_not_called()
+        self.assertEqual([0, 1, 2, 3], self._requested_indices())
+
+    def test_that_window_size_defaults_to_one(self):
+        # Fixture
+        del self.cf_mock.link.toc_window_size
+        self.sut.start()
+
+        # Test
+        self.sut._new_packet_cb(self._info_packet(10))
+
+        # Assert
+        self.assertEqual([0], self._requested_indices())
@@ -0,0 +1,348 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2020 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from cflib.crazyflie.log import LogTocElement
+from cflib.crazyflie.param import ParamTocElement
+from cflib.crazyflie.toccache import clear_shared_tocs
+from cflib.crazyflie.toccache import convert_json_cache
+from cflib.crazyflie.toccache import ParamValueCache
+from cflib.crazyflie.toccache import TocCache
+
+
+class TocCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ro_dir = tempfile.mkdtemp()
+        self.rw_dir = tempfile.mkdtemp()
+        clear_shared_tocs()
+
+    def tearDown(self):
+        clear_shared_tocs()
+        shutil.rmtree(self.ro_dir)
+        shutil.rmtree(self.rw_dir)
+
+    def _element(self, element_class, ident, group, name):
+        elem = element_class()
+        elem.ident = ident
+        elem.group = group
+        elem.name = name
+        elem.ctype = 'float'
+        elem.pytype = '<f'
+        elem.access = 1
+        return elem
+
+    def _toc(self):
+        return {'stabilizer': {
+            'roll': self._element(LogTocElement, 0, 'stabilizer', 'roll'),
+            'pitch': self._element(LogTocElement, 1, 'stabilizer', 'pitch')},
+            'pm': {'vbat': self._element(LogTocElement, 2, 'pm', 'vbat')}}
+
+    def _write_json(self, path, crc, toc):
+        data = {}
+        for group in toc:
+            data[group] = {}
+            for name, elem in toc[group].items():
+                data[group][name] = {'__class__': elem.__class__.__name__,
+                                     'ident': elem.ident,
+                                     'group': elem.group,
+                                     'name': elem.name,
+                                     'ctype': elem.ctype,
+                                     'pytype': elem.pytype,
+                                     'access': elem.access}
+        with open(os.path.join(path, '%08X.json' % crc), 'w') as f:
+            json.dump(data, f)
+
+    def _assert_same_toc(self, expected, actual):
+        self.assertEqual(sorted(expected.keys()), sorted(actual.keys()))
+        for group in expected:
+            self.assertEqual(sorted(expected[group].keys()),
+                             sorted(actual[group].keys()))
+            for name, elem in expected[group].items():
+                other = actual[group][name]
+                self.assertEqual(elem.__class__, other.__class__)
+                self.assertEqual(
+                    (elem.ident, elem.group, elem.name, elem.ctype,
+                     elem.pytype, elem.access),
+                    (other.ident, other.group, other.name, other.ctype,
+                     other.pytype, other.access))
+
+    def test_that_inserted_toc_is_fetched(self):
+        # Fixture
+        sut = TocCache(rw_cache=self.rw_dir)
+        toc = self._toc()
+
+        # Test
+        sut.insert(0x12345678, toc)
+        actual = sut.fetch(0x12345678)
+
+        # Assert
+        self._assert_same_toc(toc, actual)
+        self.assertTrue(
+            os.path.exists(os.path.join(self.rw_dir, '12345678.toc')))
+
+    def test_that_inserted_toc_is_fetched_by_new_cache(self):
+        # Fixture
+        toc = {'g': {'p': self._element(ParamTocElement, 3, 'g', 'p')}}
+        TocCache(rw_cache=self.rw_dir).insert(0xAABBCCDD, toc)
+        sut = TocCache(ro_cache=self.rw_dir)
+
+        # Test
+        actual = sut.fetch(0xAABBCCDD)
+
+        # Assert
+        self._assert_same_toc(toc, actual)
+
+    def test_that_unknown_crc_is_a_miss(self):
+        # Fixture
+        sut = TocCache(rw_cache=self.rw_dir)
+        sut.insert(0x12345678, self._toc())
+
+        # Test
+        actual = sut.fetch(0x87654321)
+
+        # Assert
+        self.assertIsNone(actual)
+
+    def test_that_json_cache_is_fetched(self):
+        # Fixture
+        toc = self._toc()
+        self._write_json(self.ro_dir, 0x12345678, toc)
+        sut = TocCache(ro_cache=self.ro_dir)
+
+        # Test
+        actual = sut.fetch(0x12345678)
+
+        # Assert
+        self._assert_same_toc(toc, actual)
+
+    def test_that_json_with_unknown_class_is_a_miss(self):
+        # Fixture
+        with open(os.path.join(self.ro_dir, '12345678.json'), 'w') as f:
+            json.dump({'g': {'n': {'__class__': 'os.system'}}}, f)
+        sut = TocCache(ro_cache=self.ro_dir)
+
+        # Test
+        actual = sut.fetch(0x12345678)
+
+        # Assert
+        self.assertIsNone(actual)
+
+    def test_that_corrupt_binary_cache_is_a_miss(self):
+        # Fixture
+        with open(os.path.join(self.ro_dir, '12345678.toc'), 'wb') as f:
+            f.write(b'CFTC\x01\x00\x00\x00\xff\x00\x00\x00\x10\x00\x00\x00')
+        sut = TocCache(ro_cache=self.ro_dir)
+
+        # Test
+        actual = sut.fetch(0x12345678)
+
+        # Assert
+        self.assertIsNone(actual)
+
+    def test_that_rw_cache_takes_precedence_over_ro_cache(self):
+        # Fixture
+        self._write_json(self.ro_dir, 0x12345678, self._toc())
+        toc = {'g': {'p': self._element(ParamTocElement, 3, 'g', 'p')}}
+        self._write_json(self.rw_dir, 0x12345678, toc)
+        sut = TocCache(ro_cache=self.ro_dir, rw_cache=self.rw_dir)
+
+        # Test
+        actual = sut.fetch(0x12345678)
+
+        # Assert
+        self._assert_same_toc(toc, actual)
+
+    def test_that_json_cache_is_converted(self):
+        # Fixture
+        toc = self._toc()
+        self._write_json(self.ro_dir, 0x12345678, toc)
+
+        # Test
+        converted = convert_json_cache(self.ro_dir, remove_json=True)
+
+        # Assert
+        self.assertEqual([os.path.join(self.ro_dir, '12345678.toc')],
+                         converted)
+        self.assertFalse(
+            os.path.exists(os.path.join(self.ro_dir, '12345678.json')))
+        self._assert_same_toc(
+            toc, TocCache(ro_cache=self.ro_dir).fetch(0x12345678))
+
+    def test_that_toc_is_shared_between_caches(self):
+        # Fixture
+        self._write_json(self.ro_dir, 0x12345678, self._toc())
+        cache1 = TocCache(ro_cache=self.ro_dir)
+        cache2 = TocCache(ro_cache=self.ro_dir)
+
+        # Test
+        toc1 = cache1.fetch_toc(0x12345678)
+        toc2 = cache2.fetch_toc(0x12345678)
+
+        # Assert
+        self.assertIs(toc1, toc2)
+        self.assertEqual(0, toc1.get_element_id('stabilizer.roll'))
+
+    def test_that_inserted_toc_is_shared_between_caches(self):
+        # Fixture
+        TocCache(rw_cache=self.rw_dir).insert(0x12345678, self._toc())
+
+        # Test
+        actual = TocCache(ro_cache=self.ro_dir).fetch_toc(0x12345678)
+
+        # Assert
+        self.assertEqual(2, actual.get_element_id('pm.vbat'))
+
+    def test_that_elements_are_created_on_lookup(self):
+        # Fixture
+        TocCache(rw_cache=self.rw_dir).insert(0x12345678, self._toc())
+        clear_shared_tocs()
+        toc = TocCache(ro_cache=self.rw_dir).fetch_toc(0x12345678)
+
+        # Test
+        actual = toc.get_element_by_id(2)
+
+        # Assert
+        self.assertEqual(('pm', 'vbat'), (actual.group, actual.name))
+        self.assertEqual({'pm': {'vbat': actual}}, toc._toc)
+        self.assertIs(actual, toc.get_element_by_complete_name('pm.vbat'))
+
+    def test_that_elements_are_created_once(self):
+        # Fixture
+        TocCache(rw_cache=self.rw_dir).insert(0x12345678, self._toc())
+        clear_shared_tocs()
+        toc = TocCache(ro_cache=self.rw_dir).fetch_toc(0x12345678)
+
+        # Test
+        actual = toc.get_element_by_complete_name('stabilizer.pitch')
+
+        # Assert
+        self.assertEqual(1, actual.ident)
+        self.assertIs(actual, toc.get_element_by_id(1))
+        self.assertIs(actual, toc.toc['stabilizer']['pitch'])
+        self._assert_same_toc(self._toc(), toc.toc)
+
+    def test_that_elements_are_found_by_id_out_of_order(self):
+        # Fixture
+        toc = {'g': {'a': self._element(ParamTocElement, 7, 'g', 'a'),
+                     'b': self._element(ParamTocElement, 0, 'g', 'b')}}
+        TocCache(rw_cache=self.rw_dir).insert(0x12345678, toc)
+        clear_shared_tocs()
+        sut = TocCache(ro_cache=self.rw_dir).fetch_toc(0x12345678)
+
+        # Test
+        # Assert
+        self.assertEqual('a', sut.get_element_by_id(7).name)
+        self.assertEqual('b', sut.get_element_by_id(0).name)
+        self.assertIsNone(sut.get_element_by_id(1))
+        self.assertIsNone(sut.get_element_by_complete_name('g.c'))
+
+    def test_that_toc_is_not_shared_when_cache_is_off(self):
+        # Fixture
+        TocCache().insert(0x12345678, self._toc())
+
+        # Test
+        actual = TocCache().fetch_toc(0x12345678)
+
+        # Assert
+        self.assertIsNone(actual)
+
+    def test_that_unknown_crc_is_not_shared(self):
+        # Fixture
+
+        # Test
+        actual = TocCache(ro_cache=self.ro_dir).fetch_toc(0x12345678)
+
+        # Assert
+        self.assertIsNone(actual)
+
+
+class ParamValueCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rw_dir = tempfile.mkdtemp()
+        self.sut = ParamValueCache(rw_cache=self.rw_dir)
+        self.values = {'pid': {'kp': 1.5, 'ki': 3}}
+
+    def tearDown(self):
+        shutil.rmtree(self.rw_dir)
+
+    def test_that_inserted_values_are_fetched_with_types(self):
+        # Fixture
+        self.sut.insert(0x12345678, 'radio://0/80/2M/E7E7E7E701', self.values)
+
+        # Test
+        actual = ParamValueCache(rw_cache=self.rw_dir).fetch(
+            0x12345678, 'radio://0/80/2M/E7E7E7E701')
+
+        # Assert
+        self.assertEqual((self.values, []), actual)
+        self.assertIsInstance(actual[0]['pid']['ki'], int)
+
+    def test_that_written_params_are_fetched(self):
+        # Fixture
+        self.sut.insert(0x12345678, 'radio://0/80/2M/E7E7E7E701', self.values,
+                        set(['pid.kp']))
+
+        # Test
+        actual = self.sut.fetch(0x12345678, 'radio://0/80/2M/E7E7E7E701')
+
+        # Assert
+        self.assertEqual((self.values, ['pid.kp']), actual)
+
+    def test_that_values_of_other_crazyflie_are_a_miss(self):
+        # Fixture
+        self.sut.insert(0x12345678, 'radio://0/80/2M/E7E7E7E701', self.values)
+
+        # Test
+        actual = self.sut.fetch(0x12345678, 'radio://0/80/2M/E7E7E7E702')
+
+        # Assert
+        self.assertIsNone(actual)
+
+    def test_that_values_of_other_toc_are_a_miss(self):
+        # Fixture
+        self.sut.insert(0x12345678, 'radio://0/80/2M/E7E7E7E701', self.values)
+
+        # Test
+        actual = self.sut.fetch(0x12345679, 'radio://0/80/2M/E7E7E7E701')
+
+        # Assert
+        self.assertIsNone(actual)
+
+    def test_that_nothing_is_cached_without_directory(self):
+        # Fixture
+        sut = ParamValueCache()
+
+        # Test
+        sut.insert(0x12345678, 'radio://0/80/2M/E7E7E7E701', self.values)
+
+        # Assert
+        self.assertIsNone(sut.fetch(0x12345678, 'radio://0/80/2M/E7E7E7E701'))
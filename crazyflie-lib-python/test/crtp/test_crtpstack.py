@@ -23,6 +23,7 @@
 #  along with this program; if not, write to the Free Software
 #  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
 #  MA  02110-1301, USA.
+import sys
 import unittest
 
 from cflib.crtp.crtpstack import CRTPPacket
@@ -102,3 +103,59 @@ class CRTPPacketTest(unittest.TestCase):
         self.assertEqual(0x2d, actual)
         self.assertEqual(2, sut.port)
         self.assertEqual(1, sut.channel)
+
+    def test_that_header_is_cached_when_port_and_channel_is_set(self):
+        # Fixture
+        self.sut.port = 2
+        self.sut.channel = 1
+
+        # Test
+        actual = self.sut.header
+
+        # Assert
+        self.assertEqual(0x2d, actual)
+
+    def test_that_data_is_converted_to_bytearray(self):
+        # Fixture
+
+        # Test
+        self.sut.data = (1, 2, 3)
+
+        # Assert
+        self.assertEqual(bytearray((1, 2, 3)), self.sut.data)
+        self.assertEqual((1, 2, 3), self.sut.datat)
+        self.assertEqual([1, 2, 3], self.sut.datal)
+
+    def test_that_packet_is_created_from_buffer(self):
+        # Fixture
+        buf = bytearray((0x21, 1, 2, 3))
+
+        # Test
+        sut = CRTPPacket.from_buffer(buf)
+
+        # Assert
+        self.assertEqual(0x2d, sut.header)
+        self.assertEqual(2, sut.port)
+        self.assertEqual(1, sut.channel)
+        self.assertEqual((1, 2, 3), sut.datat)
+        self.assertEqual(1, sut.data[0])
+
+    @unittest.skipIf(sys.version_info < (3,), 'Views are copied in python 2')
+    def test_that_packet_created_from_buffer_does_not_copy_data(self):
+        # Fixture
+        buf = bytearray((0x21, 1, 2, 3))
+        sut = CRTPPacket.from_buffer(buf)
+
+        # Test
+        buf[1] = 7
+
+        # Assert
+        self.assertEqual(7, sut.data[0])
+
+    def test_that_attributes_can_not_be_added_to_packet(self):
+        # Fixture
+
+        # Test
+        # Assert
+        with self.assertRaises(AttributeError):
+            self.sut.not_an_attribute = 1
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2020 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import unittest
+
+from cflib.crtp import packetpool
+from cflib.crtp.crtpstack import CRTPPacket
+from cflib.crtp.packetpool import PacketPool
+
+
+class PacketPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sut = PacketPool(2)
+
+    def tearDown(self):
+        packetpool.disable_packet_pool()
+
+    def test_that_acquired_packet_contains_frame(self):
+        # Fixture
+        frame = bytearray((0x21, 1, 2, 3))
+
+        # Test
+        actual = self.sut.acquire(frame)
+
+        # Assert
+        self.assertEqual(0x2d, actual.header)
+        self.assertEqual(2, actual.port)
+        self.assertEqual(1, actual.channel)
+        self.assertEqual((1, 2, 3), actual.datat)
+
+    def test_that_released_packet_is_reused(self):
+        # Fixture
+        first = self.sut.acquire(bytearray((0x21, 1, 2, 3)))
+        self.sut.release(first)
+
+        # Test
+        actual = self.sut.acquire(bytearray((0x30, 4)))
+
+        # Assert
+        self.assertIs(first, actual)
+        self.assertEqual(3, actual.port)
+        self.assertEqual((4,), actual.datat)
+
+    def test_that_hits_misses_and_high_water_are_counted(self):
+        # Fixture
+        frame = bytearray((0x21, 1))
+
+        # Test
+        packets = [self.sut.acquire(frame) for _ in range(3)]
+        for pk in packets:
+            self.sut.release(pk)
+
+        # Assert
+        stats = self.sut.get_stats()
+        self.assertEqual(2, stats['hits'])
+        self.assertEqual(1, stats['misses'])
+        self.assertEqual(3, stats['high_water'])
+        self.assertEqual(0, stats['in_use'])
+        self.assertEqual(2, stats['free'])
+
+    def test_that_foreign_packets_are_not_added_to_the_pool(self):
+        # Fixture
+        other = PacketPool(1)
+
+        # Test
+        self.sut.release(CRTPPacket())
+        self.sut.release(other.acquire(bytearray((0x21, 1))))
+
+        # Assert
+        self.assertEqual(2, self.sut.get_stats()['free'])
+
+    def test_that_packet_from_buffer_copies_without_pool(self):
+        # Fixture
+        frame = bytearray((0x21, 1, 2, 3))
+
+        # Test
+        actual = packetpool.packet_from_buffer(frame, copy=True)
+        frame[1] = 7
+
+        # Assert
+        self.assertEqual((1, 2, 3), actual.datat)
+
+    def test_that_packet_from_buffer_uses_enabled_pool(self):
+        # Fixture
+        pool = packetpool.enable_packet_pool(1)
+
+        # Test
+        actual = packetpool.packet_from_buffer(bytearray((0x21, 1)))
+        packetpool.release_packet(actual)
+
+        # Assert
+        self.assertEqual(1, pool.hits)
+        self.assertEqual(1, pool.get_stats()['free'])
@@ -0,0 +1,691 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2020 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import sys
+import threading
+import time
+import unittest
+
+from cflib.crtp.crtpstack import CRTPPacket
+from cflib.crtp.crtpstack import CRTPPort
+from cflib.crtp.radiodriver import RadioDriver
+from cflib.crtp.radiodriver import _IDLE_POLL_PERIOD_START
+from cflib.crtp.radiodriver import _RadioManager
+from cflib.crtp.radiodriver import DEFAULT_ADDR_A
+from cflib.crtp.radiodriver import DEFAULT_BROADCAST_ADDR_A
+from cflib.crtp.radiodriver import _RadioLink
+from cflib.crtp.radiodriver import _RadioScheduler
+from cflib.crtp.radiodriver import _TxBuffers
+from cflib.crtp.radiodriver import _UplinkQueue
+from cflib.drivers.crazyradio import _radio_ack
+
+if sys.version_info < (3,):
+    import Queue as queue
+else:
+    import queue
+
+if sys.version_info < (3, 3):
+    from mock import MagicMock, patch
+else:
+    from unittest.mock import MagicMock, patch
+
+
+class FakeLink():
+
+    def __init__(self, weight=1, uplink=True, setpoint=False, next_poll=0):
+        self.weight = weight
+        self.credit = 0
+        self.next_poll = next_poll
+        self.uplink = uplink
+        self.setpoint = setpoint
+
+    def has_uplink(self):
+        return self.uplink
+
+    def has_setpoint(self):
+        return self.setpoint
+
+
+def packet(port, channel=0, data=(0,)):
+    pk = CRTPPacket(0, data)
+    pk.set_header(port, channel)
+    return pk
+
+
+class TxBuffersTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sut = _TxBuffers()
+
+    def test_that_packet_is_packed(self):
+        # Fixture
+        # Test
+        actual = self.sut.pack(0x2c, bytearray((1, 2, 3)))
+
+        # Assert
+        self.assertEqual([0x2c, 1, 2, 3], list(actual))
+
+    def test_that_buffer_is_reused_for_same_length(self):
+        # Fixture
+        first = self.sut.pack(0x2c, bytearray((1, 2)))
+
+        # Test
+        actual = self.sut.pack(0x3c, bytearray((3, 4)))
+
+        # Assert
+        self.assertIs(first, actual)
+        self.assertEqual([0x3c, 3, 4], list(actual))
+
+    def test_that_empty_payload_is_packed(self):
+        # Fixture
+        # Test
+        actual = self.sut.pack(0xf3, bytearray())
+
+        # Assert
+        self.assertEqual([0xf3], list(actual))
+
+    def test_that_too_large_packet_is_packed(self):
+        # Fixture
+        data = bytearray(range(40))
+
+        # Test
+        actual = self.sut.pack(0x2c, data)
+
+        # Assert
+        self.assertEqual([0x2c] + list(data), list(actual))
+
+
+class UplinkQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sut = _UplinkQueue(fifo_size=2, bulk_size=2)
+
+    def _get_all(self):
+        actual = []
+        while not self.sut.empty():
+            actual.append(self.sut.get(False))
+        return actual
+
+    def test_that_empty_queue_raises(self):
+        # Fixture
+        # Test
+        # Assert
+        with self.assertRaises(queue.Empty):
+            self.sut.get(False)
+
+    def test_that_only_latest_setpoint_is_kept(self):
+        # Fixture
+        sp1 = packet(CRTPPort.COMMANDER_GENERIC)
+        sp2 = packet(CRTPPort.COMMANDER)
+
+        # Test
+        self.sut.put(sp1)
+        self.sut.put(sp2)
+
+        # Assert
+        self.assertEqual([sp2], self._get_all())
+
+    def test_that_setpoint_is_sent_before_other_packets(self):
+        # Fixture
+        pk = packet(CRTPPort.PARAM)
+        sp = packet(CRTPPort.COMMANDER_GENERIC)
+
+        # Test
+        self.sut.put(pk)
+        self.sut.put(sp)
+
+        # Assert
+        self.assertEqual([sp, pk], self._get_all())
+
+    def test_that_commander_meta_packets_are_not_replaced(self):
+        # Fixture
+        meta1 = packet(CRTPPort.COMMANDER_GENERIC, channel=1)
+        meta2 = packet(CRTPPort.COMMANDER_GENERIC, channel=1)
+
+        # Test
+        self.sut.put(meta1)
+        self.sut.put(meta2)
+
+        # Assert
+        self.assertEqual([meta1, meta2], self._get_all())
+
+    def test_that_bulk_packets_wait_for_protocol_packets(self):
+        # Fixture
+        mem = packet(CRTPPort.MEM)
+        pk = packet(CRTPPort.PARAM)
+
+        # Test
+        self.sut.put(mem)
+        self.sut.put(pk)
+
+        # Assert
+        self.assertEqual([pk, mem], self._get_all())
+
+    def test_that_bulk_lane_is_not_starved(self):
+        # Fixture
+        sut = _UplinkQueue(fifo_size=100)
+        mem = packet(CRTPPort.MEM)
+        sut.put(mem)
+        for _ in range(10):
+            sut.put(packet(CRTPPort.PARAM))
+
+        # Test
+        actual = [sut.get(False) for _ in range(11)]
+
+        # Assert
+        self.assertEqual(4, actual.index(mem))
+
+    def test_that_full_lane_times_out(self):
+        # Fixture
+        self.sut.put(packet(CRTPPort.PARAM))
+        self.sut.put(packet(CRTPPort.PARAM))
+
+        # Test
+        # Assert
+        with self.assertRaises(queue.Full):
+            self.sut.put(packet(CRTPPort.PARAM), True, 0.01)
+
+    def test_that_full_lane_does_not_block_other_lanes(self):
+        # Fixture
+        self.sut.put(packet(CRTPPort.MEM))
+        self.sut.put(packet(CRTPPort.MEM))
+        pk = packet(CRTPPort.PARAM)
+
+        # Test
+        self.sut.put(pk, False)
+
+        # Assert
+        self.assertIs(pk, self.sut.get(False))
+
+
+class RadioSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sut = _RadioScheduler()
+
+    def _add(self, *links):
+        # Bypass add_link() to not start the thread
+        for link in links:
+            self.sut._links.append(link)
+
+    def _select_many(self, count):
+        return [self.sut._select(0)[0] for _ in range(count)]
+
+    def test_that_busy_links_share_radio_by_weight(self):
+        # Fixture
+        link1 = FakeLink(weight=1)
+        link2 = FakeLink(weight=2)
+        self._add(link1, link2)
+
+        # Test
+        actual = self._select_many(30)
+
+        # Assert
+        self.assertEqual(10, actual.count(link1))
+        self.assertEqual(20, actual.count(link2))
+
+    def test_that_turns_are_interleaved(self):
+        # Fixture
+        link1 = FakeLink()
+        link2 = FakeLink()
+        self._add(link1, link2)
+
+        # Test
+        actual = self._select_many(4)
+
+        # Assert
+        self.assertEqual([link1, link2, link1, link2], actual)
+
+    def test_that_links_with_setpoints_go_first(self):
+        # Fixture
+        link1 = FakeLink(weight=10)
+        link2 = FakeLink(setpoint=True)
+        self._add(link1, link2)
+
+        # Test
+        actual = self._select_many(3)
+
+        # Assert
+        self.assertEqual([link2] * 3, actual)
+
+    def test_that_idle_link_is_not_polled_before_it_is_due(self):
+        # Fixture
+        link1 = FakeLink(uplink=False, next_poll=0.25)
+        self._add(link1)
+
+        # Test
+        actual = self.sut._select(0.2)
+
+        # Assert
+        self.assertIsNone(actual[0])
+        self.assertAlmostEqual(0.05, actual[1])
+
+    def test_that_idle_link_is_polled_when_due(self):
+        # Fixture
+        link1 = FakeLink(uplink=False, next_poll=0.25)
+        self._add(link1)
+
+        # Test
+        actual = self.sut._select(0.25)
+
+        # Assert
+        self.assertIs(link1, actual[0])
+
+    def test_that_link_without_downlink_is_not_polled(self):
+        # Fixture
+        link1 = FakeLink(uplink=False, next_poll=None)
+        self._add(link1)
+
+        # Test
+        actual = self.sut._select(0)
+
+        # Assert
+        self.assertEqual((None, None), actual)
+
+    def test_that_added_link_is_serviced_by_thread(self):
+        # Fixture
+        link = FakeLink(uplink=False)
+        link.transfer = MagicMock()
+
+        # Test
+        self.sut.add_link(link)
+        self.sut.remove_link(link)
+        self.sut.stop()
+
+        # Assert
+        self.assertFalse(self.sut.is_alive())
+
+
+class RadioLinkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cradio = MagicMock()
+        self.radio_manager = MagicMock()
+        self.radio_manager.__enter__.return_value = self.cradio
+        self.in_queue = queue.Queue()
+        self.out_queue = _UplinkQueue()
+        self.link_error_callback = MagicMock()
+        self.sut = _RadioLink(self.radio_manager, self.in_queue,
+                              self.out_queue, None, self.link_error_callback,
+                              MagicMock())
+        self.sut._setup_done = True
+
+    def _ack(self, ack=True, data=()):
+        status = _radio_ack()
+        status.ack = ack
+        status.data = bytearray(data)
+        return status
+
+    def _sent(self):
+        return list(self.cradio.send_packet.call_args[0][0])
+
+    def test_that_queued_packet_is_sent(self):
+        # Fixture
+        self.out_queue.put(CRTPPacket(0x20, (1, 2)))
+        self.cradio.send_packet.return_value = self._ack()
+
+        # Test
+        self.sut.transfer()
+
+        # Assert
+        self.assertEqual([0x2c, 1, 2], self._sent())
+        self.assertFalse(self.sut.has_uplink())
+
+    def test_that_null_packet_is_sent_when_idle(self):
+        # Fixture
+        self.cradio.send_packet.return_value = self._ack()
+
+        # Test
+        self.sut.transfer()
+
+        # Assert
+        self.assertEqual([0xff], self._sent())
+
+    def test_that_null_packet_buffer_is_reused(self):
+        # Fixture
+        self.cradio.send_packet.return_value = self._ack()
+        self.sut.transfer()
+        first = self.cradio.send_packet.call_args[0][0]
+
+        # Test
+        self.sut.transfer()
+
+        # Assert
+        self.assertIs(first, self.cradio.send_packet.call_args[0][0])
+
+    def test_that_packet_is_resent_if_not_acked(self):
+        # Fixture
+        self.out_queue.put(CRTPPacket(0x20, (1, 2)))
+        self.cradio.send_packet.return_value = self._ack(ack=False)
+        self.sut.transfer()
+
+        # Test
+        self.sut.transfer()
+
+        # Assert
+        self.assertEqual(2, self.cradio.send_packet.call_count)
+        self.assertEqual([0x2c, 1, 2], self._sent())
+        self.assertTrue(self.sut.has_uplink())
+
+    def test_that_checking_for_uplink_does_not_dequeue(self):
+        # Fixture
+        self.out_queue.put(packet(CRTPPort.COMMANDER, data=(1,)))
+        self.sut.has_uplink()
+        self.out_queue.put(packet(CRTPPort.COMMANDER, data=(2,)))
+        self.cradio.send_packet.return_value = self._ack()
+
+        # Test
+        self.sut.transfer()
+
+        # Assert
+        self.assertEqual([0x3c, 2], self._sent())
+        self.assertFalse(self.sut.has_uplink())
+
+    def test_that_lost_setpoint_is_replaced_by_newer_setpoint(self):
+        # Fixture
+        self.out_queue.put(packet(CRTPPort.COMMANDER, data=(1,)))
+        self.cradio.send_packet.return_value = self._ack(ack=False)
+        self.sut.transfer()
+        self.out_queue.put(packet(CRTPPort.COMMANDER, data=(2,)))
+
+        # Test
+        self.sut.transfer()
+
+        # Assert
+        self.assertEqual([0x3c, 2], self._sent())
+
+    def test_that_lost_packet_is_resent_before_setpoint(self):
+        # Fixture
+        self.out_queue.put(CRTPPacket(0x20, (1, 2)))
+        self.cradio.send_packet.return_value = self._ack(ack=False)
+        self.sut.transfer()
+        self.out_queue.put(packet(CRTPPort.COMMANDER, data=(2,)))
+
+        # Test
+        self.sut.transfer()
+
+        # Assert
+        self.assertEqual([0x2c, 1, 2], self._sent())
+        self.assertTrue(self.sut.has_setpoint())
+
+    def test_that_received_data_is_queued(self):
+        # Fixture
+        self.cradio.send_packet.return_value = self._ack(data=(0x21, 5))
+
+        # Test
+        self.sut.transfer()
+
+        # Assert
+        actual = self.in_queue.get(False)
+        self.assertEqual((5,), actual.datat)
+
+    def test_that_setpoint_is_detected(self):
+        # Fixture
+        pk = CRTPPacket()
+        pk.set_header(CRTPPort.COMMANDER_GENERIC, 0)
+        self.out_queue.put(pk)
+
+        # Test
+        actual = self.sut.has_setpoint()
+
+        # Assert
+        self.assertTrue(actual)
+
+    def test_that_idle_polling_backs_off_exponentially(self):
+        # Fixture
+        self.cradio.send_packet.return_value = self._ack()
+
+        # Test
+        actual = []
+        for _ in range(3):
+            self.sut.transfer()
+            actual.append(self.sut._idle_period)
+
+        # Assert
+        expected = [_IDLE_POLL_PERIOD_START * 1,
+                    _IDLE_POLL_PERIOD_START * 2,
+                    _IDLE_POLL_PERIOD_START * 4]
+        self.assertEqual(expected, actual)
+
+    def test_that_idle_polling_backoff_is_capped(self):
+        # Fixture
+        self.cradio.send_packet.return_value = self._ack()
+        self.sut.max_idle_period = 0.05
+
+        # Test
+        for _ in range(20):
+            self.sut.transfer()
+
+        # Assert
+        self.assertEqual(0.05, self.sut._idle_period)
+
+    def test_that_polling_recovers_when_data_is_received(self):
+        # Fixture
+        self.cradio.send_packet.return_value = self._ack()
+        for _ in range(5):
+            self.sut.transfer()
+        self.cradio.send_packet.return_value = self._ack(data=(0x21, 5))
+
+        # Test
+        self.sut.transfer()
+
+        # Assert
+        self.assertEqual(0, self.sut._idle_period)
+        self.assertEqual(0, self.sut.next_poll)
+
+    def test_that_max_poll_rate_delays_next_poll(self):
+        # Fixture
+        self.cradio.send_packet.return_value = self._ack(data=(0x21, 5))
+        self.sut.min_poll_period = 10
+
+        # Test
+        self.sut.transfer()
+
+        # Assert
+        self.assertEqual(0, self.sut._idle_period)
+        self.assertGreater(self.sut.next_poll, 5)
+
+    def test_that_stats_count_packets(self):
+        # Fixture
+        self.out_queue.put(CRTPPacket(0x20, (1, 2)))
+        self.cradio.send_packet.side_effect = [
+            self._ack(ack=False), self._ack(), self._ack(data=(0x21, 5))]
+
+        # Test
+        for _ in range(3):
+            self.sut.transfer()
+        actual = self.sut.get_stats()
+
+        # Assert
+        self.assertEqual(1, actual['sent'])
+        self.assertEqual(1, actual['polls'])
+        self.assertEqual(1, actual['received'])
+        self.assertEqual(1, actual['lost'])
+        self.assertGreater(actual['packet_rate'], 0)
+
+    def test_that_radio_error_is_reported(self):
+        # Fixture
+        self.cradio.send_packet.side_effect = Exception('Unplugged')
+
+        # Test
+        self.sut.transfer()
+
+        # Assert
+        self.assertTrue(self.link_error_callback.called)
+        self.radio_manager.remove_link.assert_called_once_with(self.sut)
+
+    def test_that_radio_error_without_callback_stops_link(self):
+        # Fixture
+        sut = _RadioLink(self.radio_manager, self.in_queue, self.out_queue,
+                         None, None, MagicMock())
+        sut._setup_done = True
+        self.cradio.send_packet.side_effect = Exception('Unplugged')
+
+        # Test
+        sut.transfer()
+
+        # Assert
+        self.radio_manager.remove_link.assert_called_once_with(sut)
+
+    def test_that_link_is_not_serviced_after_radio_error(self):
+        # Fixture
+        scheduler = _RadioScheduler()
+        self.radio_manager.add_link.side_effect = scheduler.add_link
+        self.radio_manager.remove_link.side_effect = scheduler.remove_link
+        error = threading.Event()
+        self.link_error_callback.side_effect = lambda msg: error.set()
+        self.cradio.send_packet.side_effect = Exception('Unplugged')
+        self.out_queue.put(CRTPPacket(0x20, (1, 2)))
+
+        # Test
+        self.sut.start()
+        error.wait(1)
+        time.sleep(0.05)
+        scheduler.stop()
+
+        # Assert
+        self.assertEqual(1, self.cradio.send_packet.call_count)
+        self.assertEqual(1, self.link_error_callback.call_count)
+        self.assertEqual([], scheduler._links)
+
+    def test_that_broadcast_link_sends_without_ack(self):
+        # Fixture
+        sut = _RadioLink(self.radio_manager, self.in_queue, self.out_queue,
+                         None, self.link_error_callback, MagicMock(),
+                         broadcast=True)
+        sut.start()
+        self.out_queue.put(CRTPPacket(0x80, (1, 2)))
+
+        # Test
+        sut.transfer()
+
+        # Assert
+        self.assertEqual(1, self.cradio.send_packet_no_ack.call_count)
+        self.assertEqual([0x8c, 1, 2],
+                         list(self.cradio.send_packet_no_ack.call_args[0][0]))
+        self.assertFalse(self.cradio.send_packet.called)
+        self.assertFalse(sut.has_uplink())
+        self.assertIsNone(sut.next_poll)
+
+
+@patch('cflib.crtp.radiodriver.Crazyradio')
+class RadioManagerTest(unittest.TestCase):
+
+    def tearDown(self):
+        _RadioManager._radios = []
+
+    def test_that_ack_is_disabled_for_broadcast(self, crazyradio_mock):
+        # Fixture
+        radio = crazyradio_mock.return_value
+        radio.current_ack_enable = True
+        sut = _RadioManager(0, 80, 2, DEFAULT_BROADCAST_ADDR_A, False)
+
+        # Test
+        with sut as cradio:
+            pass
+
+        # Assert
+        self.assertIs(radio, cradio)
+        radio.set_ack_enable.assert_called_once_with(False)
+        radio.set_address.assert_called_once_with(DEFAULT_BROADCAST_ADDR_A)
+        sut.close()
+
+    def test_that_ack_is_not_reconfigured_when_enabled(self, crazyradio_mock):
+        # Fixture
+        radio = crazyradio_mock.return_value
+        radio.current_ack_enable = True
+        sut = _RadioManager(0, 80, 2, DEFAULT_ADDR_A)
+
+        # Test
+        with sut:
+            pass
+
+        # Assert
+        self.assertFalse(radio.set_ack_enable.called)
+        sut.close()
+
+
+class RadioDriverTest(unittest.TestCase):
+
+    def test_that_broadcast_uri_uses_broadcast_address(self):
+        # Fixture
+        # Test
+        actual = RadioDriver.parse_uri('radiobroadcast://0/80/2M')
+
+        # Assert
+        self.assertEqual((0, 80, 2, DEFAULT_BROADCAST_ADDR_A), actual)
+
+    def test_that_broadcast_uri_accepts_address(self):
+        # Fixture
+        # Test
+        actual = RadioDriver.parse_uri('radiobroadcast://0/80/2M/E7E7E7E7E7')
+
+        # Assert
+        self.assertEqual(tuple(DEFAULT_ADDR_A), actual[3])
+
+    @patch('cflib.crtp.radiodriver.Crazyradio')
+    def test_that_broadcast_link_has_no_safelink(self, crazyradio_mock):
+        # Fixture
+        radio = crazyradio_mock.return_value
+        radio.version = 0.4
+        sut = RadioDriver()
+
+        # Test
+        sut.connect('radiobroadcast://0/80/2M', None, None)
+        sut.send_packet(CRTPPacket(0x80, (1, 2)))
+        for _ in range(100):
+            if radio.send_packet_no_ack.called:
+                break
+            time.sleep(0.01)
+        sut.close()
+        _RadioManager._radios = []
+
+        # Assert
+        self.assertFalse(sut.needs_resending)
+        self.assertFalse(radio.send_packet.called)
+        self.assertEqual(1, radio.send_packet_no_ack.call_count)
+
+    def test_that_invalid_poll_rates_are_rejected(self):
+        # Fixture
+        sut = RadioDriver()
+
+        # Test
+        # Assert
+        with self.assertRaises(ValueError):
+            sut.set_poll_rate(max_rate=10, min_rate=100)
+        with self.assertRaises(ValueError):
+            sut.set_poll_rate(min_rate=0)
+
+    def test_that_poll_rates_are_applied_to_link(self):
+        # Fixture
+        sut = RadioDriver()
+        sut._thread = _RadioLink(MagicMock(), None, None, None, None, None)
+
+        # Test
+        sut.set_poll_rate(max_rate=500, min_rate=20)
+
+        # Assert
+        self.assertAlmostEqual(0.002, sut._thread.min_poll_period)
+        self.assertAlmostEqual(0.05, sut._thread.max_idle_period)